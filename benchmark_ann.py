@@ -0,0 +1,94 @@
+"""
+Recall-vs-latency benchmark for the FAISS index types.
+
+Compares flat, IVF-Flat, HNSW and IVF-PQ (with a sweep of nprobe / efSearch)
+against exact flat search, either on synthetic clustered vectors or on the
+vectors of the published index.
+
+    python benchmark_ann.py --count 200000 --dimension 1536
+    python benchmark_ann.py --from-index vector_db/serving --queries 500
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import numpy as np
+
+from src.data.ann_index import benchmark_indexes
+
+
+def synthetic_vectors(count, dimension, clusters=256, seed=0):
+    """Generate clustered vectors that look more like embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def published_vectors(root):
+    """Read every vector from the current published index."""
+    import faiss
+    from src.data.faiss_index import INDEX_FILE, current_version
+
+    version = current_version(root)
+    if version is None:
+        sys.exit(f"No published index found in {root}")
+    index = faiss.read_index(os.path.join(root, version, INDEX_FILE))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def sweep(dimension):
+    """Configurations to compare; each search knob is swept from fast to accurate."""
+    pq_m = next(m for m in (16, 8, 4, 2, 1) if dimension % m == 0)
+    configs = [{"index_type": "flat"}]
+    configs += [{"index_type": "ivf_flat", "nprobe": n} for n in (1, 4, 16, 64)]
+    configs += [{"index_type": "hnsw", "ef_search": ef} for ef in (16, 64, 256)]
+    configs += [{"index_type": "ivf_pq", "pq_m": pq_m, "nprobe": n} for n in (4, 16, 64)]
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-index", help="Directory of a published index to read vectors from")
+    parser.add_argument("--count", type=int, default=50000, help="Synthetic corpus size")
+    parser.add_argument("--dimension", type=int, default=384, help="Synthetic vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("-k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--as-json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if args.from_index:
+        vectors = published_vectors(args.from_index)
+    else:
+        vectors = synthetic_vectors(args.count, args.dimension)
+
+    # Queries are perturbed corpus vectors, so each has true near neighbours
+    rng = np.random.default_rng(1)
+    sample = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = sample + 0.05 * rng.normal(size=sample.shape).astype(np.float32)
+
+    results = benchmark_indexes(vectors, queries, k=args.k, configs=sweep(vectors.shape[1]))
+    if args.as_json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    print(f"{'config':<32} {'built as':<14} {'recall':>7} {'mean ms':>8} {'p95 ms':>8} {'build s':>8} {'MB':>8}")
+    for result in results:
+        knobs = ", ".join(f"{key}={value}" for key, value in result.items()
+                          if key in ("nprobe", "ef_search", "pq_m"))
+        label = result["index_type"] + (f" ({knobs})" if knobs else "")
+        print(f"{label:<32} {result['built_as']:<14} {result['recall_at_k']:>7.3f} "
+              f"{result['mean_ms']:>8.3f} {result['p95_ms']:>8.3f} {result['build_seconds']:>8.2f} "
+              f"{result['size_bytes'] / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
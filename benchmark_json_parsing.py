@@ -0,0 +1,175 @@
+"""
+Parse-cost and salvage-rate benchmark for structured model outputs.
+
+Compares the previous multi-pass salvage (fence stripping, prefix stripping,
+then `json.loads` on every non-greedy `{...}` regex match) with the
+single-pass extractor in src/utils/json_extract.py. Responses are either
+recorded model outputs or synthetic variants of a learning path (clean,
+fenced, wrapped in prose, trailing commas, truncated).
+
+    python benchmark_json_parsing.py
+    python benchmark_json_parsing.py --samples recorded_responses/ --repeat 200
+
+A samples directory holds one raw response per *.txt file, or *.jsonl files
+with a "response" field per line.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+from src.utils.json_extract import JSONExtractionError, parse_json_response
+
+
+def legacy_parse(text):
+    """The salvage chain previously used by generate_structured_response."""
+    try:
+        if "```json" in text:
+            start = text.find("```json") + 7
+            json_str = text[start:text.find("```", start)].strip()
+        elif "```" in text:
+            start = text.find("```") + 3
+            json_str = text[start:text.find("```", start)].strip()
+        else:
+            json_str = text.strip()
+        return json.loads(json_str)
+    except Exception:
+        cleaned = text.strip()
+        for prefix in ["+", "-", "*", "#", "Response:", "JSON:"]:
+            if cleaned.startswith(prefix):
+                cleaned = cleaned[len(prefix):].strip()
+        try:
+            return json.loads(cleaned)
+        except Exception:
+            for candidate in re.findall(r'\{.*?\}', text, re.DOTALL):
+                try:
+                    return json.loads(candidate)
+                except Exception:
+                    continue
+    return None
+
+
+def new_parse(text):
+    try:
+        return parse_json_response(text, expect=dict)[0]
+    except JSONExtractionError:
+        return None
+
+
+def synthetic_responses(milestones=8):
+    """Learning-path-shaped responses in the formats models actually return."""
+    path = {
+        "title": "Machine Learning Learning Path",
+        "description": "A structured path from fundamentals to deployment. " * 4,
+        "topic": "Machine Learning",
+        "expertise_level": "beginner",
+        "learning_style": "visual",
+        "time_commitment": "moderate",
+        "duration_weeks": milestones,
+        "goals": ["Understand core algorithms", "Ship a model {end to end}"],
+        "milestones": [
+            {
+                "title": f"Milestone {i + 1}",
+                "description": f"Week {i + 1}: topics, exercises and a project. " * 3,
+                "estimated_hours": 10,
+                "resources": [
+                    {"name": f"Course {i}", "url": f"https://example.com/{i}", "type": "video"},
+                    {"name": f"Guide {i}", "url": f"https://example.com/g{i}", "type": "article"},
+                ],
+                "skills_gained": ["Python", "NumPy", "Model evaluation"],
+            }
+            for i in range(milestones)
+        ],
+        "prerequisites": ["Basic Python"],
+        "total_hours": 10 * milestones,
+    }
+    body = json.dumps(path, indent=2)
+    trailing = body.replace('"video"\n', '"video",\n').replace("]\n}", "],\n}")
+    return {
+        "clean": body,
+        "fenced": f"```json\n{body}\n```",
+        "prose": f"Here is your learning path:\n\n```json\n{body}\n```\n\nLet me know if you need changes!",
+        "unfenced_prose": f"Sure! {body} Hope this helps.",
+        "trailing_commas": f"```json\n{trailing}\n```",
+        "truncated": body[: int(len(body) * 0.8)],
+    }
+
+
+def load_samples(directory):
+    samples = {}
+    for file_path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        with open(file_path) as f:
+            samples[os.path.basename(file_path)] = f.read()
+    for file_path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        with open(file_path) as f:
+            for n, line in enumerate(f):
+                if line.strip():
+                    samples[f"{os.path.basename(file_path)}:{n}"] = json.loads(line)["response"]
+    if not samples:
+        sys.exit(f"No *.txt or *.jsonl samples found in {directory}")
+    return samples
+
+
+def measure(parse, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        value = parse(text)
+    return (time.perf_counter() - start) / repeat * 1e6, value
+
+
+def is_salvaged(value):
+    """A response counts as salvaged when it yields a path-like dict."""
+    return isinstance(value, dict) and "milestones" in value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", help="Directory of recorded model responses")
+    parser.add_argument("--milestones", type=int, default=8, help="Milestones per synthetic path")
+    parser.add_argument("--repeat", type=int, default=100, help="Parses per sample")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples) if args.samples else synthetic_responses(args.milestones)
+    rows = []
+    for name, text in samples.items():
+        legacy_us, legacy_value = measure(legacy_parse, text, args.repeat)
+        new_us, new_value = measure(new_parse, text, args.repeat)
+        rows.append({
+            "sample": name,
+            "chars": len(text),
+            "legacy_us": round(legacy_us, 1),
+            "legacy_ok": is_salvaged(legacy_value),
+            "new_us": round(new_us, 1),
+            "new_ok": is_salvaged(new_value),
+        })
+
+    summary = {
+        "samples": len(rows),
+        "legacy_salvage_rate": sum(r["legacy_ok"] for r in rows) / len(rows),
+        "new_salvage_rate": sum(r["new_ok"] for r in rows) / len(rows),
+        "legacy_total_us": round(sum(r["legacy_us"] for r in rows), 1),
+        "new_total_us": round(sum(r["new_us"] for r in rows), 1),
+    }
+    if args.json:
+        print(json.dumps({"results": rows, "summary": summary}, indent=2))
+        return
+
+    print(f"{'sample':<24}{'chars':>8}{'legacy us':>12}{'ok':>5}{'new us':>10}{'ok':>5}")
+    for r in rows:
+        print(f"{r['sample'][:23]:<24}{r['chars']:>8}{r['legacy_us']:>12.1f}{str(r['legacy_ok'])[0]:>5}"
+              f"{r['new_us']:>10.1f}{str(r['new_ok'])[0]:>5}")
+    print(f"\nsalvage rate: legacy {summary['legacy_salvage_rate']:.0%}, new {summary['new_salvage_rate']:.0%}")
+    print(f"total parse time: legacy {summary['legacy_total_us']:.1f} us, new {summary['new_total_us']:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,12 @@ export FLASK_APP=web_app.app
 echo "Running database migrations..."
 flask db upgrade
 
+# Background jobs run in their own, supervised process; gunicorn workers only
+# queue them. The default SQLite queue lives on this host's disk, so the worker
+# runs next to gunicorn (worker.sh restarts it if it dies).
+echo "Starting job worker..."
+bash worker.sh &
+
 # Start the Gunicorn server
 # This is the main web server that will serve the Flask application.
 # We bind to 0.0.0.0 to make it accessible from outside the container.
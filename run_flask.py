@@ -20,4 +20,8 @@ app = create_app()
 
 if __name__ == "__main__":
     print("Starting Flask application...")
+    # With the reloader, only the child process that serves requests runs jobs
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        from web_app.jobs import start_job_workers
+        start_job_workers(app)
     app.run(debug=True, port=5000)
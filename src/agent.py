@@ -8,12 +8,17 @@ import json
 import datetime
 from pathlib import Path
 print("--- src/agent.py initial imports done ---")
-from src.learning_path import LearningPathGenerator, LearningPath
+from src.learning_path import LearningPath
 print("--- src/agent.py learning_path imported ---")
-from src.ml.model_orchestrator import ModelOrchestrator
-from src.data.vector_store import VectorStore
-from src.data.document_store import DocumentStore
+from src.data.retrieval import search_sources
+from src.utils.registry import (
+    get_document_store,
+    get_learning_path_generator,
+    get_model_orchestrator,
+    get_vector_store,
+)
 from src.utils.config import (
+    AGENT_CONTEXT_MAX_ITEMS,
     LEARNING_STYLES,
     EXPERTISE_LEVELS,
     TIME_COMMITMENTS,
@@ -31,10 +36,11 @@ class LearningAgent:
             api_key: Optional OpenAI API key
         """
         self.api_key = api_key
-        self.path_generator = LearningPathGenerator(api_key)
-        self.model_orchestrator = ModelOrchestrator(api_key)
-        self.document_store = DocumentStore()
-        self.vector_store = VectorStore(api_key)
+        # Heavy components are shared process-wide through the registry
+        self.path_generator = get_learning_path_generator(api_key)
+        self.model_orchestrator = get_model_orchestrator(api_key=api_key)
+        self.document_store = get_document_store()
+        self.vector_store = get_vector_store(api_key)
         print("--- LearningAgent.__init__: All components initialized ---")
         
         # Track agent state
@@ -55,6 +61,11 @@ class LearningAgent:
         """
         Load initial knowledge documents into the vector store.
         """
+        # The vector store is shared; another component may have loaded it already
+        if self.vector_store.vector_store is not None:
+            print("--- LearningAgent._load_initial_knowledge: vector store already loaded ---")
+            return
+
         # Create vector store directory if it doesn't exist
         vector_db_path = Path("vector_db")
         documents_dir = vector_db_path / "documents"
@@ -102,24 +113,20 @@ class LearningAgent:
         # Get the AI provider from the request (if specified)
         ai_provider = request.get("ai_provider")
         
-        # Create provider-specific instances if provider is specified
+        # Use the shared provider-specific orchestrator if a provider is specified;
+        # path generation receives the provider and resolves its own orchestrator
         if ai_provider:
-            provider_orchestrator = ModelOrchestrator(self.api_key, provider=ai_provider)
-            provider_path_generator = LearningPathGenerator(self.api_key)
-            provider_path_generator.model_orchestrator = provider_orchestrator
-            
-            use_orchestrator = provider_orchestrator
-            use_path_generator = provider_path_generator
+            use_orchestrator = get_model_orchestrator(ai_provider, api_key=self.api_key)
         else:
             use_orchestrator = self.model_orchestrator
-            use_path_generator = self.path_generator
+        use_path_generator = self.path_generator
         
         # Get relevant context using RAG
         query = request.get("query", "")
         if query:
             relevant_docs = self.vector_store.search(query)
             context = [doc["content"] for doc in relevant_docs]
-            self.context.extend(context)
+            self._add_context(context)
             
             # Update user profile with preferences from context
             self._update_user_profile(context)
@@ -132,7 +139,7 @@ class LearningAgent:
         request_type = request.get("type", "generate_path")
         
         # Add context to the request
-        request["context"] = self.context
+        request["context"] = list(self.context)
         
         if request_type == "generate_path":
             return self._handle_path_generation(request, use_path_generator)
@@ -196,7 +203,9 @@ class LearningAgent:
                 time_commitment=time_commitment,
                 goals=goals,
                 additional_info=additional_info,
-                context=context
+                context=context,
+                ai_provider=request.get("ai_provider"),
+                ai_model=request.get("ai_model"),
             )
             
             # Save the generated path
@@ -363,23 +372,18 @@ class LearningAgent:
                 topic = context.get("topic")
             elif 'learning_path' in locals() and learning_path:
                 topic = learning_path.topic
-            if topic:
-                docs = self.document_store.search_documents(
-                    query=question,
-                    filters={"topic": topic} if topic else None,
-                    top_k=3
-                )
-                for doc in docs:
-                    context_data.append(doc.page_content)
-            
-            # Get relevant context using RAG
-            try:
-                relevant_docs = self.vector_store.search(question)
-                if relevant_docs:
-                    for doc in relevant_docs:
-                        context_data.append(doc["content"])
-            except Exception as e:
-                print(f"Warning: Error searching vector store: {str(e)}")
+            # Query both stores with one embedding of the question (RAG context)
+            sources = search_sources(
+                [question],
+                document_store=self.document_store if topic else None,
+                vector_store=self.vector_store,
+                filters={"topic": topic} if topic else None,
+                top_k=3
+            )
+            for doc in sources["documents"][0]:
+                context_data.append(doc.page_content)
+            for doc in sources["vectors"][0]:
+                context_data.append(doc["content"])
             
             # Use the provided model orchestrator or fall back to the default
             current_orchestrator = orchestrator or self.model_orchestrator
@@ -431,17 +435,35 @@ class LearningAgent:
                 self.goal = "Assist the user with their learning journey"
         
         # Update context with relevant information
-        if topic and topic not in self.context:
-            self.context.append(f"Current topic: {topic}")
+        if topic:
+            self._add_context([f"Current topic: {topic}"])
             
         # Track user preferences
         expertise_level = request.get("expertise_level")
         if expertise_level:
-            self.context.append(f"User expertise level: {expertise_level}")
+            self._add_context([f"User expertise level: {expertise_level}"])
             
         learning_style = request.get("learning_style")
         if learning_style:
-            self.context.append(f"User learning style: {learning_style}")
+            self._add_context([f"User learning style: {learning_style}"])
+    
+    def _add_context(self, items: List[str]) -> None:
+        """
+        Add context strings, keeping the context bounded.
+        
+        A repeated string moves to the end instead of being stored twice, and
+        only the AGENT_CONTEXT_MAX_ITEMS most recent strings are kept (none
+        when it is 0).
+        
+        Args:
+            items: Context strings to add
+        """
+        for item in items:
+            if item in self.context:
+                self.context.remove(item)
+            self.context.append(item)
+        # context[:-0] would be empty and delete nothing, so trim by count
+        del self.context[:max(len(self.context) - max(AGENT_CONTEXT_MAX_ITEMS, 0), 0)]
     
     def _update_user_profile(self, context: List[str]) -> None:
         """
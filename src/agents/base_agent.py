@@ -3,12 +3,12 @@ Base class for all autonomous learning agents
 """
 from typing import List, Dict, Any, Optional
 import abc
+import os
 from datetime import datetime
 import json
 
 from src.utils.config import OPENAI_API_KEY
-from src.ml.model_orchestrator import ModelOrchestrator
-from src.data.vector_store import VectorStore
+from src.utils.registry import get_model_orchestrator, get_vector_store
 
 class BaseAgent(abc.ABC):
     """
@@ -27,19 +27,20 @@ class BaseAgent(abc.ABC):
             if not self.api_key:
                 print("Warning: No API key provided. Some features may not work correctly.")
                 
-            # Initialize model orchestrator
-            self.model_orchestrator = ModelOrchestrator(api_key=self.api_key)
+            # Shared model orchestrator
+            self.model_orchestrator = get_model_orchestrator(api_key=self.api_key)
             
-            # Initialize vector store with error handling
-            self.vector_store = VectorStore(api_key=self.api_key)
-            try:
-                # Try to load documents from the default directory
-                docs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'vector_db', 'documents')
-                self.vector_store.load_documents(docs_dir)
-            except Exception as e:
-                print(f"Warning: Could not load documents: {str(e)}")
-                # Fall back to minimal vector store
-                self.vector_store._create_minimal_vector_store()
+            # Shared vector store, loaded by the first agent that needs it
+            self.vector_store = get_vector_store(api_key=self.api_key)
+            if self.vector_store.vector_store is None:
+                try:
+                    # Try to load documents from the default directory
+                    docs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'vector_db', 'documents')
+                    self.vector_store.load_documents(docs_dir)
+                except Exception as e:
+                    print(f"Warning: Could not load documents: {str(e)}")
+                    # Fall back to minimal vector store
+                    self.vector_store._create_minimal_vector_store()
                 
             self.memory = []
             self.goals = []
@@ -57,7 +58,7 @@ class BaseAgent(abc.ABC):
             
             # Try to create a minimal vector store
             try:
-                self.vector_store = VectorStore(api_key=self.api_key)
+                self.vector_store = get_vector_store(api_key=self.api_key)
                 self.vector_store._create_minimal_vector_store()
             except:
                 print("Warning: Could not initialize vector store. Some features may not work.")
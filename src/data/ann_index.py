@@ -0,0 +1,342 @@
+"""
+Approximate nearest-neighbour FAISS index construction and tuning.
+
+LangChain's `FAISS.from_documents` always builds an exact `IndexFlatL2`, whose
+search cost grows linearly with the corpus. This module builds the index type
+selected by `VECTOR_INDEX_TYPE` instead:
+
+- ``flat``: exact brute-force search (ground truth, best for small corpora)
+- ``ivf_flat``: inverted lists over k-means cells; searches `nprobe` cells
+- ``hnsw``: graph-based search tuned by `efSearch` (no training, no deletes)
+- ``ivf_pq``: inverted lists with product-quantized vectors (smallest memory)
+
+Trained types are trained on a random sample of the vectors. Corpora too small
+to train them fall back to ``flat``; `needs_rebuild` tells when a corpus has
+outgrown the type or IVF cell count it was built with. `benchmark_indexes` measures recall and
+latency of each option against the flat ground truth (see benchmark_ann.py).
+"""
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.config import (
+    VECTOR_INDEX_EF_CONSTRUCTION,
+    VECTOR_INDEX_EF_SEARCH,
+    VECTOR_INDEX_HNSW_M,
+    VECTOR_INDEX_NLIST,
+    VECTOR_INDEX_NPROBE,
+    VECTOR_INDEX_PQ_M,
+    VECTOR_INDEX_TRAIN_SAMPLE,
+    VECTOR_INDEX_TYPE,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+# k-means wants roughly this many training points per cell
+MIN_POINTS_PER_CELL = 39
+# 8-bit PQ codebooks need at least 256 training points
+PQ_MIN_TRAIN = 256
+# Retrain an IVF index once the corpus wants this many times more (or fewer) cells
+NLIST_REBUILD_FACTOR = 2
+
+
+def default_params() -> Dict[str, Any]:
+    """
+    Return the index parameters configured in the environment.
+
+    Returns:
+        Dictionary of build and search parameters
+    """
+    return {
+        "nlist": VECTOR_INDEX_NLIST,
+        "nprobe": VECTOR_INDEX_NPROBE,
+        "hnsw_m": VECTOR_INDEX_HNSW_M,
+        "ef_construction": VECTOR_INDEX_EF_CONSTRUCTION,
+        "ef_search": VECTOR_INDEX_EF_SEARCH,
+        "pq_m": VECTOR_INDEX_PQ_M,
+        "train_sample": VECTOR_INDEX_TRAIN_SAMPLE,
+    }
+
+
+def build_settings(index_type: str = VECTOR_INDEX_TYPE, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Return the parameters that change the built index (not search-time knobs).
+
+    Used in the index manifest so changing them triggers a rebuild.
+
+    Args:
+        index_type: Requested index type
+        params: Index parameters (defaults to the environment)
+
+    Returns:
+        Dictionary of build-time settings
+    """
+    params = {**default_params(), **(params or {})}
+    return {
+        "index_type": index_type,
+        "nlist": params["nlist"],
+        "hnsw_m": params["hnsw_m"],
+        "pq_m": params["pq_m"],
+    }
+
+
+def auto_nlist(count: int) -> int:
+    """
+    Pick a number of IVF cells for a corpus size (about 4 * sqrt(N)).
+
+    Args:
+        count: Number of vectors
+
+    Returns:
+        Number of cells, at least 1
+    """
+    return max(1, min(int(4 * math.sqrt(count)), count // MIN_POINTS_PER_CELL))
+
+
+def resolve_index_type(index_type: str, count: int, dimension: int, params: Dict[str, Any]) -> str:
+    """
+    Return the index type that can actually be built for a corpus.
+
+    Args:
+        index_type: Requested index type
+        count: Number of vectors
+        dimension: Vector dimension
+        params: Index parameters
+
+    Returns:
+        `index_type`, or 'flat' if the corpus is too small to train it
+
+    Raises:
+        ValueError: If the index type or PQ configuration is invalid
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector index type '{index_type}'. Use one of {', '.join(INDEX_TYPES)}")
+    if index_type == "ivf_pq" and dimension % params["pq_m"] != 0:
+        raise ValueError(f"pq_m={params['pq_m']} must divide the embedding dimension {dimension}")
+
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = params["nlist"] or auto_nlist(count)
+        minimum = max(nlist * MIN_POINTS_PER_CELL, PQ_MIN_TRAIN if index_type == "ivf_pq" else 0)
+        if count < minimum:
+            logger.info("%s vectors are too few to train %s; using flat", count, index_type)
+            return "flat"
+    return index_type
+
+
+def build_index(vectors: np.ndarray, index_type: str = VECTOR_INDEX_TYPE,
+                params: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Build and train an empty FAISS index for the given vectors.
+
+    The vectors are only used for training; add them afterwards (LangChain's
+    `FAISS.add_embeddings` does so while keeping the docstore in sync).
+
+    Args:
+        vectors: float32 array of shape (N, dimension)
+        index_type: One of INDEX_TYPES
+        params: Index parameters (defaults to the environment)
+
+    Returns:
+        Trained, empty FAISS index using L2 distance
+    """
+    import faiss
+
+    params = {**default_params(), **(params or {})}
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dimension = vectors.shape
+    index_type = resolve_index_type(index_type, count, dimension, params)
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dimension)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, params["hnsw_m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+        set_search_params(index, params)
+        return index
+
+    nlist = params["nlist"] or auto_nlist(count)
+    quantizer = faiss.IndexFlatL2(dimension)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, params["pq_m"], 8)
+
+    sample = vectors
+    if count > params["train_sample"]:
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(count, params["train_sample"], replace=False)]
+    started = time.perf_counter()
+    index.train(sample)
+    logger.info("Trained %s (nlist=%s) on %s vectors in %.1fs",
+                index_type, nlist, len(sample), time.perf_counter() - started)
+    set_search_params(index, params)
+    return index
+
+
+def set_search_params(index: Any, params: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Apply search-time parameters (`nprobe` for IVF, `efSearch` for HNSW).
+
+    Args:
+        index: FAISS index
+        params: Index parameters (defaults to the environment)
+    """
+    import faiss
+
+    params = {**default_params(), **(params or {})}
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = min(params["nprobe"], ivf.nlist)
+        return
+    except RuntimeError:
+        pass
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = params["ef_search"]
+
+
+def supports_delete(index: Any) -> bool:
+    """
+    Whether LangChain's `FAISS.delete` can remove vectors from the index.
+
+    `FAISS.delete` renumbers the docstore mapping on the assumption that
+    `remove_ids` shifts later rows down, which only flat indexes do. IVF
+    indexes keep their original ids (so the mapping would point at the wrong
+    chunks) and HNSW graphs cannot remove vectors at all.
+
+    Args:
+        index: FAISS index
+
+    Returns:
+        True for flat indexes
+    """
+    import faiss
+
+    return isinstance(index, faiss.IndexFlat)
+
+
+def index_layout(index: Any) -> Dict[str, Any]:
+    """
+    Describe the index type actually built (small corpora fall back to flat).
+
+    Args:
+        index: FAISS index
+
+    Returns:
+        Dictionary with 'index_type' and, for IVF indexes, 'nlist'
+    """
+    import faiss
+
+    if getattr(index, "hnsw", None) is not None:
+        return {"index_type": "hnsw"}
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return {"index_type": "flat"}
+    index_type = "ivf_pq" if isinstance(ivf, faiss.IndexIVFPQ) else "ivf_flat"
+    return {"index_type": index_type, "nlist": int(ivf.nlist)}
+
+
+def needs_rebuild(layout: Dict[str, Any], count: int, dimension: int,
+                  index_type: str = VECTOR_INDEX_TYPE, params: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Whether an index built with `layout` no longer suits the corpus size.
+
+    A corpus that started too small to train the requested type grows out of
+    its flat fallback (or shrinks back into it), and IVF cells chosen for the
+    first corpus become too coarse or too fine as it grows or shrinks by more
+    than NLIST_REBUILD_FACTOR.
+
+    Args:
+        layout: Output of `index_layout` for the current index
+        count: Number of vectors after the update
+        dimension: Vector dimension
+        index_type: Requested index type
+        params: Index parameters (defaults to the environment)
+
+    Returns:
+        True if the index should be rebuilt
+    """
+    params = {**default_params(), **(params or {})}
+    target = resolve_index_type(index_type, count, dimension, params)
+    if target != layout.get("index_type"):
+        return True
+    if target not in ("ivf_flat", "ivf_pq"):
+        return False
+    wanted = params["nlist"] or auto_nlist(count)
+    built = layout.get("nlist") or 0
+    return not built or max(wanted, built) >= NLIST_REBUILD_FACTOR * min(wanted, built)
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    """
+    Fraction of the true k nearest neighbours that a search returned.
+
+    Args:
+        truth: (queries, k) ids from exact search
+        found: (queries, k) ids from the approximate search
+
+    Returns:
+        Mean recall@k in [0, 1]
+    """
+    if truth.size == 0:
+        return 1.0
+    hits = sum(len(set(t[t >= 0]) & set(f[f >= 0])) for t, f in zip(truth, found))
+    return hits / float(truth.size)
+
+
+def benchmark_indexes(vectors: np.ndarray, queries: np.ndarray, k: int = 10,
+                      configs: Optional[Sequence[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Compare index configurations against exact flat search.
+
+    Args:
+        vectors: float32 corpus of shape (N, dimension)
+        queries: float32 queries of shape (Q, dimension)
+        k: Neighbours per query
+        configs: Dictionaries with 'index_type' plus parameter overrides;
+            defaults to every index type with the environment's parameters
+
+    Returns:
+        One result per config with build time, recall@k, mean and p95 query
+        latency in milliseconds and index size in bytes
+    """
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    results = []
+    for config in configs or [{"index_type": t} for t in INDEX_TYPES]:
+        params = {key: value for key, value in config.items() if key != "index_type"}
+        started = time.perf_counter()
+        index = build_index(vectors, config["index_type"], params)
+        index.add(vectors)
+        build_seconds = time.perf_counter() - started
+
+        latencies = []
+        found = np.empty_like(truth)
+        for row, query in enumerate(queries):
+            started = time.perf_counter()
+            _, ids = index.search(query.reshape(1, -1), k)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found[row] = ids[0]
+
+        results.append({
+            **config,
+            "built_as": type(index).__name__,
+            "build_seconds": round(build_seconds, 3),
+            "recall_at_k": round(recall_at_k(truth, found), 4),
+            "mean_ms": round(float(np.mean(latencies)), 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+            "size_bytes": int(faiss.serialize_index(index).size),
+        })
+    return results
@@ -2,16 +2,39 @@
 Vector database interface for the AI Learning Path Generator.
 Handles document storage, retrieval, and semantic search.
 """
+import hashlib
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
 from langchain_core.documents import Document
 
+from src.data.keyword_index import RRF_K, KeywordIndex, reciprocal_rank_fusion
+from src.data.retrieval_cache import get_retrieval_cache
 from src.utils.config import VECTOR_DB_PATH, OPENAI_API_KEY
+from src.ml.embedding_providers import (
+    collection_suffix,
+    complete_query_embeddings,
+    embedding_model_name,
+    get_embedding_function,
+)
+from src.utils.registry import get_chroma_client
+
+def content_id(content: str) -> str:
+    """
+    Build a stable document ID from the document content.
+
+    The same text always maps to the same ID in every process, so
+    re-ingesting a corpus updates documents instead of duplicating them.
+
+    Args:
+        content: Document content
+
+    Returns:
+        ID of the form 'doc_<first 32 hex chars of the SHA-256>'
+    """
+    return f"doc_{hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]}"
+
 
 class DocumentStore:
     """
@@ -32,30 +55,24 @@ class DocumentStore:
         os.makedirs(self.db_path, exist_ok=True)
         print(f"--- DocumentStore.__init__: Ensured directory exists: {self.db_path} ---")
         
-        print("--- DocumentStore.__init__: Initializing chromadb.PersistentClient ---")
-        # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(
-            path=self.db_path,
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
-        )
-        print("--- DocumentStore.__init__: chromadb.PersistentClient initialized ---")
-        
-        # Set up OpenAI embedding function
-        print(f"--- DocumentStore.__init__: Initializing OpenAIEmbeddings with model: text-embedding-ada-002 ---")
-        print(f"--- DocumentStore.__init__: Initializing OpenAIEmbeddingFunction (model: text-embedding-ada-002, API key starts with: {str(OPENAI_API_KEY)[:15]}...) ---")
-        self.embedding_function = embedding_functions.OpenAIEmbeddingFunction(
-            api_key=OPENAI_API_KEY,
-            model_name="text-embedding-ada-002"
-        )
-        print("--- DocumentStore.__init__: OpenAIEmbeddingFunction initialized ---")
+        print("--- DocumentStore.__init__: Getting shared chromadb.PersistentClient ---")
+        # One ChromaDB client per database path, shared across the process
+        self.client = get_chroma_client(self.db_path)
+        print("--- DocumentStore.__init__: chromadb.PersistentClient ready ---")
+        
+        # Set up the embedding function (OpenAI or local, per EMBEDDING_PROVIDER),
+        # read through the shared embedding cache
+        print(f"--- DocumentStore.__init__: Initializing embedding function (model: {embedding_model_name()}) ---")
+        self.embedding_model = embedding_model_name()
+        self.embedding_function = get_embedding_function(OPENAI_API_KEY)
+        # Collections of other embedding models (other dimensions) are kept apart
+        self.collection_suffix = collection_suffix()
+        print("--- DocumentStore.__init__: Embedding function initialized ---")
         
         # Create or get the collections
         print("--- DocumentStore.__init__: Getting/creating 'learning_resources' collection ---")
         self.resources_collection = self.client.get_or_create_collection(
-            name="learning_resources",
+            name=self._collection_name("learning_resources"),
             embedding_function=self.embedding_function,
             metadata={"description": "Educational resources and materials"}
         )
@@ -63,12 +80,35 @@ class DocumentStore:
         
         print("--- DocumentStore.__init__: Getting/creating 'learning_paths' collection ---")
         self.paths_collection = self.client.get_or_create_collection(
-            name="learning_paths",
+            name=self._collection_name("learning_paths"),
             embedding_function=self.embedding_function,
             metadata={"description": "Generated learning paths"}
         )
         print("--- DocumentStore.__init__: 'learning_paths' collection obtained ---")
+
+        # BM25 keyword index for hybrid search, kept in sync with the collections
+        try:
+            self.keyword_index = KeywordIndex(os.path.join(self.db_path, "keyword_index.sqlite3"))
+        except Exception as e:
+            print(f"Warning: Keyword index unavailable, hybrid search will be semantic only: {str(e)}")
+            self.keyword_index = None
+        self._keyword_synced = set()
+
+        # Search results are cached until the next write to the collection
+        self.retrieval_cache = get_retrieval_cache()
         print("--- DocumentStore.__init__ finished ---")
+
+    def _collection_name(self, collection_name: str) -> str:
+        """Return the Chroma collection name for the configured embedding model."""
+        return f"{collection_name}{self.collection_suffix}"
+
+    def _cache_namespace(self, collection_name: str) -> str:
+        return f"chroma:{self.db_path}:{self._collection_name(collection_name)}"
+
+    def _invalidate(self, collection_name: str) -> None:
+        """Invalidate cached search results after a write to a collection."""
+        if self.retrieval_cache is not None:
+            self.retrieval_cache.bump(self._cache_namespace(collection_name))
     
     def add_document(
         self,
@@ -89,21 +129,23 @@ class DocumentStore:
         Returns:
             ID of the added document
         """
-        # Generate a document ID if not provided
-        doc_id = document_id or f"doc_{len(content) % 10000}_{hash(content) % 1000000}"
+        # Content-derived ID unless one is provided
+        doc_id = document_id or content_id(content)
         
         # Get the appropriate collection
         collection = self.client.get_or_create_collection(
-            name=collection_name,
+            name=self._collection_name(collection_name),
             embedding_function=self.embedding_function
         )
         
-        # Add the document
-        collection.add(
+        # Insert or update, so adding the same document again is a no-op
+        collection.upsert(
             documents=[content],
             metadatas=[metadata],
             ids=[doc_id]
         )
+        self._index_keywords(collection_name, [doc_id], [content], [metadata])
+        self._invalidate(collection_name)
         
         return doc_id
     
@@ -120,33 +162,45 @@ class DocumentStore:
             collection_name: Name of the collection to add to
             
         Returns:
-            List of document IDs
+            List of document IDs (one per input document; identical contents
+            share an ID)
         """
         if not documents:
             return []
         
         # Get the appropriate collection
         collection = self.client.get_or_create_collection(
-            name=collection_name,
+            name=self._collection_name(collection_name),
             embedding_function=self.embedding_function
         )
         
-        # Prepare document data
-        contents = [doc.page_content for doc in documents]
-        metadatas = [doc.metadata for doc in documents]
-        ids = [f"doc_{i}_{hash(doc.page_content) % 1000000}" for i, doc in enumerate(documents)]
+        # Content-derived IDs; duplicates within the batch are stored once
+        all_ids = [content_id(doc.page_content) for doc in documents]
+        unique = {}
+        for doc_id, doc in zip(all_ids, documents):
+            unique.setdefault(doc_id, doc)
+        ids = list(unique)
+        contents = [doc.page_content for doc in unique.values()]
+        metadatas = [doc.metadata for doc in unique.values()]
         
-        # Add documents in batches (ChromaDB has limits)
+        # Embed everything up front: the embedding function batches by token
+        # budget and runs requests concurrently, instead of one request per add
+        embeddings = self.embedding_function(contents)
+        
+        # Upsert documents in batches (ChromaDB has limits)
         batch_size = 100
-        for i in range(0, len(documents), batch_size):
-            batch_end = min(i + batch_size, len(documents))
-            collection.add(
+        for i in range(0, len(ids), batch_size):
+            batch_end = min(i + batch_size, len(ids))
+            collection.upsert(
                 documents=contents[i:batch_end],
+                embeddings=embeddings[i:batch_end],
                 metadatas=metadatas[i:batch_end],
                 ids=ids[i:batch_end]
             )
+        self._index_keywords(collection_name, ids, contents, metadatas)
+        self._invalidate(collection_name)
         
-        return ids
+        return all_ids
     
     def search_documents(
         self,
@@ -167,15 +221,133 @@ class DocumentStore:
         Returns:
             List of relevant Document objects
         """
+        return self.search_many([query], collection_name, filters, top_k)[0]
+
+    def search_many(
+        self,
+        queries: List[str],
+        collection_name: str = "learning_resources",
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 5,
+        query_embeddings: Optional[List[List[float]]] = None
+    ) -> List[List[Document]]:
+        """
+        Search for several queries with one embedding call and one Chroma query.
+        
+        Args:
+            queries: Search queries
+            collection_name: Collection to search in
+            filters: Optional metadata filters (applied to every query)
+            top_k: Number of results per query
+            query_embeddings: Optional precomputed query embeddings from the
+                same embedding model (see `embedding_model`); None entries
+                are embedded here
+            
+        Returns:
+            One list of relevant Document objects per query
+        """
+        return [
+            [doc for _, doc in results]
+            for results in self._semantic_search(queries, collection_name, filters, top_k, query_embeddings)
+        ]
+
+    def cached_queries(
+        self,
+        queries: List[str],
+        collection_name: str = "learning_resources",
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 5
+    ) -> List[bool]:
+        """
+        Tell which searches `search_many` can answer without embedding the query.
+
+        Args:
+            queries: Search queries
+            collection_name: Collection to search in
+            filters: Optional metadata filters
+            top_k: Number of results per query
+
+        Returns:
+            One flag per query
+        """
+        if self.retrieval_cache is None:
+            return [False for _ in queries]
+        try:
+            keys = self._cache_keys(queries, collection_name, filters, top_k)
+        except Exception:
+            return [False for _ in queries]
+        return [self.retrieval_cache.contains(key) for key in keys]
+
+    def _cache_keys(
+        self,
+        queries: List[str],
+        collection_name: str,
+        filters: Optional[Dict[str, Any]],
+        top_k: int
+    ) -> List[Any]:
+        """Build the retrieval cache keys of searches in a collection."""
+        # Writes from other processes show up as a new keyword index data version
+        external_version = self.keyword_index.data_version() if self.keyword_index is not None else None
+        namespace = self._cache_namespace(collection_name)
+        return [
+            self.retrieval_cache.make_key(namespace, query, filters, top_k, external_version)
+            for query in queries
+        ]
+
+    def _semantic_search(
+        self,
+        queries: List[str],
+        collection_name: str,
+        filters: Optional[Dict[str, Any]],
+        top_k: int,
+        query_embeddings: Optional[List[List[float]]] = None
+    ) -> List[List[Tuple[str, Document]]]:
+        """Run a batched vector query through the retrieval cache (failures are not cached)."""
+        def compute(missing: List[int]) -> List[List[Tuple[str, Document]]]:
+            return self._query_collection(
+                [queries[i] for i in missing],
+                collection_name,
+                filters,
+                top_k,
+                [query_embeddings[i] for i in missing] if query_embeddings is not None else None
+            )
+        
+        try:
+            if not queries or self.retrieval_cache is None:
+                return compute(list(range(len(queries))))
+            keys = self._cache_keys(queries, collection_name, filters, top_k)
+            return self.retrieval_cache.get_many(keys, compute)
+        except Exception as e:
+            # Search failed
+            print(f"Warning: Document search failed: {str(e)}")
+            return [[] for _ in queries]
+
+    def _query_collection(
+        self,
+        queries: List[str],
+        collection_name: str,
+        filters: Optional[Dict[str, Any]],
+        top_k: int,
+        query_embeddings: Optional[List[List[float]]] = None
+    ) -> List[List[Tuple[str, Document]]]:
+        """
+        Run a batched vector query; return (document ID, Document) pairs per query, best first.
+
+        Raises:
+            Exception: If embedding or querying fails
+        """
+        if not queries:
+            return []
+        
         # Get the collection
         try:
             collection = self.client.get_collection(
-                name=collection_name,
+                name=self._collection_name(collection_name),
                 embedding_function=self.embedding_function
             )
         except Exception:
             # Collection doesn't exist
-            return []
+            return [[] for _ in queries]
         
         # Prepare filter if provided
         where = {}
@@ -187,33 +359,35 @@ class DocumentStore:
                 else:
                     where[key] = value
         
-        # Execute the search
-        try:
-            result = collection.query(
-                query_texts=[query],
-                n_results=top_k,
-                where=where if where else None
-            )
-        except Exception:
-            # Search failed
-            return []
+        # Execute the search: embed the remaining queries in one batch, then query once
+        query_embeddings = complete_query_embeddings(self.embedding_function, queries, query_embeddings)
+        result = collection.query(
+            query_embeddings=[list(embedding) for embedding in query_embeddings],
+            n_results=top_k,
+            where=where if where else None
+        )
         
         # Convert results to Document objects
-        documents = []
-        if result and result.get("documents"):
-            for i, content in enumerate(result["documents"][0]):
-                metadata = result["metadatas"][0][i] if result.get("metadatas") and result["metadatas"][0] else {}
-                distance = result["distances"][0][i] if result.get("distances") and result["distances"][0] else 1.0
-                
-                # Add relevance score to metadata
-                metadata["relevance_score"] = 1.0 - (distance / 2.0)  # Convert distance to relevance (0-1)
-                
-                documents.append(Document(
-                    page_content=content,
-                    metadata=metadata
-                ))
-        
-        return documents
+        all_documents = []
+        for q in range(len(queries)):
+            documents = []
+            if result and result.get("documents") and q < len(result["documents"]):
+                metadatas = result["metadatas"][q] if result.get("metadatas") else None
+                distances = result["distances"][q] if result.get("distances") else None
+                for i, content in enumerate(result["documents"][q]):
+                    metadata = dict(metadatas[i] or {}) if metadatas else {}
+                    distance = distances[i] if distances else 1.0
+                    
+                    # Add relevance score to metadata
+                    metadata["relevance_score"] = 1.0 - (distance / 2.0)  # Convert distance to relevance (0-1)
+                    
+                    documents.append((result["ids"][q][i], Document(
+                        page_content=content,
+                        metadata=metadata
+                    )))
+            all_documents.append(documents)
+        
+        return all_documents
     
     def hybrid_search(
         self,
@@ -224,6 +398,10 @@ class DocumentStore:
     ) -> List[Document]:
         """
         Perform hybrid search combining semantic and keyword matching.
+
+        The semantic (vector) and keyword (BM25) rankings are merged with
+        reciprocal rank fusion. Both legs are index lookups, so latency does
+        not grow with the collection size.
         
         Args:
             query: Search query
@@ -232,77 +410,84 @@ class DocumentStore:
             top_k: Number of results to return
             
         Returns:
-            List of relevant Document objects
+            List of relevant Document objects; metadata carries the fused
+            'relevance_score' (0-1)
         """
-        # First, get semantic search results
-        semantic_results = self.search_documents(
-            query=query,
-            collection_name=collection_name,
-            filters=filters,
-            top_k=top_k * 2  # Get more results for reranking
-        )
+        # Get more candidates than needed from each leg for fusion
+        candidates = top_k * 2
+        semantic_results = self._semantic_search([query], collection_name, filters, candidates)[0]
+        
+        keyword_results = []
+        if self.keyword_index is not None:
+            try:
+                self._sync_keyword_index(collection_name)
+                keyword_results = self.keyword_index.search(
+                    self._collection_name(collection_name), query, candidates, filters
+                )
+            except Exception as e:
+                # Keyword search failed, continue with semantic results only
+                print(f"Warning: Keyword search failed: {str(e)}")
         
-        # Prepare keyword results for simple matching
-        keyword_docs = []
+        documents = {doc_id: doc for doc_id, doc in semantic_results}
+        for hit in keyword_results:
+            documents.setdefault(hit["id"], Document(page_content=hit["content"], metadata=hit["metadata"]))
+        
+        fused = reciprocal_rank_fusion([
+            [doc_id for doc_id, _ in semantic_results],
+            [hit["id"] for hit in keyword_results],
+        ])
+        # Normalise so a document ranked first by both legs scores 1.0
+        best_possible = 2.0 / (RRF_K + 1)
+        
+        results = []
+        for doc_id, score in fused[:top_k]:
+            doc = documents[doc_id]
+            results.append(Document(
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "relevance_score": score / best_possible}
+            ))
+        return results
+
+    def _index_keywords(
+        self,
+        collection_name: str,
+        ids: List[str],
+        contents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """Add documents to the keyword index (failures never block the vector write)."""
+        if self.keyword_index is None:
+            return
         try:
-            # Get all documents matching the filters
-            collection = self.client.get_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function
-            )
-            
-            # Prepare filter for keyword search
-            where = {}
-            if filters:
-                where.update(filters)
-            
-            # Get documents matching the filter
-            result = collection.get(where=where if where else None)
-            
-            if result and result.get("documents"):
-                # Simple keyword matching
-                query_terms = set(query.lower().split())
-                
-                for i, content in enumerate(result["documents"]):
-                    # Count matching terms in content
-                    content_lower = content.lower()
-                    match_count = sum(1 for term in query_terms if term in content_lower)
-                    
-                    if match_count > 0:
-                        metadata = result["metadatas"][i] if result.get("metadatas") else {}
-                        # Score based on ratio of matching terms
-                        metadata["relevance_score"] = match_count / len(query_terms)
-                        
-                        keyword_docs.append(Document(
-                            page_content=content,
-                            metadata=metadata
-                        ))
+            self.keyword_index.add(self._collection_name(collection_name), ids, contents, metadatas)
+        except Exception as e:
+            print(f"Warning: Failed to update keyword index: {str(e)}")
+
+    def _sync_keyword_index(self, collection_name: str, page_size: int = 500) -> None:
+        """
+        Backfill the keyword index once for collections indexed before it existed.
+
+        Args:
+            collection_name: Collection to check
+            page_size: Documents fetched per page
+        """
+        name = self._collection_name(collection_name)
+        if name in self._keyword_synced:
+            return
+        try:
+            collection = self.client.get_collection(name=name, embedding_function=self.embedding_function)
         except Exception:
-            # Keyword search failed, continue with semantic results only
-            pass
-        
-        # Combine results, removing duplicates
-        all_docs = {}
-        
-        # Add semantic results
-        for doc in semantic_results:
-            doc_key = hash(doc.page_content)
-            all_docs[doc_key] = doc
-        
-        # Add keyword results that don't duplicate semantic results
-        for doc in keyword_docs:
-            doc_key = hash(doc.page_content)
-            if doc_key not in all_docs:
-                all_docs[doc_key] = doc
-        
-        # Sort by relevance score and return top_k
-        sorted_docs = sorted(
-            all_docs.values(),
-            key=lambda x: x.metadata.get("relevance_score", 0),
-            reverse=True
-        )
+            # Collection doesn't exist
+            self._keyword_synced.add(name)
+            return
         
-        return sorted_docs[:top_k]
+        total = collection.count()
+        if total and self.keyword_index.count(name) < total:
+            print(f"Backfilling keyword index for '{name}' ({total} documents)")
+            for offset in range(0, total, page_size):
+                page = collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+                self.keyword_index.add(name, page["ids"], page["documents"], page["metadatas"])
+        self._keyword_synced.add(name)
     
     def delete_document(
         self,
@@ -321,11 +506,14 @@ class DocumentStore:
         """
         try:
             collection = self.client.get_collection(
-                name=collection_name,
+                name=self._collection_name(collection_name),
                 embedding_function=self.embedding_function
             )
             
             collection.delete(ids=[document_id])
+            if self.keyword_index is not None:
+                self.keyword_index.delete(self._collection_name(collection_name), [document_id])
+            self._invalidate(collection_name)
             return True
         except Exception:
             return False
@@ -341,11 +529,103 @@ class DocumentStore:
             Success status
         """
         try:
-            self.client.delete_collection(collection_name)
+            self.client.delete_collection(self._collection_name(collection_name))
             self.client.get_or_create_collection(
-                name=collection_name,
+                name=self._collection_name(collection_name),
                 embedding_function=self.embedding_function
             )
+            if self.keyword_index is not None:
+                self.keyword_index.clear(self._collection_name(collection_name))
+            self._invalidate(collection_name)
             return True
         except Exception:
             return False
+
+    def compact_collection(
+        self,
+        collection_name: str = "learning_resources",
+        dry_run: bool = False,
+        page_size: int = 500
+    ) -> Dict[str, int]:
+        """
+        Remove duplicate documents and move documents to content-hash IDs.
+
+        Documents stored before IDs were content-derived may exist several
+        times under different IDs. Each distinct content is kept once under
+        its `content_id`, reusing the stored embedding and the metadata of the
+        first copy; every other copy is deleted.
+
+        Args:
+            collection_name: Collection to compact
+            dry_run: Only report what would change
+            page_size: Documents fetched per page
+
+        Returns:
+            Counts of 'scanned', 'unique', 'migrated' and 'removed' documents
+        """
+        stats = {"scanned": 0, "unique": 0, "migrated": 0, "removed": 0}
+        try:
+            collection = self.client.get_collection(
+                name=self._collection_name(collection_name),
+                embedding_function=self.embedding_function
+            )
+        except Exception:
+            # Collection doesn't exist
+            return stats
+
+        # Group stored IDs by content hash
+        groups: Dict[str, List[str]] = {}
+        total = collection.count()
+        for offset in range(0, total, page_size):
+            page = collection.get(limit=page_size, offset=offset, include=["documents"])
+            for doc_id, content in zip(page["ids"], page["documents"]):
+                groups.setdefault(content_id(content or ""), []).append(doc_id)
+                stats["scanned"] += 1
+        stats["unique"] = len(groups)
+
+        to_delete = []
+        to_migrate = []
+        for canonical, ids in groups.items():
+            if canonical not in ids:
+                to_migrate.append((canonical, ids[0]))
+            to_delete.extend(doc_id for doc_id in ids if doc_id != canonical)
+        stats["migrated"] = len(to_migrate)
+        stats["removed"] = len(to_delete) - len(to_migrate)
+        if dry_run:
+            return stats
+
+        # Re-store one copy of each migrated content under its canonical ID
+        for i in range(0, len(to_migrate), page_size):
+            batch = to_migrate[i:i + page_size]
+            old = collection.get(
+                ids=[old_id for _, old_id in batch],
+                include=["documents", "metadatas", "embeddings"]
+            )
+            by_id = {
+                doc_id: (content, metadata, embedding)
+                for doc_id, content, metadata, embedding in zip(
+                    old["ids"], old["documents"], old["metadatas"], old["embeddings"]
+                )
+            }
+            new_ids = [canonical for canonical, _ in batch]
+            rows = [by_id[old_id] for _, old_id in batch]
+            collection.upsert(
+                ids=new_ids,
+                documents=[content for content, _, _ in rows],
+                metadatas=[metadata for _, metadata, _ in rows],
+                embeddings=[list(embedding) for _, _, embedding in rows]
+            )
+            self._index_keywords(
+                collection_name, new_ids,
+                [content for content, _, _ in rows],
+                [metadata for _, metadata, _ in rows]
+            )
+
+        for i in range(0, len(to_delete), page_size):
+            batch = to_delete[i:i + page_size]
+            collection.delete(ids=batch)
+            if self.keyword_index is not None:
+                self.keyword_index.delete(self._collection_name(collection_name), batch)
+
+        self._invalidate(collection_name)
+        return stats
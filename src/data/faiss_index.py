@@ -0,0 +1,311 @@
+"""
+Published, memory-mapped FAISS indexes shared across processes.
+
+The indexer publishes each build into its own version directory holding the raw
+FAISS index (`index.faiss`) and a compact JSON docstore sidecar
+(`docstore.json`) instead of LangChain's pickle, then points the `CURRENT` file
+at it with an atomic rename. Readers pick up a new version when `CURRENT`
+changes.
+
+What is shared between processes depends on FAISS: with `IO_FLAG_MMAP_IFC`
+(faiss >= 1.9) the index file contents, including flat codes, are mapped, so
+gunicorn workers share one page-cache copy. Older versions only map the
+inverted lists of IVF indexes (`ivf_flat`, `ivf_pq`); `flat` and `hnsw`
+indexes are then read into each process's own memory. The docstore sidecar
+is always loaded into each process.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.data.ann_index import set_search_params
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.json"
+KEEP_VERSIONS = 2
+
+
+def write_docstore(path: str, ids: List[str], documents: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Write the docstore sidecar.
+
+    Args:
+        path: Destination file
+        ids: Docstore ID of every FAISS row, in row order
+        documents: Mapping of docstore ID to {'page_content', 'metadata'}
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"ids": ids, "documents": documents}, f, separators=(",", ":"))
+
+
+def read_docstore(path: str) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
+    """
+    Read the docstore sidecar.
+
+    Args:
+        path: Sidecar file
+
+    Returns:
+        Tuple of (row-ordered IDs, documents by ID)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["ids"], data["documents"]
+
+
+def current_version(root: str) -> Optional[str]:
+    """
+    Return the name of the published version directory, if any.
+
+    Args:
+        root: Directory containing the published versions
+
+    Returns:
+        Version directory name or None
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    return version if version and os.path.isdir(os.path.join(root, version)) else None
+
+
+def _set_current(root: str, version: str) -> None:
+    tmp_path = os.path.join(root, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def _prune_versions(root: str, keep: int) -> None:
+    versions = sorted(name for name in os.listdir(root) if name.startswith("v") and
+                      os.path.isdir(os.path.join(root, name)))
+    current = current_version(root)
+    for name in versions[:-keep]:
+        if name == current:
+            continue
+        directory = os.path.join(root, name)
+        for filename in os.listdir(directory):
+            os.remove(os.path.join(directory, filename))
+        os.rmdir(directory)
+
+
+def publish_version(root: str, write_files, keep: int = KEEP_VERSIONS) -> str:
+    """
+    Write a new version directory and make it current atomically.
+
+    Readers holding an older version keep their mapping; the previous
+    `keep - 1` versions stay on disk so in-progress opens never see a
+    missing file.
+
+    Args:
+        root: Directory containing the published versions
+        write_files: Callable receiving the new version directory to fill
+        keep: Number of versions to retain
+
+    Returns:
+        Name of the new version
+    """
+    os.makedirs(root, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    directory = os.path.join(root, version)
+    os.makedirs(directory)
+    write_files(directory)
+    _set_current(root, version)
+    _prune_versions(root, keep)
+    return version
+
+
+def publish_index(store: Any, root: str, keep: int = KEEP_VERSIONS) -> str:
+    """
+    Publish a LangChain FAISS store as a new mmap-able version.
+
+    Args:
+        store: langchain_community FAISS vector store
+        root: Directory containing the published versions
+        keep: Number of versions to retain
+
+    Returns:
+        Name of the new version
+    """
+    import faiss
+
+    def write_files(directory: str) -> None:
+        faiss.write_index(store.index, os.path.join(directory, INDEX_FILE))
+        ids = [store.index_to_docstore_id[row] for row in range(len(store.index_to_docstore_id))]
+        documents = {}
+        for doc_id in ids:
+            doc = store.docstore.search(doc_id)
+            documents[doc_id] = {"page_content": doc.page_content, "metadata": doc.metadata}
+        write_docstore(os.path.join(directory, DOCSTORE_FILE), ids, documents)
+
+    version = publish_version(root, write_files, keep)
+    logger.info("Published FAISS index version %s", version)
+    return version
+
+
+def _mmap_flags(faiss: Any) -> List[int]:
+    """Read flags to try in order, strongest mapping first."""
+    flags = []
+    if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        flags.append(faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    flags.append(faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    return flags
+
+
+def is_file_mapped(path: str) -> Optional[bool]:
+    """
+    Whether this process has a file memory-mapped.
+
+    Args:
+        path: File to look for
+
+    Returns:
+        True or False, or None where /proc/self/maps is unavailable
+    """
+    try:
+        with open("/proc/self/maps", "r", encoding="utf-8") as f:
+            maps = f.read()
+    except OSError:
+        return None
+    return os.path.realpath(path) in maps
+
+
+def load_index(root: str, embeddings: Any, version: Optional[str] = None, mmap: bool = True) -> Any:
+    """
+    Open a published index as a LangChain FAISS store.
+
+    With `mmap=True` the index is opened read-only with `IO_FLAG_MMAP_IFC`
+    where FAISS supports it (the whole file is mapped), otherwise with
+    `IO_FLAG_MMAP`, which maps only IVF inverted lists; anything that cannot
+    be mapped is read into memory. The docstore is always loaded in full.
+
+    Args:
+        root: Directory containing the published versions
+        embeddings: Embeddings used for queries
+        version: Version to open (defaults to the current one)
+        mmap: Whether to memory-map the index
+
+    Returns:
+        FAISS vector store
+
+    Raises:
+        FileNotFoundError: If nothing has been published
+    """
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No published FAISS index in {root}")
+    directory = os.path.join(root, version)
+    index_path = os.path.join(directory, INDEX_FILE)
+
+    index = None
+    for flags in (_mmap_flags(faiss) if mmap else []):
+        try:
+            index = faiss.read_index(index_path, flags)
+            break
+        except RuntimeError as e:
+            logger.warning("Cannot memory-map %s with flags %#x (%s)", index_path, flags, e)
+    if index is None:
+        index = faiss.read_index(index_path)
+    if mmap and is_file_mapped(index_path) is False:
+        logger.info(
+            "FAISS index %s is held in process memory (this FAISS build only maps IVF inverted lists)",
+            index_path,
+        )
+    set_search_params(index)
+
+    ids, documents = read_docstore(os.path.join(directory, DOCSTORE_FILE))
+    docstore = InMemoryDocstore({
+        doc_id: Document(page_content=doc["page_content"], metadata=doc["metadata"])
+        for doc_id, doc in documents.items()
+    })
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))
+
+
+class MmapIndexReader:
+    """
+    Holds the current published index and reloads it when a new version appears.
+    """
+    def __init__(self, root: str, embeddings: Any, check_interval: float = 5.0):
+        """
+        Initialize the reader.
+
+        Args:
+            root: Directory containing the published versions
+            embeddings: Embeddings used for queries
+            check_interval: Minimum seconds between checks of the CURRENT pointer
+        """
+        self.root = root
+        self.embeddings = embeddings
+        self.check_interval = check_interval
+        self.version: Optional[str] = None
+        self.store = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, force: bool = False) -> Optional[Any]:
+        """
+        Return the current index, swapping in a newer published version.
+
+        Args:
+            force: Check the CURRENT pointer regardless of `check_interval`
+
+        Returns:
+            FAISS vector store, or None if nothing has been published
+        """
+        now = time.monotonic()
+        if not force and self.store is not None and now - self._checked_at < self.check_interval:
+            return self.store
+
+        with self._lock:
+            self._checked_at = now
+            version = current_version(self.root)
+            if version is not None and version != self.version:
+                try:
+                    self.store = load_index(self.root, self.embeddings, version)
+                    self.version = version
+                    logger.info("Opened FAISS index version %s", version)
+                except Exception as e:
+                    logger.warning("Failed to open FAISS index version %s: %s", version, e)
+            return self.store
+
+
+@contextmanager
+def build_lock(path: str) -> Iterator[None]:
+    """
+    Serialize index builds across processes with an advisory file lock.
+
+    The first worker to start builds and publishes; the others wait and then
+    find the index up to date. Without `fcntl` (Windows) this is a no-op.
+
+    Args:
+        path: Lock file path
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
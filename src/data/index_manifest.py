@@ -0,0 +1,161 @@
+"""
+Content-hash manifest for incremental vector index builds.
+
+The manifest records, for every indexed source file, the SHA-256 of its
+contents and the IDs of the chunks it produced, plus the settings the index
+was built with and the layout (index type, IVF cells) it actually has. Comparing it against the files on disk tells the indexer which
+files were added, modified or deleted, so only those are re-embedded and stale
+chunks can be removed by ID.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Hash a file's contents.
+
+    Args:
+        path: File to hash
+        block_size: Read size in bytes
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_directory(directory: str) -> Dict[str, str]:
+    """
+    Hash every non-hidden file below a directory.
+
+    Args:
+        directory: Root directory of the source documents
+
+    Returns:
+        Mapping of POSIX-style path relative to `directory` to content hash
+    """
+    root = Path(directory)
+    hashes = {}
+    for path in sorted(root.rglob("*")):
+        relative = path.relative_to(root)
+        if not path.is_file() or any(part.startswith(".") for part in relative.parts):
+            continue
+        hashes[relative.as_posix()] = file_sha256(str(path))
+    return hashes
+
+
+def chunk_ids(relative_path: str, sha256: str, count: int) -> List[str]:
+    """
+    Build deterministic IDs for the chunks of a file version.
+
+    Args:
+        relative_path: Path of the source file relative to the documents root
+        sha256: Content hash of the file
+        count: Number of chunks
+
+    Returns:
+        One ID per chunk
+    """
+    return [f"{relative_path}::{sha256[:16]}::{i}" for i in range(count)]
+
+
+class IndexManifest:
+    """
+    Record of which file versions and chunks an index contains.
+    """
+    def __init__(self, path: str, settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the manifest, loading it from disk if it exists.
+
+        Args:
+            path: Location of the manifest JSON file
+            settings: Build settings (model, chunking) the index must match
+        """
+        self.path = path
+        self.settings = settings or {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.layout: Dict[str, Any] = {}
+        self.exists = False
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION and data.get("settings") == self.settings:
+                    self.files = data.get("files", {})
+                    self.layout = data.get("layout", {})
+                    self.exists = True
+            except (OSError, ValueError) as e:
+                print(f"Warning: Ignoring unreadable index manifest {path}: {e}")
+
+    def diff(self, current: Dict[str, str]) -> Dict[str, List[str]]:
+        """
+        Compare the manifest with the files currently on disk.
+
+        Args:
+            current: Output of `scan_directory`
+
+        Returns:
+            Dictionary with 'added', 'modified' and 'deleted' relative paths
+        """
+        return {
+            "added": sorted(p for p in current if p not in self.files),
+            "modified": sorted(
+                p for p, sha in current.items()
+                if p in self.files and self.files[p]["sha256"] != sha
+            ),
+            "deleted": sorted(p for p in self.files if p not in current),
+        }
+
+    def chunk_ids_for(self, paths: List[str]) -> List[str]:
+        """
+        Return the indexed chunk IDs of the given files.
+
+        Args:
+            paths: Relative paths present in the manifest
+
+        Returns:
+            Flat list of chunk IDs
+        """
+        return [cid for p in paths for cid in self.files.get(p, {}).get("chunk_ids", [])]
+
+    def record(self, relative_path: str, sha256: str, ids: List[str]) -> None:
+        """Record the chunks indexed for a file version."""
+        self.files[relative_path] = {"sha256": sha256, "chunk_ids": ids}
+
+    def remove(self, relative_path: str) -> None:
+        """Forget a file."""
+        self.files.pop(relative_path, None)
+
+    def reset(self) -> None:
+        """Forget every file (before a full rebuild)."""
+        self.files = {}
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "settings": self.settings,
+                    "layout": self.layout,
+                    "files": self.files,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.path)
+        self.exists = True
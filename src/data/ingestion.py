@@ -0,0 +1,263 @@
+"""
+Streaming document ingestion into the DocumentStore.
+
+An uploaded file flows through four stages:
+
+    parse (pages / text blocks) -> chunk -> embed (batches) -> upsert
+
+Parsing and chunking are generators running in a producer thread, which
+hands fixed-size chunk batches to the embedding / upsert stage through a
+bounded queue. Memory therefore stays proportional to `batch_size *
+queue_size` chunks regardless of the file size, and parsing the next pages
+overlaps with embedding the current batch. Progress (stage, chunks, chunks/sec)
+is reported after every batch.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".rst", ".csv", ".json", ".html", ".htm"}
+# Text files are read in blocks of about this many characters
+TEXT_BLOCK_CHARS = 64 * 1024
+
+Segment = Tuple[str, Dict[str, Any]]
+
+_DONE = object()
+
+
+class UnsupportedDocumentError(ValueError):
+    """Raised when a document type cannot be read in this environment."""
+
+
+def iter_text_blocks(path: str, block_chars: int = TEXT_BLOCK_CHARS) -> Iterator[Segment]:
+    """
+    Stream a text file in blocks, breaking at paragraph boundaries when possible.
+
+    Args:
+        path: Text file
+        block_chars: Approximate block size in characters
+
+    Yields:
+        (text, metadata) segments
+    """
+    carry = ""
+    block = 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        while True:
+            data = f.read(block_chars)
+            text = carry + data
+            if not data:
+                if text.strip():
+                    yield text, {"block": block}
+                return
+            cut = text.rfind("\n\n")
+            if cut <= 0:
+                cut = text.rfind("\n")
+            if cut <= 0:
+                cut = len(text)
+            carry = text[cut:]
+            if text[:cut].strip():
+                yield text[:cut], {"block": block}
+                block += 1
+
+
+def iter_pdf_pages(path: str) -> Iterator[Segment]:
+    """
+    Stream the text of a PDF page by page.
+
+    Args:
+        path: PDF file
+
+    Yields:
+        (text, metadata) segments with the 1-based page number
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise UnsupportedDocumentError("PDF ingestion requires the 'pypdf' package")
+
+    reader = PdfReader(path)
+    for number, page in enumerate(reader.pages, start=1):
+        text = page.extract_text() or ""
+        if text.strip():
+            yield text, {"page": number}
+
+
+def iter_elements(path: str) -> Iterator[Segment]:
+    """
+    Stream other document types (docx, pptx, ...) through `unstructured`.
+
+    Args:
+        path: Document file
+
+    Yields:
+        (text, metadata) segments, one per document element
+    """
+    try:
+        from unstructured.partition.auto import partition
+    except ImportError:
+        raise UnsupportedDocumentError(f"Unsupported document type: {os.path.splitext(path)[1] or path}")
+
+    for element in partition(filename=path):
+        text = str(element)
+        if text.strip():
+            page = getattr(getattr(element, "metadata", None), "page_number", None)
+            yield text, {"page": page} if page else {}
+
+
+def iter_segments(path: str) -> Iterator[Segment]:
+    """
+    Parse a document lazily into text segments.
+
+    Args:
+        path: Document file
+
+    Returns:
+        Iterator of (text, metadata) segments
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in TEXT_EXTENSIONS:
+        return iter_text_blocks(path)
+    if extension == ".pdf":
+        return iter_pdf_pages(path)
+    return iter_elements(path)
+
+
+def _default_chunker() -> Callable[[str, Optional[Dict[str, Any]]], List[Any]]:
+    from src.ml.embeddings import EmbeddingService
+
+    return EmbeddingService().chunk_text
+
+
+class IngestionPipeline:
+    """
+    Parses, chunks, embeds and upserts a document with bounded memory.
+    """
+    def __init__(
+        self,
+        document_store: Any,
+        chunk_text: Optional[Callable[[str, Optional[Dict[str, Any]]], List[Any]]] = None,
+        collection_name: str = "learning_resources",
+        batch_size: int = 64,
+        queue_size: int = 4,
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            document_store: DocumentStore receiving the chunks
+            chunk_text: Chunker returning Documents (defaults to
+                EmbeddingService.chunk_text)
+            collection_name: Collection to upsert into
+            batch_size: Chunks embedded and upserted per batch
+            queue_size: Batches buffered between the parser and the embedder
+        """
+        self.document_store = document_store
+        self.chunk_text = chunk_text or _default_chunker()
+        self.collection_name = collection_name
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+
+    def iter_batches(self, segments: Iterator[Segment], metadata: Dict[str, Any]) -> Iterator[List[Any]]:
+        """
+        Chunk segments and group the chunks into batches.
+
+        Args:
+            segments: Output of `iter_segments`
+            metadata: Metadata added to every chunk
+
+        Yields:
+            Lists of at most `batch_size` chunk Documents
+        """
+        batch: List[Any] = []
+        for text, segment_metadata in segments:
+            for chunk in self.chunk_text(text, {**metadata, **segment_metadata}):
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def run(
+        self,
+        path: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        progress: Optional[Callable[..., None]] = None,
+        check_cancelled: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ingest a document.
+
+        Args:
+            path: Document file
+            metadata: Metadata added to every chunk (the file name is added
+                as 'source')
+            progress: Called with keyword progress fields after every batch
+            check_cancelled: Called between batches; raises to stop ingestion
+
+        Returns:
+            Summary with chunk, batch and unique document counts, elapsed
+            seconds and chunks_per_sec
+        """
+        metadata = {"source": os.path.basename(path), **(metadata or {})}
+        report = progress or (lambda **fields: None)
+        batches: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def produce() -> None:
+            try:
+                for batch in self.iter_batches(iter_segments(path), metadata):
+                    while not stop.is_set():
+                        try:
+                            batches.put(batch, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+                batches.put(_DONE)
+            except BaseException as e:  # surfaced to the consumer
+                batches.put(e)
+
+        started = time.monotonic()
+        stats = {"file": metadata["source"], "chunks": 0, "batches": 0, "documents": 0}
+        document_ids = set()
+        report(stage="parsing", **stats, chunks_per_sec=0.0)
+
+        producer = threading.Thread(target=produce, name="ingest-parse", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                if check_cancelled is not None:
+                    check_cancelled()
+
+                # add_documents embeds the batch and upserts it under content IDs
+                document_ids.update(self.document_store.add_documents(item, collection_name=self.collection_name))
+
+                elapsed = time.monotonic() - started
+                stats["chunks"] += len(item)
+                stats["batches"] += 1
+                stats["documents"] = len(document_ids)
+                report(stage="embedding", **stats, chunks_per_sec=round(stats["chunks"] / max(elapsed, 1e-6), 2))
+        finally:
+            stop.set()
+            producer.join(timeout=5)
+
+        elapsed = time.monotonic() - started
+        stats["seconds"] = round(elapsed, 3)
+        stats["chunks_per_sec"] = round(stats["chunks"] / max(elapsed, 1e-6), 2)
+        report(stage="done", **stats)
+        logger.info("Ingested %s: %s chunks in %.1fs (%.1f chunks/sec)",
+                    stats["file"], stats["chunks"], elapsed, stats["chunks_per_sec"])
+        return stats
@@ -0,0 +1,238 @@
+"""
+Persistent BM25 keyword index for hybrid search.
+
+Documents are kept in a SQLite table with an external-content FTS5 index
+(porter-stemmed, unicode tokenizer) maintained by triggers, so keyword search
+is an index lookup ranked by `bm25()` instead of a scan over every document.
+Metadata is stored as JSON so the same equality / `$in`-style filters used for
+Chroma can be applied in SQL. `reciprocal_rank_fusion` merges the keyword and
+semantic rankings.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Standard RRF damping constant (Cormack et al.)
+RRF_K = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    UNIQUE (collection, doc_id)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    content, content='documents', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    INSERT INTO documents_fts(rowid, content) VALUES (new.id, new.content);
+END;
+"""
+
+_METADATA_KEY = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+def fts_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 query matching any of its terms.
+
+    Each term is quoted so punctuation and FTS operators in user input are
+    treated literally.
+
+    Args:
+        text: Search text
+
+    Returns:
+        FTS5 MATCH expression, or '' if the text has no terms
+    """
+    terms = dict.fromkeys(re.findall(r"\w+", text.lower()))
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    k: int = RRF_K,
+    weights: Optional[Sequence[float]] = None,
+) -> List[Tuple[str, float]]:
+    """
+    Fuse several rankings of document IDs.
+
+    Each document scores sum(weight / (k + rank)) over the rankings it appears
+    in, so agreement between rankers matters more than raw scores, which are
+    not comparable between BM25 and cosine similarity.
+
+    Args:
+        rankings: Lists of document IDs, best first
+        k: Damping constant
+        weights: Optional weight per ranking (defaults to 1.0 each)
+
+    Returns:
+        (document ID, fused score) pairs, best first
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class KeywordIndex:
+    """
+    SQLite FTS5 BM25 index partitioned by collection.
+    """
+    def __init__(self, db_path: str):
+        """
+        Initialize the index.
+
+        Args:
+            db_path: Path of the SQLite database file
+
+        Raises:
+            sqlite3.OperationalError: If SQLite was built without FTS5
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def add(
+        self,
+        collection: str,
+        ids: Sequence[str],
+        contents: Sequence[str],
+        metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+    ) -> None:
+        """
+        Insert or replace documents.
+
+        Args:
+            collection: Collection name
+            ids: Document IDs
+            contents: Document texts
+            metadatas: Optional metadata per document
+        """
+        metadatas = metadatas or [None] * len(ids)
+        rows = [
+            (collection, doc_id, content, json.dumps(metadata or {}, default=str))
+            for doc_id, content, metadata in zip(ids, contents, metadatas)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO documents (collection, doc_id, content, metadata) VALUES (?, ?, ?, ?)
+                ON CONFLICT(collection, doc_id) DO UPDATE SET
+                    content = excluded.content, metadata = excluded.metadata
+                """,
+                rows,
+            )
+
+    def delete(self, collection: str, ids: Sequence[str]) -> None:
+        """
+        Remove documents.
+
+        Args:
+            collection: Collection name
+            ids: Document IDs
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM documents WHERE collection = ? AND doc_id = ?",
+                [(collection, doc_id) for doc_id in ids],
+            )
+
+    def clear(self, collection: str) -> None:
+        """Remove every document of a collection."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents WHERE collection = ?", (collection,))
+
+    def count(self, collection: str) -> int:
+        """Return the number of documents in a collection."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM documents WHERE collection = ?", (collection,)
+            ).fetchone()
+        return row[0]
+
+    def data_version(self) -> int:
+        """
+        Return a value that changes whenever another process commits a write.
+
+        Combined with an in-process counter it invalidates cached search
+        results across workers.
+        """
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def search(
+        self,
+        collection: str,
+        query: str,
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank a collection's documents against a query with BM25.
+
+        Args:
+            collection: Collection name
+            query: Search text
+            top_k: Number of results
+            filters: Optional metadata filters; list values match any element
+
+        Returns:
+            Dictionaries with 'id', 'content', 'metadata' and 'score'
+            (higher is better), best first
+        """
+        match = fts_query(query)
+        if not match or top_k <= 0:
+            return []
+
+        sql = [
+            "SELECT d.doc_id, d.content, d.metadata, bm25(documents_fts) AS rank",
+            "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid",
+            "WHERE documents_fts MATCH ? AND d.collection = ?",
+        ]
+        params: List[Any] = [match, collection]
+        for key, value in (filters or {}).items():
+            if not _METADATA_KEY.match(key):
+                raise ValueError(f"Unsupported metadata filter key: {key}")
+            if isinstance(value, (list, tuple)):
+                if not value:
+                    return []
+                sql.append(f"AND json_extract(d.metadata, '$.{key}') IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                sql.append(f"AND json_extract(d.metadata, '$.{key}') = ?")
+                params.append(value)
+        sql.append("ORDER BY rank LIMIT ?")
+        params.append(top_k)
+
+        with self._lock:
+            rows = self._conn.execute(" ".join(sql), params).fetchall()
+        # bm25() is lower-is-better; negate it so scores sort like similarities
+        return [
+            {"id": doc_id, "content": content, "metadata": json.loads(metadata), "score": -rank}
+            for doc_id, content, metadata, rank in rows
+        ]
@@ -0,0 +1,345 @@
+"""
+Indexed storage for generated learning paths.
+
+Paths used to be written as one pretty-printed JSON file each and found again
+by globbing the directory and parsing candidates. The repository keeps them
+in a single SQLite table keyed on the path ID instead, so a lookup is one
+primary-key read. Payloads are compact JSON compressed with zlib, and
+recently loaded paths are kept hydrated in a bounded LRU so repeated
+questions about the same path skip decoding and validation.
+
+Every save bumps the row's `version`. Cached paths are served without a query
+while `PRAGMA data_version` shows no commit from another process; after one,
+each entry is checked against its row's version before it is served again,
+so a path modified by another worker is never served stale.
+
+`import_directory` migrates the legacy per-file layout; it runs automatically
+the first time an empty repository is opened next to existing JSON files.
+"""
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from src.utils.config import PATH_REPOSITORY_CACHE_SIZE
+from src.utils.registry import shared_instance
+
+logger = logging.getLogger(__name__)
+
+DB_FILENAME = "paths.sqlite3"
+# Full UUIDs; shorter IDs are treated as prefixes like the legacy file lookup
+_FULL_ID_LENGTH = 36
+
+
+_UPSERT = """
+    INSERT INTO paths (id, topic, created_at, data) VALUES (?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        topic = excluded.topic,
+        created_at = excluded.created_at,
+        data = excluded.data,
+        version = paths.version + 1
+"""
+
+
+def encode_path(data: Dict[str, Any]) -> bytes:
+    """
+    Serialise a path to compressed compact JSON.
+
+    Args:
+        data: Path dictionary
+
+    Returns:
+        zlib-compressed UTF-8 JSON
+    """
+    return zlib.compress(json.dumps(data, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def decode_path(blob: bytes) -> Dict[str, Any]:
+    """
+    Inverse of `encode_path`.
+
+    Args:
+        blob: Stored payload
+
+    Returns:
+        Path dictionary
+    """
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class _CachedPath:
+    """A hydrated path and the row version it was read at."""
+    __slots__ = ("path_id", "version", "checked", "path")
+
+    def __init__(self, path_id: str, version: int, checked: int, path: Any):
+        self.path_id = path_id
+        self.version = version
+        self.checked = checked
+        self.path = path
+
+
+class PathRepository:
+    """
+    SQLite-backed learning path store with an LRU of hydrated paths.
+    """
+    def __init__(
+        self,
+        db_path: str,
+        model: Optional[Callable[..., Any]] = None,
+        cache_size: int = PATH_REPOSITORY_CACHE_SIZE,
+    ):
+        """
+        Initialize the repository.
+
+        Args:
+            db_path: Path of the SQLite database file
+            model: Callable building a path object from its dictionary
+                (e.g. the LearningPath model); plain dictionaries if omitted
+            cache_size: Number of hydrated paths kept in memory
+        """
+        self.db_path = db_path
+        self.model = model
+        self.cache_size = max(0, cache_size)
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, _CachedPath]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Local writes; a read that raced one is not cached
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS paths (
+                id TEXT PRIMARY KEY,
+                topic TEXT NOT NULL,
+                created_at TEXT,
+                data BLOB NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(paths)")}
+        if "version" not in columns:
+            self._conn.execute("ALTER TABLE paths ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_paths_created_at ON paths (created_at)")
+        self._conn.commit()
+
+    def _hydrate(self, data: Dict[str, Any]) -> Any:
+        return self.model(**data) if self.model else data
+
+    def _data_version(self) -> int:
+        # Changes whenever another connection commits; caller holds the lock
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _forget(self, path_id: str) -> None:
+        """Drop cached entries for a path, including those under an ID prefix."""
+        for key in [key for key, entry in self._cache.items() if entry.path_id == path_id]:
+            del self._cache[key]
+
+    def _remember(self, key: str, entry: _CachedPath) -> None:
+        if not self.cache_size:
+            return
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _cached(self, key: str) -> Optional[_CachedPath]:
+        """Return a cache entry if it still matches the database; caller holds the lock."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        data_version = self._data_version()
+        if entry.checked != data_version:
+            row = self._conn.execute("SELECT version FROM paths WHERE id = ?", (entry.path_id,)).fetchone()
+            if row is None or row[0] != entry.version:
+                del self._cache[key]
+                return None
+            entry.checked = data_version
+        self._cache.move_to_end(key)
+        return entry
+
+    def save(self, data: Dict[str, Any], path: Any = None) -> str:
+        """
+        Insert or replace a path.
+
+        Args:
+            data: Path dictionary (must contain 'id')
+            path: Already hydrated object for the LRU (built from `data` if omitted)
+
+        Returns:
+            The path ID
+        """
+        path_id = data["id"]
+        # Cache a private copy so later changes to the caller's object don't leak in
+        cached = copy.deepcopy(path) if path is not None else self._hydrate(data)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    _UPSERT, (path_id, data.get("topic") or "", data.get("created_at"), encode_path(data))
+                )
+                version = self._conn.execute("SELECT version FROM paths WHERE id = ?", (path_id,)).fetchone()[0]
+            self._writes += 1
+            self._forget(path_id)
+            self._remember(path_id, _CachedPath(path_id, version, self._data_version(), cached))
+        return path_id
+
+    def get(self, path_id: str) -> Optional[Any]:
+        """
+        Load a path by ID (or, for IDs shorter than a UUID, by ID prefix).
+
+        Args:
+            path_id: Path ID
+
+        Returns:
+            A copy of the hydrated path, or None if not found
+        """
+        with self._lock:
+            entry = self._cached(path_id)
+            if entry is not None:
+                self.hits += 1
+                return copy.deepcopy(entry.path)
+            self.misses += 1
+            writes = self._writes
+            data_version = self._data_version()
+            row = self._conn.execute("SELECT id, version, data FROM paths WHERE id = ?", (path_id,)).fetchone()
+            if row is None and path_id and len(path_id) < _FULL_ID_LENGTH:
+                # Range scan on the primary key; '\uffff' sorts after any ID character
+                row = self._conn.execute(
+                    "SELECT id, version, data FROM paths WHERE id >= ? AND id < ? ORDER BY id LIMIT 1",
+                    (path_id, path_id + "\uffff"),
+                ).fetchone()
+        if row is None:
+            return None
+
+        try:
+            path = self._hydrate(decode_path(row[2]))
+        except Exception as e:
+            logger.warning("Could not load learning path %s: %s", row[0], e)
+            return None
+        with self._lock:
+            if writes == self._writes:
+                self._remember(path_id, _CachedPath(row[0], row[1], data_version, path))
+        return copy.deepcopy(path)
+
+    def delete(self, path_id: str) -> bool:
+        """
+        Remove a path.
+
+        Args:
+            path_id: Path ID
+
+        Returns:
+            True if a path was removed
+        """
+        with self._lock:
+            self._writes += 1
+            self._forget(path_id)
+            with self._conn:
+                cursor = self._conn.execute("DELETE FROM paths WHERE id = ?", (path_id,))
+        return cursor.rowcount > 0
+
+    def count(self) -> int:
+        """Return the number of stored paths."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM paths").fetchone()[0]
+
+    def list_ids(self, limit: int = 100, offset: int = 0) -> List[str]:
+        """Return stored path IDs, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM paths ORDER BY created_at DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def import_directory(self, directory: str, remove: bool = False) -> Dict[str, int]:
+        """
+        Migrate legacy `<topic>_<id8>.json` files into the repository.
+
+        Args:
+            directory: Directory holding the JSON files
+            remove: Delete each file once it has been imported
+
+        Returns:
+            Counts of files 'scanned', 'imported' and 'failed'
+        """
+        stats = {"scanned": 0, "imported": 0, "failed": 0}
+        batch = []
+
+        def flush():
+            with self._lock, self._conn:
+                self._conn.executemany(_UPSERT, [row for row, _ in batch])
+            if remove:
+                for _, file_path in batch:
+                    file_path.unlink()
+            batch.clear()
+
+        for file_path in sorted(Path(directory).glob("*.json")):
+            stats["scanned"] += 1
+            try:
+                with open(file_path, "r") as f:
+                    data = json.load(f)
+                if self.model:
+                    # Validate before importing; invalid files are left in place
+                    data = self.model(**data).dict()
+                batch.append(((data["id"], data.get("topic") or "", data.get("created_at"), encode_path(data)), file_path))
+            except Exception as e:
+                logger.warning("Skipping %s: %s", file_path, e)
+                stats["failed"] += 1
+                continue
+            stats["imported"] += 1
+            if len(batch) >= 500:
+                flush()
+        if batch:
+            flush()
+        with self._lock:
+            self._writes += 1
+            self._cache.clear()
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return repository statistics.
+
+        Returns:
+            Dictionary with paths, cached, hits and misses
+        """
+        with self._lock:
+            cached = len(self._cache)
+        return {"paths": self.count(), "cached": cached, "hits": self.hits, "misses": self.misses}
+
+
+def get_path_repository(directory: str = "learning_paths", model: Optional[Callable[..., Any]] = None) -> PathRepository:
+    """
+    Return the shared repository stored in a directory.
+
+    On first use, legacy JSON files in the directory are imported if the
+    repository is empty.
+
+    Args:
+        directory: Directory holding the repository database
+        model: Callable building path objects from dictionaries
+
+    Returns:
+        A PathRepository instance
+    """
+    directory = os.path.abspath(directory)
+
+    def build():
+        repository = PathRepository(os.path.join(directory, DB_FILENAME), model=model)
+        if repository.count() == 0 and any(Path(directory).glob("*.json")):
+            stats = repository.import_directory(directory)
+            logger.info("Imported legacy learning paths from %s: %s", directory, stats)
+        return repository
+
+    return shared_instance(("path_repository", directory, model), build)
@@ -6,7 +6,7 @@ from typing import List, Dict, Any, Optional
 import json
 from pathlib import Path
 
-from src.ml.model_orchestrator import ModelOrchestrator
+from src.utils.registry import get_model_orchestrator
 from src.utils.helpers import difficulty_to_score
 from src.utils.config import RESOURCE_TYPES, LEARNING_STYLES
 
@@ -21,7 +21,7 @@ class ResourceManager:
         Args:
             api_key: Optional OpenAI API key
         """
-        self.model_orchestrator = ModelOrchestrator(api_key)
+        self.model_orchestrator = get_model_orchestrator(api_key=api_key)
         self.cached_resources = {}
     
     def recommend_resources(
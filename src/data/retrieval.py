@@ -0,0 +1,123 @@
+"""
+Multi-source retrieval for RAG context.
+
+`search_sources` embeds every query once and searches the Chroma
+DocumentStore and the FAISS VectorStore with those embeddings (concurrently by
+default), so gathering context from both stores costs a single embedding
+round trip instead of one per store and query. Queries whose results both
+stores already hold in the retrieval cache are not embedded at all.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from src.ml.embedding_providers import embed_queries as _embed
+
+logger = logging.getLogger(__name__)
+
+
+def embed_queries(queries: List[str], document_store: Any = None, vector_store: Any = None) -> Optional[List[List[float]]]:
+    """
+    Embed queries once for both stores when they use the same embedding model.
+
+    Args:
+        queries: Search queries
+        document_store: Optional DocumentStore
+        vector_store: Optional VectorStore
+
+    Returns:
+        One embedding per query, or None if the stores use different models
+        (or embedding failed) and must embed for themselves
+    """
+    if vector_store is not None and document_store is not None:
+        if vector_store.embedding_model != document_store.embedding_model:
+            return None
+    try:
+        if vector_store is not None:
+            return _embed(vector_store.embeddings, queries)
+        if document_store is not None:
+            return _embed(document_store.embedding_function, queries)
+    except Exception as e:
+        logger.warning("Batch query embedding failed; stores will embed separately: %s", e)
+    return None
+
+
+def _cached(store: Any, queries: List[str], **options: Any) -> List[bool]:
+    """Which queries a store can answer from its retrieval cache (none if it cannot tell)."""
+    try:
+        return [bool(flag) for flag in store.cached_queries(queries, **options)]
+    except Exception:
+        return [False] * len(queries)
+
+
+def search_sources(
+    queries: List[str],
+    document_store: Any = None,
+    vector_store: Any = None,
+    filters: Optional[Dict[str, Any]] = None,
+    top_k: int = 5,
+    k: int = 4,
+    concurrent: bool = True,
+) -> Dict[str, List[List[Any]]]:
+    """
+    Search the document store and vector store for several queries at once.
+
+    Args:
+        queries: Search queries
+        document_store: Optional DocumentStore (Chroma)
+        vector_store: Optional VectorStore (FAISS)
+        filters: Optional metadata filters for the document store
+        top_k: Results per query from the document store
+        k: Results per query from the vector store
+        concurrent: Search both stores in parallel
+
+    Returns:
+        Dictionary with 'documents' (Document lists from the document store)
+        and 'vectors' (result dicts from the vector store), one list per query
+    """
+    results = {"documents": [[] for _ in queries], "vectors": [[] for _ in queries]}
+    if not queries:
+        return results
+
+    # Embed only the queries some store cannot answer from the retrieval cache
+    cached = [True] * len(queries)
+    if document_store is not None:
+        cached = [a and b for a, b in zip(cached, _cached(document_store, queries, filters=filters, top_k=top_k))]
+    if vector_store is not None:
+        cached = [a and b for a, b in zip(cached, _cached(vector_store, queries, k=k))]
+    misses = [i for i, hit in enumerate(cached) if not hit]
+
+    query_embeddings: Optional[List[Optional[List[float]]]] = [None] * len(queries)
+    if misses:
+        embedded = embed_queries([queries[i] for i in misses], document_store, vector_store)
+        if embedded is None:
+            query_embeddings = None
+        else:
+            for i, vector in zip(misses, embedded):
+                query_embeddings[i] = vector
+
+    searches = {}
+    if document_store is not None:
+        searches["documents"] = lambda: document_store.search_many(
+            queries, filters=filters, top_k=top_k, query_embeddings=query_embeddings
+        )
+    if vector_store is not None:
+        searches["vectors"] = lambda: vector_store.search_many(
+            queries, k=k, query_embeddings=query_embeddings
+        )
+
+    if concurrent and len(searches) > 1:
+        with ThreadPoolExecutor(max_workers=len(searches)) as executor:
+            futures = {name: executor.submit(search) for name, search in searches.items()}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.warning("Search of %s failed: %s", name, e)
+    else:
+        for name, search in searches.items():
+            try:
+                results[name] = search()
+            except Exception as e:
+                logger.warning("Search of %s failed: %s", name, e)
+    return results
@@ -0,0 +1,200 @@
+"""
+In-memory cache of retrieval results with version-based invalidation.
+
+Entries are keyed on (collection, normalised query, filters, top_k,
+collection version). Every write through DocumentStore / VectorStore bumps the
+collection's version, so entries computed before the write can never be
+returned again; they simply age out of the bounded LRU. Stores may add an
+external version component (e.g. a counter shared between processes) so
+writes made by other workers invalidate too.
+"""
+import copy
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from src.utils.config import RETRIEVAL_CACHE_ENABLED, RETRIEVAL_CACHE_MAX_ENTRIES
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalise a query for cache lookups (case and whitespace).
+
+    Args:
+        query: Search query
+
+    Returns:
+        Lower-cased query with collapsed whitespace
+    """
+    return " ".join(query.lower().split())
+
+
+class RetrievalCache:
+    """
+    Bounded LRU cache of search results with per-collection versions.
+    """
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached result lists
+        """
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, collection: str) -> int:
+        """Return the current version of a collection."""
+        with self._lock:
+            return self._versions.get(collection, 0)
+
+    def bump(self, collection: str) -> None:
+        """Invalidate a collection's cached results (call after every write)."""
+        with self._lock:
+            self._versions[collection] = self._versions.get(collection, 0) + 1
+
+    def make_key(
+        self,
+        collection: str,
+        query: str,
+        filters: Optional[Dict[str, Any]],
+        top_k: int,
+        external_version: Hashable = None,
+    ) -> Tuple:
+        """
+        Build the cache key for a search.
+
+        Args:
+            collection: Collection (or index) searched
+            query: Search query
+            filters: Metadata filters
+            top_k: Number of results
+            external_version: Extra version component supplied by the store
+
+        Returns:
+            Hashable key
+        """
+        return (
+            collection,
+            normalize_query(query),
+            json.dumps(filters or {}, sort_keys=True, default=str),
+            top_k,
+            self.version(collection),
+            external_version,
+        )
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up results.
+
+        Args:
+            key: Key from `make_key`
+
+        Returns:
+            A copy of the cached results, or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = self._entries[key]
+        # Callers may modify returned documents and metadata
+        return copy.deepcopy(value)
+
+    def contains(self, key: Hashable) -> bool:
+        """
+        Whether results are cached for a key (not counted as a hit or miss).
+
+        Args:
+            key: Key from `make_key`
+
+        Returns:
+            True if `get` would currently return results
+        """
+        with self._lock:
+            return key in self._entries
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store results.
+
+        Args:
+            key: Key from `make_key`
+            value: Search results
+        """
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_many(self, keys: Sequence[Hashable], compute: Callable[[List[int]], List[Any]]) -> List[Any]:
+        """
+        Look up several searches, computing all misses in one call.
+
+        Args:
+            keys: One key per search
+            compute: Called with the indices of the missing searches; returns
+                their results in the same order
+
+        Returns:
+            One result per key
+        """
+        results = [self.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            for i, value in zip(missing, compute(missing)):
+                self.set(keys[i], value)
+                results[i] = value
+        return results
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return cache statistics.
+
+        Returns:
+            Dictionary with entries, hits, misses, hit_rate and evictions
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+_cache: Optional[RetrievalCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> Optional[RetrievalCache]:
+    """
+    Return the process-wide retrieval cache, or None when caching is disabled.
+    """
+    global _cache
+    if not RETRIEVAL_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RetrievalCache()
+    return _cache
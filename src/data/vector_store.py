@@ -1,15 +1,36 @@
 """
 Vector store implementation for RAG capabilities.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import json
 import os
 from pathlib import Path
-from langchain_openai import OpenAIEmbeddings
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders.directory import DirectoryLoader
 
+from src.data.ann_index import (
+    build_index,
+    build_settings,
+    index_layout,
+    needs_rebuild,
+    set_search_params,
+    supports_delete,
+)
+from src.data.faiss_index import MmapIndexReader, build_lock, publish_index
+from src.data.index_manifest import IndexManifest, chunk_ids, scan_directory
+from src.data.retrieval_cache import get_retrieval_cache
+from src.ml.embedding_providers import complete_query_embeddings, embedding_model_name, get_embeddings
+from src.utils.config import VECTOR_INDEX_MMAP, VECTOR_INDEX_RELOAD_INTERVAL
+
+MANIFEST_FILE = "index_manifest.json"
+SERVING_DIR = "serving"
+BUILD_LOCK_FILE = ".build.lock"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
 class VectorStore:
     """
     Manages vector storage for RAG capabilities.
@@ -23,14 +44,25 @@ class VectorStore:
         """
         self.api_key = api_key
         
-        # Use the latest LangChain OpenAI embeddings
-        # This works with openai v1.0.0+ as LangChain handles the API compatibility
-        self.embeddings = OpenAIEmbeddings(api_key=api_key)
+        # OpenAI or local embeddings, selected by EMBEDDING_PROVIDER
+        self.embedding_model = embedding_model_name()
+        self.embeddings = get_embeddings(api_key)
             
         self.vector_store_path = Path("vector_db")
         self.vector_store_path.mkdir(exist_ok=True)
         self.vector_store = None
 
+        # Read-only, memory-mapped copy of the published index shared by all workers
+        self.serving_path = self.vector_store_path / SERVING_DIR
+        self._reader = (
+            MmapIndexReader(str(self.serving_path), self.embeddings, VECTOR_INDEX_RELOAD_INTERVAL)
+            if VECTOR_INDEX_MMAP else None
+        )
+
+        # Search results are cached until the index changes
+        self.retrieval_cache = get_retrieval_cache()
+        self._cache_namespace = f"faiss:{self.vector_store_path.resolve()}"
+
     def load_documents(self, directory: str = None) -> None:
         """
         Load documents from a directory and create embeddings.
@@ -51,41 +83,201 @@ class VectorStore:
                 self._create_minimal_vector_store()
                 return
                 
-            # Try to load documents
-            loader = DirectoryLoader(directory)
-            documents = loader.load()
-            
-            if not documents:
-                print("Warning: No documents found in directory. Creating minimal vector store.")
-                self._create_minimal_vector_store()
-                return
-            
-            # Process documents
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-            )
-            
-            texts = text_splitter.split_documents(documents)
-            
-            # Create or update vector store
-            if os.path.exists(self.vector_store_path / "index.faiss"):
-                self.vector_store = FAISS.load_local(
-                    str(self.vector_store_path),
-                    self.embeddings
-                )
-                self.vector_store.add_documents(texts)
-            else:
-                self.vector_store = FAISS.from_documents(
-                    texts,
-                    self.embeddings
-                )
-                self.vector_store.save_local(str(self.vector_store_path))
+            # Index only what changed since the last build; one process at a time
+            with build_lock(str(self.vector_store_path / BUILD_LOCK_FILE)):
+                self._sync_directory(directory)
                 
         except Exception as e:
             print(f"Error loading documents: {str(e)}")
             self._create_minimal_vector_store()
     
+    def _sync_directory(self, directory: str) -> None:
+        """
+        Bring the FAISS index in line with a document directory.
+
+        A manifest of per-file content hashes and chunk IDs is stored next to
+        the index. Unchanged files are skipped, modified files have their old
+        chunks replaced and deleted files have their chunks removed, so
+        start-up re-indexing costs O(changes). An index without a manifest
+        (built before manifests existed) is rebuilt once, and so is an index
+        whose layout (flat fallback, IVF cell count) no longer suits the
+        corpus size or whose type cannot delete the chunks of changed files.
+
+        Args:
+            directory: Path to directory containing documents
+        """
+        index_path = self.vector_store_path / "index.faiss"
+        manifest = IndexManifest(
+            str(self.vector_store_path / MANIFEST_FILE),
+            settings={
+                "embedding_model": self.embedding_model,
+                "chunk_size": CHUNK_SIZE,
+                "chunk_overlap": CHUNK_OVERLAP,
+                **build_settings(),
+            },
+        )
+        current = scan_directory(directory)
+        if not current:
+            print("Warning: No documents found in directory. Creating minimal vector store.")
+            self._create_minimal_vector_store()
+            return
+
+        rebuild = not (index_path.exists() and manifest.exists)
+        if rebuild and index_path.exists():
+            print("Vector index has no matching manifest; rebuilding it once.")
+        if not rebuild:
+            changes = manifest.diff(current)
+            if not any(changes.values()):
+                print(f"Vector index is up to date ({len(current)} files).")
+                self._open_serving_index()
+                return
+            self.vector_store = self._load_writable_index()
+            if (changes["modified"] or changes["deleted"]) and not supports_delete(self.vector_store.index):
+                print("Vector index type does not support deletes; rebuilding it.")
+                rebuild = True
+        if rebuild:
+            manifest.reset()
+            changes = {"added": sorted(current), "modified": [], "deleted": []}
+
+        # Embed only new and modified files
+        unchanged = [p for p in manifest.files if p in current and p not in changes["modified"]]
+        stale_ids = manifest.chunk_ids_for(changes["modified"] + changes["deleted"])
+        kept = len(manifest.chunk_ids_for(unchanged))
+        chunks, ids = self._load_chunks(directory, changes["added"] + changes["modified"], current, manifest)
+        for path in changes["deleted"]:
+            manifest.remove(path)
+
+        # Small corpora start out flat and IVF cells are sized for the first
+        # corpus, so retrain once the corpus has outgrown the built layout
+        if not rebuild:
+            layout = manifest.layout or index_layout(self.vector_store.index)
+            if needs_rebuild(layout, kept + len(chunks), self.vector_store.index.d):
+                print(f"Vector index layout {layout} no longer fits {kept + len(chunks)} chunks; rebuilding it.")
+                rebuild = True
+                kept_chunks, kept_ids = self._load_chunks(directory, unchanged, current, manifest)
+                chunks, ids = kept_chunks + chunks, kept_ids + ids
+            elif stale_ids:
+                # Remove the chunks of modified and deleted files
+                self.vector_store.delete(stale_ids)
+
+        if rebuild:
+            if not chunks:
+                self._create_minimal_vector_store()
+                return
+            self.vector_store = self._build_index(chunks, ids)
+        elif chunks:
+            self.vector_store.add_documents(chunks, ids=ids)
+
+        self.vector_store.save_local(str(self.vector_store_path))
+        manifest.layout = index_layout(self.vector_store.index)
+        manifest.save()
+        self._invalidate()
+        print(
+            f"Vector index updated: {len(changes['added'])} added, "
+            f"{len(changes['modified'])} modified, {len(changes['deleted'])} deleted files."
+        )
+        self._publish()
+
+    def _load_chunks(
+        self, directory: str, paths: List[str], current: Dict[str, str], manifest: IndexManifest
+    ) -> Tuple[List[Any], List[str]]:
+        """
+        Load and split source files, recording their chunks in the manifest.
+
+        Args:
+            directory: Path to directory containing documents
+            paths: Relative paths of the files to load
+            current: Output of `scan_directory`
+            manifest: Manifest to record the chunk IDs in
+
+        Returns:
+            The chunks and their IDs
+        """
+        loader = DirectoryLoader(directory)
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+        )
+        chunks, ids = [], []
+        for path in paths:
+            try:
+                documents = loader.loader_cls(
+                    os.path.join(directory, path), **loader.loader_kwargs
+                ).load()
+            except Exception as e:
+                print(f"Warning: Failed to load {path}: {str(e)}")
+                manifest.remove(path)
+                continue
+            file_chunks = splitter.split_documents(documents)
+            file_ids = chunk_ids(path, current[path], len(file_chunks))
+            for chunk in file_chunks:
+                chunk.metadata["source_path"] = path
+            chunks.extend(file_chunks)
+            ids.extend(file_ids)
+            manifest.record(path, current[path], file_ids)
+        return chunks, ids
+
+    def _build_index(self, chunks: List[Any], ids: List[str]) -> FAISS:
+        """
+        Build a FAISS store of the configured index type (VECTOR_INDEX_TYPE).
+
+        Args:
+            chunks: Split documents
+            ids: Chunk IDs, one per chunk
+
+        Returns:
+            FAISS vector store containing the chunks
+        """
+        texts = [chunk.page_content for chunk in chunks]
+        vectors = self.embeddings.embed_documents(texts)
+        index = build_index(np.array(vectors, dtype=np.float32))
+        store = FAISS(self.embeddings, index, InMemoryDocstore(), {})
+        store.add_embeddings(
+            zip(texts, vectors),
+            metadatas=[chunk.metadata for chunk in chunks],
+            ids=ids,
+        )
+        print(f"Built {type(index).__name__} vector index with {len(chunks)} chunks.")
+        return store
+
+    def _load_writable_index(self) -> FAISS:
+        """Load the writable index copy with the configured search parameters."""
+        try:
+            # Our own index; newer LangChain only unpickles its docstore when told so
+            store = FAISS.load_local(
+                str(self.vector_store_path), self.embeddings, allow_dangerous_deserialization=True
+            )
+        except TypeError:
+            store = FAISS.load_local(str(self.vector_store_path), self.embeddings)
+        set_search_params(store.index)
+        return store
+
+    def _publish(self) -> None:
+        """Publish the writable index for serving and switch to the mapped copy."""
+        if self._reader is None:
+            return
+        try:
+            publish_index(self.vector_store, str(self.serving_path))
+            self.vector_store = self._reader.get(force=True) or self.vector_store
+        except Exception as e:
+            print(f"Warning: Failed to publish vector index for serving: {str(e)}")
+
+    def _open_serving_index(self) -> None:
+        """
+        Open the up-to-date index for searching.
+
+        With memory-mapping enabled the published version is mapped read-only
+        (publishing it first if it does not exist yet); otherwise the index is
+        loaded into this process.
+        """
+        if self._reader is not None:
+            store = self._reader.get(force=True)
+            if store is not None:
+                self.vector_store = store
+                return
+        self.vector_store = self._load_writable_index()
+        self._publish()
+
     def _create_minimal_vector_store(self) -> None:
         """Create a minimal vector store with default content."""
         try:
@@ -114,6 +306,7 @@ class VectorStore:
                 ["Default document"],
                 self.embeddings
             )
+        self._invalidate()
 
     def search(self, query: str, k: int = 4, documents: List[str] = None) -> List[Dict[str, Any]]:
         """
@@ -140,16 +333,13 @@ class VectorStore:
                 if query in doc.lower()
             ][:k]
             
+        self._refresh_index()
+
+        def compute(missing: List[int]) -> List[List[Dict[str, Any]]]:
+            return [self._format_results(self.vector_store.similarity_search_with_score(query, k=k))]
+
         try:
-            results = self.vector_store.similarity_search_with_score(query, k=k)
-            formatted_results = []
-            for doc, score in results:
-                formatted_results.append({
-                    "content": doc.page_content,
-                    "metadata": getattr(doc, 'metadata', {}),
-                    "score": float(score) if hasattr(score, '__float__') else 0.0
-                })
-            return formatted_results
+            return self._cached_search([query], k, compute)[0]
             
         except Exception as e:
             print(f"Error in vector store search: {str(e)}")
@@ -162,3 +352,129 @@ class VectorStore:
                     if query in doc.lower()
                 ][:k]
             return []
+
+    def search_many(
+        self,
+        queries: List[str],
+        k: int = 4,
+        query_embeddings: Optional[List[List[float]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries with one query embedding batch.
+        
+        Args:
+            queries: Search queries
+            k: Number of results per query
+            query_embeddings: Optional precomputed query embeddings from the
+                same embedding model (see `embedding_model`); None entries
+                are embedded here
+            
+        Returns:
+            One list of relevant documents with scores per query
+        """
+        if not queries:
+            return []
+        if not self.vector_store:
+            return [[] for _ in queries]
+        self._refresh_index()
+
+        def compute(missing: List[int]) -> List[List[Dict[str, Any]]]:
+            vectors = complete_query_embeddings(
+                self.embeddings,
+                [queries[i] for i in missing],
+                [query_embeddings[i] for i in missing] if query_embeddings is not None else None,
+            )
+            return self._batch_search(vectors, k)
+
+        try:
+            return self._cached_search(queries, k, compute)
+        except Exception as e:
+            print(f"Error in vector store batch search: {str(e)}")
+            return [[] for _ in queries]
+
+    def _batch_search(self, query_embeddings: List[List[float]], k: int) -> List[List[Dict[str, Any]]]:
+        """
+        Search a batch of query vectors.
+
+        Each vector goes through LangChain's FAISS search, so normalisation,
+        the distance strategy and the scores match `search`.
+        """
+        return [
+            self._format_results(self.vector_store.similarity_search_with_score_by_vector(list(vector), k=k))
+            for vector in query_embeddings
+        ]
+
+    def _format_results(self, results: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Convert (document, score) pairs from FAISS into result dicts.
+
+        'score' is the raw FAISS score; 'relevance_score' is the store's
+        relevance score for its distance strategy (0-1, higher is better).
+        """
+        try:
+            relevance = self.vector_store._select_relevance_score_fn()
+        except (NotImplementedError, ValueError):
+            relevance = None
+        formatted_results = []
+        for doc, score in results:
+            score = float(score) if hasattr(score, '__float__') else 0.0
+            formatted_results.append({
+                "content": doc.page_content,
+                "metadata": getattr(doc, 'metadata', {}),
+                "score": score,
+                "relevance_score": relevance(score) if relevance else None
+            })
+        return formatted_results
+
+    def cached_queries(self, queries: List[str], k: int = 4) -> List[bool]:
+        """
+        Tell which searches `search_many` can answer without embedding the query.
+
+        Args:
+            queries: Search queries
+            k: Number of results per query
+
+        Returns:
+            One flag per query
+        """
+        if not self.vector_store:
+            return [True for _ in queries]
+        if self.retrieval_cache is None:
+            return [False for _ in queries]
+        self._refresh_index()
+        return [self.retrieval_cache.contains(key) for key in self._cache_keys(queries, k)]
+
+    def _cache_keys(self, queries: List[str], k: int) -> List[Any]:
+        """Build the retrieval cache keys of searches against the current index."""
+        # The published version changes when another process rebuilds the index
+        external_version = self._reader.version if self._reader is not None else None
+        return [
+            self.retrieval_cache.make_key(self._cache_namespace, query, None, k, external_version)
+            for query in queries
+        ]
+
+    def _cached_search(self, queries: List[str], k: int, compute) -> List[List[Dict[str, Any]]]:
+        """
+        Serve searches from the retrieval cache, computing misses together.
+
+        Args:
+            queries: Search queries
+            k: Number of results per query
+            compute: Called with the indices of uncached queries
+
+        Returns:
+            One result list per query
+        """
+        if self.retrieval_cache is None:
+            return compute(list(range(len(queries))))
+        return self.retrieval_cache.get_many(self._cache_keys(queries, k), compute)
+
+    def _invalidate(self) -> None:
+        """Invalidate cached search results after the index changed."""
+        if self.retrieval_cache is not None:
+            self.retrieval_cache.bump(self._cache_namespace)
+
+    def _refresh_index(self) -> None:
+        """Pick up a newer index published by another process."""
+        if self._reader is not None and self._reader.version is not None:
+            self.vector_store = self._reader.get() or self.vector_store
@@ -1,10 +1,209 @@
 """
 Direct OpenAI API handler to bypass any potential middleware issues.
+
+All requests share one pooled `requests.Session`, so consecutive completions
+reuse kept-alive TLS connections instead of paying a fresh handshake each time.
+The API key is resolved once per process, and rate-limit / server errors are
+retried with backoff that honours the `Retry-After` header. Failures to
+connect are retried too, but read timeouts are not: the completion may already
+be running (and billed), and retrying would multiply the caller's wait.
+
+`agenerate_completion` is the asyncio-native counterpart built on a shared
+`httpx.AsyncClient`; with `stream=True` it yields content deltas as the API
+emits server-sent events. `stream_completion` drives that stream from
+synchronous code such as a Flask streaming response: streams run on one
+long-lived event loop in a background thread, so they share that loop's
+connection pool, and chunks are handed to the calling thread through a queue.
+
+Environment:
+    OPENAI_BASE_URL: API root (default https://api.openai.com/v1), e.g. a local stub server
+    OPENAI_POOL_SIZE: Maximum pooled connections per host (default 10)
+    OPENAI_MAX_RETRIES: Retries on 429/5xx and failed connections (default 3)
+    OPENAI_BACKOFF_BASE: Base delay in seconds for exponential backoff (default 1.0)
 """
+import asyncio
+import email.utils
 import os
 import json
+import queue
+import random
+import threading
+import time
+import weakref
+import httpx
 import requests
-from typing import Dict, Any, List, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, AsyncIterator, Iterator, Optional, Union
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 60.0
+
+_session: Optional[requests.Session] = None
+_api_key: Optional[str] = None
+_client_lock = threading.Lock()
+
+# httpx.AsyncClient instances are bound to the event loop that created them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+# Event loop running `stream_completion` requests, and the process that owns it
+# (the thread does not survive a fork)
+_stream_loop: Optional[asyncio.AbstractEventLoop] = None
+_stream_loop_pid: Optional[int] = None
+_END_OF_STREAM = object()
+
+
+def _resolve_api_key() -> str:
+    """
+    Resolve the OpenAI API key once and cache it for the process.
+
+    Returns:
+        The API key
+
+    Raises:
+        ValueError: If no key is found in the environment or the .env file
+    """
+    global _api_key
+    if _api_key:
+        return _api_key
+
+    with _client_lock:
+        if _api_key:
+            return _api_key
+
+        # Get API key from environment or directly from file if needed
+        api_key = os.environ.get("OPENAI_API_KEY")
+
+        # Fallback to direct read if environment variable isn't working
+        if not api_key or len(api_key) < 20:
+            try:
+                with open('.env', 'r') as f:
+                    for line in f:
+                        if line.startswith('OPENAI_API_KEY='):
+                            api_key = line.strip().split('=', 1)[1]
+                            break
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Error reading API key from file: {e}")
+
+        if not api_key:
+            raise ValueError("OpenAI API key not found in environment variables or .env file")
+
+        _api_key = api_key
+        return _api_key
+
+
+def get_session() -> requests.Session:
+    """
+    Return the shared, connection-pooled HTTP session.
+    """
+    global _session
+    if _session is None:
+        with _client_lock:
+            if _session is None:
+                pool_size = int(os.environ.get("OPENAI_POOL_SIZE", "10"))
+                adapter = HTTPAdapter(
+                    pool_connections=pool_size,
+                    pool_maxsize=pool_size,
+                    max_retries=0,  # retries are handled in generate_completion
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({
+                    "Content-Type": "application/json",
+                    "Connection": "keep-alive",
+                })
+                _session = session
+    return _session
+
+
+def reset_client() -> None:
+    """
+    Close the pooled session and forget the cached API key.
+
+    Useful after rotating the key or when switching base URLs in tests.
+    """
+    global _session, _api_key
+    with _client_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _api_key = None
+        loop = _stream_loop if _stream_loop_pid == os.getpid() else None
+    if loop is not None and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(aclose_client(), loop).result(timeout=5)
+
+
+def _retry_delay(response: Optional[Union[requests.Response, httpx.Response]], attempt: int) -> float:
+    """
+    Compute how long to wait before the next attempt.
+
+    Args:
+        response: The failed response, if one was received
+        attempt: Zero-based attempt number that just failed
+
+    Returns:
+        Delay in seconds
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), MAX_BACKOFF_SECONDS)
+            except ValueError:
+                try:
+                    retry_at = email.utils.parsedate_to_datetime(retry_after)
+                    return min(max(retry_at.timestamp() - time.time(), 0.0), MAX_BACKOFF_SECONDS)
+                except (TypeError, ValueError):
+                    pass  # unparseable header, fall back to exponential backoff
+
+    base = float(os.environ.get("OPENAI_BACKOFF_BASE", "1.0"))
+    delay = base * (2 ** attempt)
+    return min(delay + random.uniform(0, delay / 2), MAX_BACKOFF_SECONDS)
+
+
+def _format_error(e: requests.exceptions.RequestException) -> str:
+    """Build a readable error message from a failed request."""
+    if hasattr(e, "response") and e.response is not None:
+        status_code = e.response.status_code
+        try:
+            error_data = e.response.json()
+            return f"Error code: {status_code} - {json.dumps(error_data)}"
+        except ValueError:
+            return f"Error code: {status_code} - {e.response.text}"
+    return str(e)
+
+
+def _build_request(
+    prompt: str,
+    system_message: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    base_url: Optional[str],
+    stream: bool = False,
+    response_format: Optional[Dict[str, Any]] = None,
+):
+    """Build the URL, headers and payload for a chat completion request."""
+    root = (base_url or os.environ.get("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+    headers = {"Authorization": f"Bearer {_resolve_api_key()}"}
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    if stream:
+        payload["stream"] = True
+    if response_format:
+        payload["response_format"] = response_format
+    return f"{root}/chat/completions", headers, payload
+
 
 def generate_completion(
     prompt: str,
@@ -12,94 +211,304 @@ def generate_completion(
     model: str = "gpt-3.5-turbo",
     temperature: float = 0.7,
     max_tokens: int = 1000,
-    timeout: int = 120
+    timeout: int = 120,
+    base_url: Optional[str] = None,
+    max_retries: Optional[int] = None,
+    response_format: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     Generate a completion using direct HTTP requests to OpenAI API.
-    
+
     Args:
         prompt: The user prompt
         system_message: Optional system message
         model: The OpenAI model to use
         temperature: Sampling temperature
         max_tokens: Maximum tokens to generate
-        
+        timeout: Per-attempt request timeout in seconds
+        base_url: Optional API root overriding OPENAI_BASE_URL
+        max_retries: Optional retry count overriding OPENAI_MAX_RETRIES
+        response_format: Optional response_format (e.g. a JSON schema) sent to the API
+
     Returns:
         The generated text
     """
-    # Get API key from environment or directly from file if needed
-    api_key = os.environ.get("OPENAI_API_KEY")
-    
-    # Fallback to direct read if environment variable isn't working
-    if not api_key or len(api_key) < 20:
-        try:
-            with open('.env', 'r') as f:
-                for line in f:
-                    if line.startswith('OPENAI_API_KEY='):
-                        api_key = line.strip().split('=', 1)[1]
-                        break
-        except Exception as e:
-            print(f"Error reading API key from file: {e}")
-    
-    if not api_key:
-        raise ValueError("OpenAI API key not found in environment variables or .env file")
-        
-    print(f"Using API key starting with: {api_key[:10]}...")
-    
-    # API endpoint
-    url = "https://api.openai.com/v1/chat/completions"
-    
-    # Request headers
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    
-    # Request payload
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": temperature,
-        "max_tokens": max_tokens
-    }
-    
+    session = get_session()
+    url, headers, payload = _build_request(
+        prompt, system_message, model, temperature, max_tokens, base_url,
+        response_format=response_format,
+    )
+
+    if max_retries is None:
+        max_retries = int(os.environ.get("OPENAI_MAX_RETRIES", "3"))
+
     print("Making direct API request to OpenAI...")
-    
-    # Make the request
-    try:
-        response = requests.post(
-            url, 
-            headers=headers,
-            json=payload,
-            timeout=timeout
+
+    # Make the request, retrying rate limits, server errors and failed connections
+    for attempt in range(max_retries + 1):
+        response = None
+        try:
+            response = session.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=timeout
+            )
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                delay = _retry_delay(response, attempt)
+                print(f"OpenAI API returned {response.status_code}, retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 1}/{max_retries})")
+                time.sleep(delay)
+                continue
+
+            # Check if request was successful
+            response.raise_for_status()
+
+            # Parse response
+            result = response.json()
+            print("Received response from OpenAI API")
+
+            # Extract and return the generated text
+            if "choices" in result and len(result["choices"]) > 0:
+                return result["choices"][0]["message"]["content"]
+            else:
+                raise ValueError(f"Unexpected API response: {json.dumps(result)}")
+
+        except requests.exceptions.ConnectionError as e:
+            # Includes ConnectTimeout; a ReadTimeout falls through and is not retried
+            if attempt < max_retries:
+                delay = _retry_delay(None, attempt)
+                print(f"API request failed ({e.__class__.__name__}), retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 1}/{max_retries})")
+                time.sleep(delay)
+                continue
+            print(f"API request failed: {str(e)}")
+            raise ValueError(f"OpenAI API request failed: {_format_error(e)}")
+        except requests.exceptions.RequestException as e:
+            print(f"API request failed: {str(e)}")
+            raise ValueError(f"OpenAI API request failed: {_format_error(e)}")
+
+    # Unreachable: the final attempt either returns or raises
+    raise ValueError("OpenAI API request failed: retries exhausted")
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """
+    Return the pooled async HTTP client for the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        pool_size = int(os.environ.get("OPENAI_POOL_SIZE", "10"))
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+            ),
+            headers={"Content-Type": "application/json"},
         )
-        
-        # Check if request was successful
-        response.raise_for_status()
-        
-        # Parse response
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_client() -> None:
+    """
+    Close the async HTTP client bound to the running event loop, if any.
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _format_async_error(response: httpx.Response) -> str:
+    """Build a readable error message from a failed async response."""
+    try:
+        return f"Error code: {response.status_code} - {json.dumps(response.json())}"
+    except ValueError:
+        return f"Error code: {response.status_code} - {response.text}"
+
+
+async def agenerate_completion(
+    prompt: str,
+    system_message: str = "You are an expert educational AI assistant that specializes in creating personalized learning paths.",
+    model: str = "gpt-3.5-turbo",
+    temperature: float = 0.7,
+    max_tokens: int = 1000,
+    timeout: int = 120,
+    stream: bool = False,
+    base_url: Optional[str] = None,
+    max_retries: Optional[int] = None,
+    response_format: Optional[Dict[str, Any]] = None,
+) -> Union[str, AsyncIterator[str]]:
+    """
+    Generate a completion asynchronously.
+
+    Args:
+        prompt: The user prompt
+        system_message: Optional system message
+        model: The OpenAI model to use
+        temperature: Sampling temperature
+        max_tokens: Maximum tokens to generate
+        timeout: Per-attempt request timeout in seconds
+        stream: Return an async iterator of content deltas instead of the full text
+        base_url: Optional API root overriding OPENAI_BASE_URL
+        max_retries: Optional retry count overriding OPENAI_MAX_RETRIES
+        response_format: Optional response_format (e.g. a JSON schema) sent to the API
+
+    Returns:
+        The generated text, or an async iterator of text chunks when `stream=True`
+    """
+    if max_retries is None:
+        max_retries = int(os.environ.get("OPENAI_MAX_RETRIES", "3"))
+
+    url, headers, payload = _build_request(
+        prompt, system_message, model, temperature, max_tokens, base_url, stream=stream,
+        response_format=response_format,
+    )
+
+    if stream:
+        return _astream_chunks(url, headers, payload, timeout, max_retries)
+
+    client = _get_async_client()
+    for attempt in range(max_retries + 1):
+        try:
+            response = await client.post(url, headers=headers, json=payload, timeout=timeout)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+            if attempt < max_retries:
+                await asyncio.sleep(_retry_delay(None, attempt))
+                continue
+            raise ValueError(f"OpenAI API request failed: {e}")
+        except httpx.TimeoutException as e:
+            # The request was sent and may be running; do not send it again
+            raise ValueError(f"OpenAI API request timed out: {e.__class__.__name__}")
+
+        if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+            await asyncio.sleep(_retry_delay(response, attempt))
+            continue
+        if response.is_error:
+            raise ValueError(f"OpenAI API request failed: {_format_async_error(response)}")
+
         result = response.json()
-        print("Received response from OpenAI API")
-        
-        # Extract and return the generated text
         if "choices" in result and len(result["choices"]) > 0:
             return result["choices"][0]["message"]["content"]
-        else:
-            raise ValueError(f"Unexpected API response: {json.dumps(result)}")
-            
-    except requests.exceptions.RequestException as e:
-        print(f"API request failed: {str(e)}")
-        if hasattr(e, "response") and e.response is not None:
-            status_code = e.response.status_code
+        raise ValueError(f"Unexpected API response: {json.dumps(result)}")
+
+    # Unreachable: the final attempt either returns or raises
+    raise ValueError("OpenAI API request failed: retries exhausted")
+
+
+async def _astream_chunks(
+    url: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any],
+    timeout: int,
+    max_retries: int,
+) -> AsyncIterator[str]:
+    """
+    Yield content deltas from a streaming chat completion.
+
+    Retries only happen before the first chunk is received; once tokens have
+    been forwarded a failure is raised to the caller.
+    """
+    client = _get_async_client()
+    for attempt in range(max_retries + 1):
+        try:
+            async with client.stream("POST", url, headers=headers, json=payload, timeout=timeout) as response:
+                if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                    await response.aread()
+                    delay = _retry_delay(response, attempt)
+                else:
+                    if response.is_error:
+                        await response.aread()
+                        raise ValueError(f"OpenAI API request failed: {_format_async_error(response)}")
+
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            # Read to the end of the body so the connection
+                            # goes back to the pool instead of being dropped
+                            continue
+                        try:
+                            event = json.loads(data)
+                        except ValueError:
+                            continue
+                        choices = event.get("choices") or []
+                        if not choices:
+                            continue
+                        content = (choices[0].get("delta") or {}).get("content")
+                        if content:
+                            yield content
+                    return
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            if attempt >= max_retries:
+                raise ValueError(f"OpenAI API request failed: {e}")
+            delay = _retry_delay(None, attempt)
+
+        await asyncio.sleep(delay)
+
+    raise ValueError("OpenAI API request failed: retries exhausted")
+
+
+def _get_stream_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the background event loop for synchronous streams, starting it if needed.
+    """
+    global _stream_loop, _stream_loop_pid
+    with _client_lock:
+        if _stream_loop is None or _stream_loop_pid != os.getpid() or _stream_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="openai-stream-loop", daemon=True).start()
+            _stream_loop = loop
+            _stream_loop_pid = os.getpid()
+        return _stream_loop
+
+
+def stream_completion(prompt: str, **kwargs) -> Iterator[str]:
+    """
+    Stream a completion from synchronous code.
+
+    Runs `agenerate_completion(..., stream=True)` on the shared background
+    event loop and yields each chunk as soon as it arrives, which makes it
+    suitable for a Flask `Response` generator. Closing the iterator early
+    (e.g. the client disconnected) cancels the upstream request.
+
+    Args:
+        prompt: The user prompt
+        **kwargs: Any other `agenerate_completion` argument except `stream`
+
+    Returns:
+        Iterator over text chunks
+    """
+    # Unbounded, so the loop never blocks on a slow consumer
+    chunks: "queue.Queue[Any]" = queue.Queue()
+
+    async def pump() -> None:
+        try:
+            stream = await agenerate_completion(prompt, stream=True, **kwargs)
             try:
-                error_data = e.response.json()
-                error_message = f"Error code: {status_code} - {json.dumps(error_data)}"
-            except:
-                error_message = f"Error code: {status_code} - {e.response.text}"
+                async for chunk in stream:
+                    chunks.put(chunk)
+            finally:
+                await stream.aclose()
+        except asyncio.CancelledError:
+            chunks.put(_END_OF_STREAM)
+            raise
+        except BaseException as e:
+            chunks.put(e)
         else:
-            error_message = str(e)
-            
-        raise ValueError(f"OpenAI API request failed: {error_message}")
+            chunks.put(_END_OF_STREAM)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _get_stream_loop())
+    try:
+        while True:
+            item = chunks.get()
+            if item is _END_OF_STREAM:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        future.cancel()
@@ -0,0 +1,32 @@
+"""
+Background job queue.
+"""
+from .backends import (
+    CANCELLED,
+    FAILED,
+    FINISHED_STATES,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    BACKENDS,
+    JobBackend,
+    SQLiteJobBackend,
+)
+from .manager import JobCancelled, JobContext, JobManager, PermanentJobError, get_job_manager
+
+__all__ = [
+    'CANCELLED',
+    'FAILED',
+    'FINISHED_STATES',
+    'QUEUED',
+    'RUNNING',
+    'SUCCEEDED',
+    'BACKENDS',
+    'JobBackend',
+    'SQLiteJobBackend',
+    'JobCancelled',
+    'JobContext',
+    'JobManager',
+    'PermanentJobError',
+    'get_job_manager',
+]
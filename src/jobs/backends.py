@@ -0,0 +1,386 @@
+"""
+Queue backends for background jobs.
+
+A backend persists job records and hands queued jobs to workers. The default
+`SQLiteJobBackend` needs no external services and can be shared by every
+worker process on a host; other stores (Redis, Postgres, ...) can be plugged in
+by implementing `JobBackend` and registering it in `BACKENDS`.
+"""
+from __future__ import annotations
+
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobBackend(abc.ABC):
+    """
+    Storage and claiming interface used by `JobManager`.
+    """
+
+    @abc.abstractmethod
+    def enqueue(self, job_type: str, payload: Dict[str, Any], max_retries: int = 0) -> str:
+        """
+        Add a job to the queue.
+
+        Args:
+            job_type: Name of the registered handler
+            payload: JSON-serialisable handler arguments
+            max_retries: How many times a failed attempt may be retried
+
+        Returns:
+            The new job ID
+        """
+
+    @abc.abstractmethod
+    def claim(self, job_types: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Atomically move the oldest runnable job to the running state.
+
+        Args:
+            job_types: Optional list of job types this worker can handle
+
+        Returns:
+            The claimed job record, or None if nothing is runnable
+        """
+
+    @abc.abstractmethod
+    def complete(self, job_id: str, result: Any) -> None:
+        """Mark a running job as succeeded with its result."""
+
+    @abc.abstractmethod
+    def fail(self, job_id: str, error: str, retry_delay: Optional[float] = None) -> str:
+        """
+        Record a failed attempt.
+
+        Args:
+            job_id: ID of the job
+            error: Error message for this attempt
+            retry_delay: Seconds before a retry, or None to fail permanently
+
+        Returns:
+            The job's new status (queued when retried, failed otherwise)
+        """
+
+    @abc.abstractmethod
+    def mark_cancelled(self, job_id: str) -> None:
+        """Mark a job as cancelled."""
+
+    @abc.abstractmethod
+    def request_cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued job or ask a running one to stop.
+
+        Returns:
+            False if the job does not exist or has already finished
+        """
+
+    @abc.abstractmethod
+    def is_cancel_requested(self, job_id: str) -> bool:
+        """Whether cancellation was requested for a job."""
+
+    @abc.abstractmethod
+    def update_progress(self, job_id: str, progress: Dict[str, Any]) -> None:
+        """Store progress information and refresh the job heartbeat."""
+
+    @abc.abstractmethod
+    def heartbeat(self, job_ids: List[str]) -> None:
+        """Refresh the heartbeat of jobs that are still being worked on."""
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job record, or None if it does not exist."""
+
+    @abc.abstractmethod
+    def recover_stale(self, stale_after: float) -> int:
+        """
+        Recover running jobs whose worker stopped sending heartbeats.
+
+        A stale job is requeued while it has retries left. Once its attempts
+        exceed `max_retries` it is marked failed (cancelled, if that was
+        requested), so a job that kills its worker is not reclaimed forever.
+
+        Returns:
+            Number of recovered (requeued, failed or cancelled) jobs
+        """
+
+    @abc.abstractmethod
+    def record_worker(self, worker_id: str) -> None:
+        """Record that a worker process is alive and polling the queue."""
+
+    @abc.abstractmethod
+    def last_worker_seen(self) -> Optional[float]:
+        """
+        Return when any worker last reported in.
+
+        Returns:
+            Unix timestamp, or None if no worker ever did
+        """
+
+    @abc.abstractmethod
+    def purge_finished(self, older_than: float) -> int:
+        """
+        Delete finished jobs older than `older_than` seconds.
+
+        Returns:
+            Number of deleted jobs
+        """
+
+
+class SQLiteJobBackend(JobBackend):
+    """
+    Job backend stored in a local SQLite database.
+    """
+    def __init__(self, db_path: str):
+        """
+        Initialize the SQLite backend.
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                progress TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_retries INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_runnable ON jobs (status, available_at)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+
+    def _row_to_job(self, row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        for field in ("payload", "result", "progress"):
+            if job.get(field) is not None:
+                job[field] = json.loads(job[field])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any], max_retries: int = 0) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (id, type, payload, status, max_retries, created_at, available_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, job_type, json.dumps(payload), QUEUED, max_retries, now, now),
+            )
+        return job_id
+
+    def claim(self, job_types: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        query = "SELECT id FROM jobs WHERE status = ? AND available_at <= ?"
+        params: list = [QUEUED, now]
+        if job_types:
+            query += f" AND type IN ({', '.join('?' for _ in job_types)})"
+            params.extend(job_types)
+        query += " ORDER BY available_at, created_at LIMIT 1"
+
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two processes
+            # can never claim the same row.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(query, params).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    """
+                    UPDATE jobs
+                    SET status = ?, attempts = attempts + 1, started_at = ?, heartbeat_at = ?
+                    WHERE id = ?
+                    """,
+                    (RUNNING, now, now, row["id"]),
+                )
+                job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._row_to_job(job)
+
+    def complete(self, job_id: str, result: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, finished_at = ? WHERE id = ?",
+                (SUCCEEDED, json.dumps(result), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str, retry_delay: Optional[float] = None) -> str:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts, max_retries, cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return FAILED
+
+            retry = (
+                retry_delay is not None
+                and row["attempts"] <= row["max_retries"]
+                and not row["cancel_requested"]
+            )
+            if retry:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, available_at = ? WHERE id = ?",
+                    (QUEUED, error, now + retry_delay, job_id),
+                )
+                return QUEUED
+
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED, error, now, job_id),
+            )
+            return FAILED
+
+    def mark_cancelled(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? WHERE id = ?",
+                (CANCELLED, time.time(), job_id),
+            )
+
+    def request_cancel(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] in FINISHED_STATES:
+                return False
+            if row["status"] == QUEUED:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? WHERE id = ?",
+                    (CANCELLED, time.time(), job_id),
+                )
+            else:
+                self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            return True
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?",
+                (json.dumps(progress), time.time(), job_id),
+            )
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE id IN ({', '.join('?' for _ in job_ids)})",
+                (time.time(), *job_ids),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def recover_stale(self, stale_after: float) -> int:
+        now = time.time()
+        stale = "status = ? AND heartbeat_at < ?"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cancelled = self._conn.execute(
+                    f"UPDATE jobs SET status = ?, finished_at = ? WHERE {stale} AND cancel_requested = 1",
+                    (CANCELLED, now, RUNNING, now - stale_after),
+                ).rowcount
+                failed = self._conn.execute(
+                    f"""
+                    UPDATE jobs
+                    SET status = ?, finished_at = ?,
+                        error = 'Worker stopped during attempt ' || attempts || '; no retries left'
+                    WHERE {stale} AND attempts > max_retries
+                    """,
+                    (FAILED, now, RUNNING, now - stale_after),
+                ).rowcount
+                requeued = self._conn.execute(
+                    f"UPDATE jobs SET status = ?, available_at = ? WHERE {stale}",
+                    (QUEUED, now, RUNNING, now - stale_after),
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cancelled + failed + requeued
+
+    def record_worker(self, worker_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO workers (id, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET seen_at = excluded.seen_at",
+                (worker_id, time.time()),
+            )
+
+    def last_worker_seen(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(seen_at) AS seen_at FROM workers").fetchone()
+        return row["seen_at"]
+
+    def purge_finished(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' for _ in FINISHED_STATES)}) "
+                "AND finished_at < ?",
+                (*FINISHED_STATES, time.time() - older_than),
+            )
+            self._conn.execute("DELETE FROM workers WHERE seen_at < ?", (time.time() - older_than,))
+        return cursor.rowcount
+
+
+# Backends selectable through the JOB_BACKEND setting
+BACKENDS = {
+    "sqlite": SQLiteJobBackend,
+}
@@ -0,0 +1,335 @@
+"""
+Background job manager.
+
+`JobManager` runs registered handlers on a fixed pool of worker threads that
+claim jobs from a pluggable backend. The pool size is the concurrency limit
+per process; because claiming is atomic in the backend, several processes can
+share one queue and absorb bursts together.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from src.jobs.backends import (
+    BACKENDS,
+    FINISHED_STATES,
+    QUEUED,
+    JobBackend,
+)
+from src.utils.config import (
+    JOB_BACKEND,
+    JOB_DB_PATH,
+    JOB_MAX_RETRIES,
+    JOB_RESULT_TTL,
+    JOB_STALE_AFTER,
+    JOB_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler to stop a job whose cancellation was requested."""
+
+
+class PermanentJobError(Exception):
+    """
+    Raised by a handler when a job cannot succeed on a retry (e.g. invalid input).
+
+    Any other exception is treated as transient and retried with backoff.
+    """
+
+
+class JobContext:
+    """
+    Handle passed to job handlers for progress reporting and cancellation checks.
+    """
+    def __init__(self, backend: JobBackend, job: Dict[str, Any]):
+        self._backend = backend
+        self.job_id = job["id"]
+        self.attempt = job["attempts"]
+        self.max_retries = job.get("max_retries", 0)
+
+    def report_progress(self, **progress: Any) -> None:
+        """
+        Store progress information visible through the job status.
+
+        Args:
+            **progress: JSON-serialisable progress fields (stage, percent, ...)
+        """
+        self._backend.update_progress(self.job_id, progress)
+
+    @property
+    def final_attempt(self) -> bool:
+        """Whether a failure of this attempt will not be retried."""
+        return self.attempt > self.max_retries
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation of this job was requested."""
+        return self._backend.is_cancel_requested(self.job_id)
+
+    def check_cancelled(self) -> None:
+        """
+        Raise `JobCancelled` if cancellation was requested.
+
+        Handlers call this between stages so cancelled jobs stop early.
+        """
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+
+Handler = Callable[[Dict[str, Any], JobContext], Any]
+
+
+class JobManager:
+    """
+    Runs background jobs on a bounded pool of worker threads.
+    """
+    def __init__(
+        self,
+        backend: Optional[JobBackend] = None,
+        concurrency: int = JOB_WORKERS,
+        max_retries: int = JOB_MAX_RETRIES,
+        poll_interval: float = 1.0,
+        retry_backoff: float = 2.0,
+        stale_after: float = JOB_STALE_AFTER,
+    ):
+        """
+        Initialize the job manager.
+
+        Args:
+            backend: Queue backend (default: the JOB_BACKEND at JOB_DB_PATH)
+            concurrency: Number of worker threads in this process
+            max_retries: Default retry count for submitted jobs
+            poll_interval: Seconds between queue polls when idle
+            retry_backoff: Base delay in seconds between retries (doubles per attempt)
+            stale_after: Seconds without a heartbeat after which a running
+                job (or a worker process) counts as dead
+        """
+        self.backend = backend or BACKENDS[JOB_BACKEND](JOB_DB_PATH)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.stale_after = stale_after
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._handlers: Dict[str, Handler] = {}
+        self._threads: List[threading.Thread] = []
+        self._running_jobs: Dict[str, int] = {}
+        self._running_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def register(self, job_type: str, handler: Handler) -> None:
+        """
+        Register the handler for a job type.
+
+        Args:
+            job_type: Name used when submitting jobs
+            handler: Callable receiving (payload, context) and returning a JSON-serialisable result
+        """
+        self._handlers[job_type] = handler
+
+    def start(self) -> None:
+        """Start the worker threads (idempotent)."""
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            self._maintain()
+
+            for i in range(self.concurrency):
+                thread = threading.Thread(
+                    target=self._worker_loop, name=f"job-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+            heartbeat = threading.Thread(
+                target=self._heartbeat_loop, name="job-heartbeat", daemon=True
+            )
+            heartbeat.start()
+            self._threads.append(heartbeat)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the worker threads after their current jobs finish.
+
+        Args:
+            timeout: Optional seconds to wait for each thread
+        """
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, job_type: str, payload: Dict[str, Any], max_retries: Optional[int] = None) -> str:
+        """
+        Queue a job.
+
+        Args:
+            job_type: Registered job type
+            payload: JSON-serialisable handler arguments
+            max_retries: Optional retry count overriding the manager default
+
+        Returns:
+            The job ID
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = self.backend.enqueue(
+            job_type, payload, self.max_retries if max_retries is None else max_retries
+        )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the job record.
+
+        Args:
+            job_id: ID of the job
+
+        Returns:
+            Dictionary with status, progress, result and error, or None if unknown
+        """
+        return self.backend.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued job, or ask a running job to stop at its next check.
+
+        Args:
+            job_id: ID of the job
+
+        Returns:
+            False if the job is unknown or already finished
+        """
+        return self.backend.request_cancel(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, interval: float = 0.1) -> Optional[Dict[str, Any]]:
+        """
+        Block until a job finishes.
+
+        Args:
+            job_id: ID of the job
+            timeout: Optional maximum seconds to wait
+            interval: Polling interval in seconds
+
+        Returns:
+            The final job record, or the current one if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.backend.get(job_id)
+            if job is None or job["status"] in FINISHED_STATES:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(interval)
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.backend.claim(list(self._handlers))
+            except Exception as exc:
+                logger.error("Failed to claim job: %s", exc)
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run(job)
+
+    def workers_alive(self) -> bool:
+        """
+        Whether any worker process has reported in within `stale_after` seconds.
+
+        Queued jobs only run while one does.
+        """
+        try:
+            seen = self.backend.last_worker_seen()
+        except Exception as exc:
+            logger.warning("Could not read worker liveness: %s", exc)
+            return False
+        return seen is not None and time.time() - seen < self.stale_after
+
+    def _maintain(self) -> None:
+        """Report this worker as alive, recover orphaned jobs and purge old results."""
+        try:
+            self.backend.record_worker(self.worker_id)
+            recovered = self.backend.recover_stale(self.stale_after)
+            if recovered:
+                logger.info("Recovered %s stale job(s)", recovered)
+            self.backend.purge_finished(JOB_RESULT_TTL)
+        except Exception as exc:
+            logger.warning("Job queue maintenance failed: %s", exc)
+
+    def _heartbeat_loop(self) -> None:
+        # Recovery runs here too, so jobs orphaned by a crashed process are
+        # picked up without waiting for some process to restart
+        interval = max(1.0, self.stale_after / 4)
+        while not self._stop.wait(interval):
+            with self._running_lock:
+                job_ids = list(self._running_jobs)
+            try:
+                self.backend.heartbeat(job_ids)
+            except Exception as exc:
+                logger.warning("Job heartbeat failed: %s", exc)
+            self._maintain()
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        context = JobContext(self.backend, job)
+        with self._running_lock:
+            self._running_jobs[job_id] = job["attempts"]
+        try:
+            context.check_cancelled()
+            result = self._handlers[job["type"]](job["payload"], context)
+            self.backend.complete(job_id, result)
+        except JobCancelled:
+            self.backend.mark_cancelled(job_id)
+        except PermanentJobError as exc:
+            logger.warning("Job %s (%s) failed: %s", job_id, job["type"], exc)
+            self.backend.fail(job_id, str(exc), retry_delay=None)
+        except Exception as exc:
+            delay = self.retry_backoff * (2 ** (job["attempts"] - 1))
+            status = self.backend.fail(job_id, f"{type(exc).__name__}: {exc}", retry_delay=delay)
+            logger.warning(
+                "Job %s (%s) attempt %s failed: %s (%s)",
+                job_id, job["type"], job["attempts"], exc,
+                "will retry" if status == QUEUED else "giving up",
+            )
+        finally:
+            with self._running_lock:
+                self._running_jobs.pop(job_id, None)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """
+    Return the process-wide job manager, creating it on first use.
+
+    Workers are started by the caller once its handlers are registered.
+    """
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
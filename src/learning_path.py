@@ -4,18 +4,20 @@ This module handles the creation and management of personalized learning paths.
 """
 import datetime
 import json
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field, ValidationError, validator
 
-from src.data.document_store import DocumentStore
-from src.ml.model_orchestrator import ModelOrchestrator
 from src.ml.job_market import get_job_market_stats
 from src.utils.config import (
     DEFAULT_REGION,
+    ENRICHMENT_DEADLINE,
+    ENRICHMENT_MAX_WORKERS,
     EXPERTISE_LEVELS,
     LEARNING_STYLES,
     TIME_COMMITMENTS,
@@ -26,7 +28,12 @@ from src.utils.helpers import (
     match_resources_to_learning_style,
 )
 # Import for OpenAI-powered resource search
+from src.data.path_repository import get_path_repository
 from src.ml.resource_search import search_resources
+from src.ml.structured_output import record_structured_output, repair_data, response_format_for
+from src.utils.registry import get_document_store, get_model_orchestrator
+from src.utils.singleflight import SingleFlight
+from src.utils.token_budget import context_budget, pack_context
 
 
 class ResourceItem(BaseModel):
@@ -135,6 +142,38 @@ class LearningPath(BaseModel):
         return v
 
 
+class MilestoneBatch(BaseModel):
+    """Milestones regenerated to replace invalid ones in a learning path."""
+
+    milestones: List[Milestone] = Field(description="Regenerated milestones, in the requested order")
+
+
+def invalid_milestones(error: ValidationError) -> Tuple[List[int], bool]:
+    """
+    Find the milestones a LearningPath validation error points at.
+
+    Args:
+        error: ValidationError raised by LearningPath.parse_obj
+
+    Returns:
+        (sorted indices of failing milestones, whether there are errors
+        outside individual milestones)
+    """
+    indices = set()
+    other_errors = False
+    for detail in error.errors():
+        location = detail["loc"]
+        if len(location) >= 2 and location[0] == "milestones" and isinstance(location[1], int):
+            indices.add(location[1])
+        else:
+            other_errors = True
+    return sorted(indices), other_errors
+
+
+# Coalesces identical generations across generator instances
+_path_flight = SingleFlight("generate_path")
+
+
 class LearningPathGenerator:
     """
     Core class responsible for generating personalized learning paths.
@@ -147,8 +186,8 @@ class LearningPathGenerator:
         Args:
             api_key: Optional OpenAI API key (if not provided in environment)
         """
-        self.model_orchestrator = ModelOrchestrator(api_key)
-        self.document_store = DocumentStore()
+        self.model_orchestrator = get_model_orchestrator(api_key=api_key)
+        self.document_store = get_document_store()
         self.output_parser = PydanticOutputParser(pydantic_object=LearningPath)
 
     def fetch_job_market_data(
@@ -224,6 +263,118 @@ class LearningPathGenerator:
             print(f"An unexpected error occurred while fetching related roles: {e}")
             return []
 
+    @staticmethod
+    def _default_resources() -> List[ResourceItem]:
+        """Placeholder resources used when the resource search fails."""
+        return [
+            ResourceItem(
+                type="article",
+                url="https://www.example.com/article",
+                description="Explore our curated list of articles to get started."
+            ),
+            ResourceItem(
+                type="video",
+                url="https://www.example.com/video",
+                description="Watch our introductory videos to understand the basics."
+            ),
+            ResourceItem(
+                type="book",
+                url="https://www.example.com/book",
+                description="Read our recommended book for in-depth knowledge."
+            )
+        ]
+
+    def _search_milestone_resources(self, title: str) -> List[ResourceItem]:
+        """Fetch real learning resources for a milestone via the OpenAI search helper."""
+        return [ResourceItem(**r) for r in search_resources(title, k=3)]
+
+    def _enrich_milestones(
+        self,
+        milestones: List[Milestone],
+        ai_provider: Optional[str] = None,
+        ai_model: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> None:
+        """
+        Attach job market data, related roles and resources to each milestone.
+
+        The three lookups per milestone are independent network calls, so they are
+        fanned out over a bounded thread pool and written back in milestone order.
+        A call that fails or has not finished when the stage deadline passes falls
+        back to the same defaults the sequential implementation used. Calls not
+        started by then are cancelled; calls already running cannot be
+        interrupted and end at their client's own request timeout, with their
+        results discarded.
+
+        Args:
+            milestones: Milestones to enrich in place
+            ai_provider: The AI provider to use for related roles
+            ai_model: The specific AI model to use for related roles
+            max_workers: Maximum concurrent lookups (default ENRICHMENT_MAX_WORKERS)
+            deadline: Seconds the whole stage may take (default ENRICHMENT_DEADLINE)
+        """
+        targets = [m for m in milestones if m.skills_gained]
+        if not targets:
+            return
+
+        max_workers = max(1, max_workers or ENRICHMENT_MAX_WORKERS)
+        deadline = deadline if deadline is not None else ENRICHMENT_DEADLINE
+        deadline_at = time.monotonic() + deadline
+
+        workers = min(max_workers, 3 * len(targets))
+        executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="milestone-enrichment"
+        )
+        jobs = []
+        try:
+            for milestone in targets:
+                skill_or_role_raw = milestone.skills_gained
+                if isinstance(skill_or_role_raw, list) and skill_or_role_raw:
+                    skill_or_role = str(skill_or_role_raw[0])
+                elif isinstance(skill_or_role_raw, str):
+                    skill_or_role = skill_or_role_raw
+                else:
+                    skill_or_role = "general skill"
+
+                jobs.append((
+                    milestone,
+                    executor.submit(self.fetch_job_market_data, skill_or_role),
+                    executor.submit(
+                        self.fetch_related_roles,
+                        milestone.skills_gained,
+                        ai_provider=ai_provider,
+                        ai_model=ai_model,
+                    ),
+                    executor.submit(self._search_milestone_resources, milestone.title),
+                ))
+
+            def _result(future, fallback):
+                try:
+                    return future.result(timeout=max(0.0, deadline_at - time.monotonic()))
+                except FutureTimeoutError:
+                    future.cancel()
+                    print(f"Milestone enrichment call missed the {deadline}s stage deadline, using fallback")
+                    return fallback()
+                except Exception as e:
+                    print(f"Milestone enrichment call failed: {e}")
+                    return fallback()
+
+            for milestone, market_future, roles_future, resources_future in jobs:
+                milestone.job_market_data = _result(
+                    market_future,
+                    lambda: JobMarketData(
+                        **get_job_market_stats("__fallback__"),
+                        region=DEFAULT_REGION,
+                        error="Job market lookup did not complete",
+                    ),
+                )
+                milestone.job_market_data.related_roles = _result(roles_future, list)
+                milestone.resources = _result(resources_future, self._default_resources)
+        finally:
+            # Don't block on calls that overran the deadline; their results are discarded.
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def generate_path(
         self,
         topic: str,
@@ -268,9 +419,36 @@ class LearningPathGenerator:
                 f"Invalid time commitment. Choose from: {', '.join(TIME_COMMITMENTS.keys())}"
             )
 
-        relevant_docs = self.document_store.search_documents(
-            query=topic, filters={"expertise_level": expertise_level}, top_k=10
+        # Concurrent identical requests share one generation; every caller
+        # gets its own copy with a fresh id and schedule.
+        flight_key = (
+            topic,
+            expertise_level,
+            learning_style,
+            time_commitment,
+            tuple(goals),
+            additional_info,
+            tuple(context or ()),
+            ai_provider,
+            ai_model,
+        )
+        shared_path, shared = _path_flight.do(
+            flight_key,
+            lambda: self._generate_path_content(
+                topic=topic,
+                expertise_level=expertise_level,
+                learning_style=learning_style,
+                time_commitment=time_commitment,
+                goals=goals,
+                additional_info=additional_info,
+                context=context,
+                ai_provider=ai_provider,
+                ai_model=ai_model,
+            ),
         )
+        if shared:
+            print(f"DEBUG: Reusing in-flight learning path generation for '{topic}'")
+        learning_path = shared_path.copy(deep=True)
 
         hours_map = {"minimal": 2, "moderate": 5, "substantial": 8, "intensive": 15}
         hours_per_week = hours_map.get(time_commitment, 5)
@@ -295,6 +473,52 @@ class LearningPathGenerator:
             * complexity_factor.get(expertise_level, 1.0)
         )
 
+        topic_weights = {
+            milestone.title: milestone.estimated_hours
+            for milestone in learning_path.milestones
+        }
+
+        schedule = calculate_study_schedule(
+            weeks=adjusted_duration,
+            hours_per_week=hours_per_week,
+            topic_weights=topic_weights,
+        )
+        learning_path.schedule = schedule
+
+        learning_path.total_hours = sum(
+            m.estimated_hours for m in learning_path.milestones if m.estimated_hours
+        )
+        learning_path.duration_weeks = adjusted_duration
+        learning_path.id = str(uuid.uuid4())
+        learning_path.created_at = datetime.datetime.now().isoformat()
+
+        return learning_path
+
+    def _generate_path_content(
+        self,
+        topic: str,
+        expertise_level: str,
+        learning_style: str,
+        time_commitment: str,
+        goals: List[str],
+        additional_info: Optional[str],
+        context: Optional[List[str]],
+        ai_provider: Optional[str],
+        ai_model: Optional[str],
+    ) -> LearningPath:
+        """
+        Generate, validate and enrich the caller-independent part of a learning path.
+
+        The result may be shared between concurrent callers, so it must not be
+        modified; `generate_path` works on a copy.
+
+        Returns:
+            Learning path without id, schedule or duration totals
+        """
+        relevant_docs = self.document_store.search_documents(
+            query=topic, filters={"expertise_level": expertise_level}, top_k=10
+        )
+
         prompt_content = f"""
         Generate a detailed personalized learning path for the following:
 
@@ -315,33 +539,52 @@ class LearningPathGenerator:
         Response should match the LearningPath schema.
         """
 
-        prompt_with_context = prompt_content
-        if context:
-            context_text = "\n\nAdditional Context:\n" + "\n".join(context)
-            prompt_with_context += context_text
-
         orchestrator_to_use = self.model_orchestrator
         if ai_provider:
-            custom_orchestrator = ModelOrchestrator(provider=ai_provider)
-            custom_orchestrator.init_language_model(model_name=ai_model)
-            orchestrator_to_use = custom_orchestrator
+            orchestrator_to_use = get_model_orchestrator(ai_provider, ai_model)
 
-        # Attempt up to 3 times to get a valid LearningPath JSON
+        # Agent context gets half the context budget (most recent first); the
+        # retrieved documents are packed into what is left by the orchestrator
+        prompt_with_context = prompt_content
+        if context:
+            model_name = orchestrator_to_use.model_name
+            packed_context = pack_context(
+                list(context)[::-1],
+                context_budget(model_name, prompt_content) // 2,
+                model=model_name,
+                separator="\n",
+            )[::-1]
+            if packed_context:
+                prompt_with_context += "\n\nAdditional Context:\n" + "\n".join(packed_context)
+
+        # The schema is enforced provider-side where supported and near misses
+        # are repaired locally, so another LLM call is only a last resort
+        response_format = response_format_for(LearningPath)
+        model_key = f"{orchestrator_to_use.provider}/{orchestrator_to_use.model_name}"
         parsed_successfully = False
+        repair_stats = {"repaired": False, "partial_repairs": 0}
         last_error: Optional[Exception] = None
+        attempts = 0
         for attempt in range(3):
+            attempts += 1
             if attempt > 0:
                 print(f"Retrying learning path generation (attempt {attempt+1}) due to previous validation failure…")
-            response = orchestrator_to_use.generate_structured_response(
+            response = orchestrator_to_use.generate_structured_data(
                 prompt=prompt_with_context,
                 output_schema=self.output_parser.get_format_instructions(),
                 relevant_documents=(
                     [doc.page_content for doc in relevant_docs] if relevant_docs else None
                 ),
+                relevance_scores=(
+                    [doc.metadata.get("relevance_score") for doc in relevant_docs] if relevant_docs else None
+                ),
                 temperature=0.6 + 0.1 * attempt,  # vary temperature slightly on retries
+                response_format=response_format,
+                # Incomplete milestones are regenerated by _validate_path
+                fill_milestone_defaults=False,
             )
             try:
-                learning_path: LearningPath = self.output_parser.parse(response)
+                learning_path = self._validate_path(orchestrator_to_use, response, repair_stats)
                 parsed_successfully = True
                 break
             except ValidationError as ve:
@@ -359,127 +602,153 @@ class LearningPathGenerator:
                 last_error = e
                 break  # Unexpected errors – don't retry further
 
+        record_structured_output(
+            model_key, attempts, repair_stats["repaired"], parsed_successfully, repair_stats["partial_repairs"]
+        )
         if not parsed_successfully:
-            raise RuntimeError("LearningPath generation failed after 3 attempts") from last_error
+            raise RuntimeError(f"LearningPath generation failed after {attempts} attempts") from last_error
+
+        self._enrich_milestones(
+            learning_path.milestones, ai_provider=ai_provider, ai_model=ai_model
+        )
 
         for milestone in learning_path.milestones:
-            if milestone.skills_gained:
-                skill_or_role_raw = milestone.skills_gained
-                if isinstance(skill_or_role_raw, list) and skill_or_role_raw:
-                    skill_or_role = str(skill_or_role_raw[0])
-                elif isinstance(skill_or_role_raw, str):
-                    skill_or_role = skill_or_role_raw
-                else:
-                    skill_or_role = "general skill"
+            milestone.resources = match_resources_to_learning_style(
+                resources=milestone.resources, learning_style=learning_style
+            )
 
-                milestone.job_market_data = self.fetch_job_market_data(skill_or_role)
-                related_roles = self.fetch_related_roles(
-                    milestone.skills_gained, ai_provider=ai_provider, ai_model=ai_model
-                )
-                milestone.job_market_data.related_roles = related_roles
+        return learning_path
 
-                # Fetch real learning resources via OpenAI search API and override / augment resources
-                try:
-                    openai_results = search_resources(milestone.title, k=3)
-                    milestone.resources = [
-                        ResourceItem(
-                            **r
-                        ) for r in openai_results
-                    ]
-                except Exception as _err:
-                    # If search fails, provide a default list of resources
-                    milestone.resources = [
-                        ResourceItem(
-                            type="article",
-                            url="https://www.example.com/article",
-                            description="Explore our curated list of articles to get started."
-                        ),
-                        ResourceItem(
-                            type="video",
-                            url="https://www.example.com/video",
-                            description="Watch our introductory videos to understand the basics."
-                        ),
-                        ResourceItem(
-                            type="book",
-                            url="https://www.example.com/book",
-                            description="Read our recommended book for in-depth knowledge."
-                        )
-                    ]
+    def _validate_path(self, orchestrator, response: Any, stats: Dict[str, Any]) -> LearningPath:
+        """
+        Validate a generated path, fixing what can be fixed without a full regeneration.
 
-        topic_weights = {
-            milestone.title: milestone.estimated_hours
-            for milestone in learning_path.milestones
-        }
+        Near-miss values are coerced first. Milestones that are still invalid
+        are regenerated on their own (one small call with the rest of the path
+        as context) and spliced in; anything left is filled with defaults.
+        Missing resources are not a reason to regenerate: enrichment replaces
+        milestone resources with search results afterwards.
 
-        schedule = calculate_study_schedule(
-            weeks=adjusted_duration,
-            hours_per_week=hours_per_week,
-            topic_weights=topic_weights,
+        Args:
+            orchestrator: ModelOrchestrator used for milestone regeneration
+            response: Parsed response from generate_structured_data
+            stats: Updated in place: 'repaired' is set when local repairs were
+                applied, 'partial_repairs' counts milestone regeneration calls
+
+        Returns:
+            The validated path
+
+        Raises:
+            ValidationError: If the path is still invalid
+        """
+        if not isinstance(response, dict):
+            # Already parsed by the orchestrator; validate without re-serialising
+            return LearningPath.parse_obj(response)
+
+        data, repairs = repair_data(LearningPath, response, fill_missing=False)
+        try:
+            learning_path = LearningPath.parse_obj(data)
+            stats["repaired"] = stats["repaired"] or bool(repairs)
+            return learning_path
+        except ValidationError as ve:
+            indices = invalid_milestones(ve)[0]
+
+        if indices:
+            print(f"Regenerating invalid milestones {[i + 1 for i in indices]} instead of the whole path")
+            stats["partial_repairs"] += 1
+            try:
+                data = self._regenerate_milestones(orchestrator, data, indices)
+            except Exception as e:
+                print("Milestone regeneration failed, falling back to local defaults:", e)
+
+        data, more_repairs = repair_data(LearningPath, data)
+        repairs += more_repairs
+        if repairs:
+            print(f"Repaired learning path locally: {'; '.join(repairs[:10])}")
+            stats["repaired"] = True
+        return LearningPath.parse_obj(data)
+
+    def _regenerate_milestones(
+        self, orchestrator, path_data: Dict[str, Any], indices: List[int]
+    ) -> Dict[str, Any]:
+        """
+        Regenerate only the given milestones of a path and splice them in.
+
+        Args:
+            orchestrator: ModelOrchestrator to call
+            path_data: Parsed path whose milestones at `indices` are invalid
+            indices: Indices of the milestones to regenerate
+
+        Returns:
+            Copy of the path data with those milestones replaced
+        """
+        milestones = list(path_data.get("milestones") or [])
+        context = "\n".join(
+            f"{i + 1}. {milestone.get('title', '')}"
+            for i, milestone in enumerate(milestones)
+            if i not in indices and isinstance(milestone, dict)
         )
-        learning_path.schedule = schedule
+        numbers = ", ".join(str(i + 1) for i in indices)
+        prompt = f"""
+        A learning path "{path_data.get('title', '')}" on {path_data.get('topic', 'the topic')} for a
+        {path_data.get('expertise_level', '')} learner ({path_data.get('learning_style', '')} learning style,
+        {path_data.get('time_commitment', '')}) has {len(milestones)} milestones.
+        Milestones {numbers} are incomplete or invalid and must be rewritten for their place in the sequence.
 
-        for milestone in learning_path.milestones:
-            milestone.resources = match_resources_to_learning_style(
-                resources=milestone.resources, learning_style=learning_style
-            )
+        The other milestones, for context (do not repeat them):
+        {context or "(none)"}
 
-        learning_path.total_hours = sum(
-            m.estimated_hours for m in learning_path.milestones if m.estimated_hours
+        Drafts of the milestones to rewrite:
+        {json.dumps([milestones[i] for i in indices], default=str)}
+
+        Return a JSON object {{"milestones": [...]}} with exactly {len(indices)} milestone(s), in the order
+        {numbers}. Each needs title, description, estimated_hours (integer), resources (each with type, url
+        and description) and skills_gained.
+        """
+        result = orchestrator.generate_structured_data(
+            prompt=prompt,
+            output_schema='{"milestones": [Milestone, ...]}',
+            temperature=0.4,
+            response_format=response_format_for(MilestoneBatch),
         )
-        learning_path.duration_weeks = adjusted_duration
-        learning_path.id = str(uuid.uuid4())
+        replacements = result.get("milestones") if isinstance(result, dict) else None
+        if not isinstance(replacements, list) or not replacements:
+            raise ValueError("Milestone regeneration returned no milestones")
 
-        return learning_path
+        for index, milestone in zip(indices, replacements):
+            milestones[index] = milestone
+        return {**path_data, "milestones": milestones}
 
     def save_path(
         self, learning_path: LearningPath, output_dir: str = "learning_paths"
     ) -> str:
         """
-        Save a learning path to file.
+        Save a learning path to the path repository.
 
         Args:
             learning_path (LearningPath): The learning path to save.
-            output_dir (str, optional): Directory to save the path. Defaults to "learning_paths".
+            output_dir (str, optional): Directory holding the repository. Defaults to "learning_paths".
 
         Returns:
-            str: Path to the saved file.
+            str: Path to the repository database the path was saved in.
         """
-        path_dir = Path(output_dir)
-        path_dir.mkdir(exist_ok=True, parents=True)
-
-        safe_topic = learning_path.topic.lower().replace(" ", "_")[:30]
-        filename = f"{safe_topic}_{learning_path.id[:8]}.json"
-        file_path = path_dir / filename
-
-        with open(file_path, "w") as f:
-            f.write(json.dumps(learning_path.dict(), indent=2))
-
-        return str(file_path)
+        repository = get_path_repository(output_dir, model=LearningPath)
+        repository.save(learning_path.dict(), learning_path)
+        return repository.db_path
 
     def load_path(
         self, path_id: str, input_dir: str = "learning_paths"
     ) -> Optional[LearningPath]:
         """
-        Load a learning path from file by ID.
+        Load a learning path from the path repository by ID.
 
         Args:
-            path_id (str): ID of the learning path to load.
-            input_dir (str, optional): Directory to search for the path. Defaults to "learning_paths".
+            path_id (str): ID (or ID prefix) of the learning path to load.
+            input_dir (str, optional): Directory holding the repository. Defaults to "learning_paths".
 
         Returns:
             Optional[LearningPath]: The loaded learning path or None if not found.
         """
-        path_dir = Path(input_dir)
-        if not path_dir.exists():
+        if not Path(input_dir).exists():
             return None
-
-        for file_path in path_dir.glob(f"*_{path_id[:8]}.json"):
-            try:
-                with open(file_path, "r") as f:
-                    path_data = json.load(f)
-                    if path_data.get("id", "").startswith(path_id):
-                        return LearningPath(**path_data)
-            except Exception:
-                continue
-
-        return None
+        return get_path_repository(input_dir, model=LearningPath).get(path_id)
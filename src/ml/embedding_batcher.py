@@ -0,0 +1,291 @@
+"""Token-budgeted, concurrent embedding requests.
+
+`EmbeddingBatcher` groups texts into batches by estimated token count (not by
+item count), sends a bounded number of batches concurrently and adapts to rate
+limits: a rate-limited batch is split in half and requeued, every worker pauses
+for an exponential backoff, and the concurrency limit is halved, then grows
+back one step at a time as requests succeed. Large ingestions are therefore
+limited by throughput rather than per-request latency.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional, Sequence, Tuple
+
+from src.utils.config import (
+    EMBEDDING_BATCH_MAX_ITEMS,
+    EMBEDDING_BATCH_TOKENS,
+    EMBEDDING_CONCURRENCY,
+)
+
+try:
+    from langchain_core.embeddings import Embeddings as _EmbeddingsBase
+except ImportError:  # LangChain is optional for the batcher itself
+    _EmbeddingsBase = object
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheaply estimate the token count of a text (about four characters per token).
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated number of tokens
+    """
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """
+    Whether an exception from an embeddings client signals rate limiting.
+
+    Args:
+        exc: Exception raised by the client
+
+    Returns:
+        True for HTTP 429 / rate-limit errors
+    """
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    message = str(exc).lower()
+    return "rate limit" in message or "ratelimit" in message or "429" in message
+
+
+class EmbeddingBatcher:
+    """
+    Embeds texts in token-budgeted batches with bounded concurrency.
+    """
+    def __init__(
+        self,
+        embed: EmbedFn,
+        max_batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+        max_batch_items: int = EMBEDDING_BATCH_MAX_ITEMS,
+        max_concurrency: int = EMBEDDING_CONCURRENCY,
+        max_retries: int = 6,
+        backoff_base: float = 1.0,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            embed: Callable embedding a list of texts (one API request)
+            max_batch_tokens: Token budget per request
+            max_batch_items: Maximum number of texts per request
+            max_concurrency: Maximum number of requests in flight
+            max_retries: Rate-limit retries allowed per text before giving up
+            backoff_base: Base delay in seconds for rate-limit backoff
+            count_tokens: Function estimating the tokens in a text
+        """
+        self._embed = embed
+        self.max_batch_tokens = max(1, max_batch_tokens)
+        self.max_batch_items = max(1, max_batch_items)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.count_tokens = count_tokens
+        self.requests = 0
+        self.rate_limited = 0
+
+    def make_batches(self, texts: Sequence[str]) -> List[List[int]]:
+        """
+        Group text indices into batches that fit the token and item budgets.
+
+        A text larger than the token budget gets a batch of its own.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of batches, each a list of indices into `texts`
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for index, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_items
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Embed texts, preserving input order.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector per text
+
+        Raises:
+            The client's exception if a batch fails for a reason other than
+            rate limiting, or keeps being rate limited after `max_retries`
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+
+        batches = self.make_batches(texts)
+        return _BatchRun(self, texts, batches, min(self.max_concurrency, len(batches))).run()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = self.backoff_base * (2 ** attempt)
+        return min(60.0, delay) * (0.5 + random.random() / 2)
+
+
+class _BatchRun:
+    """State of a single `EmbeddingBatcher.embed` call shared by its workers."""
+
+    def __init__(self, batcher: EmbeddingBatcher, texts: List[str], batches: List[List[int]], concurrency: int):
+        self.batcher = batcher
+        self.texts = texts
+        self.results: List[Optional[List[float]]] = [None] * len(texts)
+        self.pending: Deque[Tuple[List[int], int]] = deque((batch, 0) for batch in batches)
+        self.concurrency = concurrency
+        self.allowed = concurrency
+        self.in_flight = 0
+        self.pause_until = 0.0
+        self.error: Optional[BaseException] = None
+        self.cond = threading.Condition()
+
+    def run(self) -> List[List[float]]:
+        if self.concurrency == 1:
+            # A single request needs no threads but still retries on rate limits
+            self._worker()
+        else:
+            threads = [
+                threading.Thread(target=self._worker, name=f"embed-batch-{i}", daemon=True)
+                for i in range(self.concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        if self.error is not None:
+            raise self.error
+        return self.results  # type: ignore[return-value]
+
+    def _next_batch(self) -> Optional[Tuple[List[int], int]]:
+        with self.cond:
+            while True:
+                if self.error is not None or (not self.pending and self.in_flight == 0):
+                    return None
+                wait = self.pause_until - time.monotonic()
+                if self.pending and self.in_flight < self.allowed and wait <= 0:
+                    self.in_flight += 1
+                    self.batcher.requests += 1
+                    return self.pending.popleft()
+                self.cond.wait(timeout=wait if wait > 0 else None)
+
+    def _worker(self) -> None:
+        while True:
+            item = self._next_batch()
+            if item is None:
+                return
+            batch, attempt = item
+            try:
+                vectors = self.batcher._embed([self.texts[i] for i in batch])
+            except Exception as exc:
+                self._on_error(batch, attempt, exc)
+                continue
+
+            with self.cond:
+                for index, vector in zip(batch, vectors):
+                    self.results[index] = list(vector)
+                self.in_flight -= 1
+                # Additive increase after a success
+                if self.allowed < self.concurrency:
+                    self.allowed += 1
+                self.cond.notify_all()
+
+    def _on_error(self, batch: List[int], attempt: int, exc: Exception) -> None:
+        with self.cond:
+            self.in_flight -= 1
+            if is_rate_limit_error(exc) and attempt < self.batcher.max_retries:
+                self.batcher.rate_limited += 1
+                delay = self.batcher._backoff(attempt)
+                logger.warning(
+                    "Embedding request rate limited (%s texts); retrying in %.1fs", len(batch), delay
+                )
+                # Multiplicative decrease: fewer, smaller requests until they succeed again
+                self.allowed = max(1, self.allowed // 2)
+                self.pause_until = max(self.pause_until, time.monotonic() + delay)
+                if len(batch) > 1:
+                    middle = len(batch) // 2
+                    self.pending.appendleft((batch[middle:], attempt + 1))
+                    self.pending.appendleft((batch[:middle], attempt + 1))
+                else:
+                    self.pending.appendleft((batch, attempt + 1))
+            elif self.error is None:
+                self.error = exc
+            self.cond.notify_all()
+
+
+class BatchedEmbeddings(_EmbeddingsBase):
+    """
+    LangChain embeddings wrapper that sends `embed_documents` through an EmbeddingBatcher.
+    """
+    def __init__(self, embeddings: Any, symmetric_queries: bool = False, **batcher_options: Any):
+        """
+        Initialize the wrapper.
+
+        Args:
+            embeddings: LangChain embeddings object
+            symmetric_queries: The model embeds queries like documents, so
+                `embed_queries` may batch them through `embed_documents`
+            **batcher_options: Options passed to EmbeddingBatcher
+        """
+        self.embeddings = embeddings
+        self.symmetric_queries = symmetric_queries
+        self.batcher = EmbeddingBatcher(embeddings.embed_documents, **batcher_options)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.batcher.embed(texts)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        if self.symmetric_queries:
+            return self.batcher.embed(texts)
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class BatchedEmbeddingFunction:
+    """
+    Chroma embedding function wrapper that sends calls through an EmbeddingBatcher.
+    """
+    def __init__(self, function: EmbedFn, **batcher_options: Any):
+        """
+        Initialize the wrapper.
+
+        Args:
+            function: Chroma embedding function
+            **batcher_options: Options passed to EmbeddingBatcher
+        """
+        self.function = function
+        self.batcher = EmbeddingBatcher(function, **batcher_options)
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.batcher.embed(input)
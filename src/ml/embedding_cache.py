@@ -0,0 +1,376 @@
+"""Persistent cache for text embeddings.
+
+Vectors are keyed on (model, SHA-256 of the text) and stored as float32 blobs
+in a local SQLite database shared by every embedding client in the process
+(and by the worker processes of a host). Repeated queries and re-indexing of
+unchanged documents therefore skip the embeddings API. The least recently used
+entries are evicted once the cache grows past its bound.
+
+`CachedEmbeddings` wraps a LangChain embeddings object and
+`CachedEmbeddingFunction` wraps a Chroma embedding function; both read through
+the cache and only send misses to the wrapped client. Query embeddings are
+cached under their own key, since asymmetric models embed queries and
+passages differently.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.config import (
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_PATH,
+)
+
+try:
+    from langchain_core.embeddings import Embeddings as _EmbeddingsBase
+except ImportError:  # LangChain is optional for the cache itself
+    _EmbeddingsBase = object
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed embedding cache with LRU eviction.
+    """
+    def __init__(
+        self,
+        db_path: str = EMBEDDING_CACHE_PATH,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+    ):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            db_path: Path of the SQLite database file
+            max_entries: Maximum number of vectors kept before LRU eviction
+        """
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_accessed REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_accessed ON embeddings (last_accessed)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """
+        Return the hex SHA-256 digest used to key a text.
+
+        Args:
+            text: Text that is embedded
+
+        Returns:
+            Hex-encoded SHA-256 digest
+        """
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached vectors.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            A float32 vector per text, or None for texts that are not cached
+        """
+        hashes = [self.text_hash(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        now = time.time()
+        unique = list(dict.fromkeys(hashes))
+
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_CHUNK):
+                chunk = unique[start:start + _LOOKUP_CHUNK]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *chunk),
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_accessed = ? WHERE model = ? AND text_hash IN "
+                        f"({', '.join('?' for _ in rows)})",
+                        (now, model, *(row[0] for row in rows)),
+                    )
+            self._conn.commit()
+
+            results = [found.get(text_hash) for text_hash in hashes]
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def set_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Store vectors, evicting least recently used entries if needed.
+
+        Args:
+            model: Embedding model name
+            texts: Texts that were embedded
+            vectors: One vector per text
+        """
+        if not texts:
+            return
+
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            array = np.asarray(vector, dtype=np.float32)
+            rows.append((model, self.text_hash(text), int(array.shape[0]), array.tobytes(), now))
+
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector, last_accessed)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        """Trim the table to `max_entries` (lock must be held)."""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                """
+                DELETE FROM embeddings WHERE rowid IN (
+                    SELECT rowid FROM embeddings ORDER BY last_accessed ASC LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def clear(self) -> None:
+        """Remove every cached vector and reset the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return cache counters for this process.
+
+        Returns:
+            Dictionary with hits, misses, evictions, hit_rate and entries
+        """
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+            }
+
+
+def query_model_name(model: str) -> str:
+    """
+    Cache key model name for query embeddings.
+
+    Asymmetric models embed a query differently from the same text as a
+    passage, so query vectors are cached apart from document vectors.
+
+    Args:
+        model: Embedding model name
+
+    Returns:
+        Model name for query cache entries
+    """
+    return f"{model}#query"
+
+
+def embed_with_cache(
+    cache: Optional[EmbeddingCache],
+    model: str,
+    texts: Sequence[str],
+    embed: Callable[[List[str]], Sequence[Sequence[float]]],
+) -> List[List[float]]:
+    """
+    Embed texts, sending only cache misses (deduplicated) to `embed`.
+
+    Args:
+        cache: Embedding cache, or None to call `embed` directly
+        model: Embedding model name used in the cache key
+        texts: Texts to embed
+        embed: Callable embedding a list of texts
+
+    Returns:
+        One vector per input text, in input order
+    """
+    texts = list(texts)
+    if cache is None or not texts:
+        return [list(vector) for vector in embed(texts)] if texts else []
+
+    try:
+        vectors: List[Optional[Any]] = cache.get_many(model, texts)
+    except sqlite3.Error as exc:  # caching must never break embedding
+        logger.warning("Embedding cache lookup failed: %s", exc)
+        return [list(vector) for vector in embed(texts)]
+
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    if missing:
+        fresh = embed(missing)
+        computed = dict(zip(missing, fresh))
+        vectors = [computed[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        try:
+            cache.set_many(model, missing, fresh)
+        except sqlite3.Error as exc:
+            logger.warning("Embedding cache write failed: %s", exc)
+
+    # Fresh vectors are rounded to float32 as well, so hits and misses agree exactly
+    return [np.asarray(vector, dtype=np.float32).tolist() for vector in vectors]
+
+
+class CachedEmbeddings(_EmbeddingsBase):
+    """
+    LangChain embeddings wrapper that reads through the embedding cache.
+    """
+    def __init__(self, embeddings: Any, model_name: str, cache: Optional[EmbeddingCache] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            embeddings: LangChain embeddings object to call on cache misses
+            model_name: Embedding model name used in the cache key
+            cache: Embedding cache (default: the process-wide cache)
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or get_embedding_cache()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return embed_with_cache(self.cache, self.model_name, texts, self.embeddings.embed_documents)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        if hasattr(self.embeddings, "embed_queries"):
+            embed = self.embeddings.embed_queries
+        else:
+            embed = lambda misses: [self.embeddings.embed_query(text) for text in misses]  # noqa: E731
+        return embed_with_cache(self.cache, query_model_name(self.model_name), texts, embed)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+
+class CachedEmbeddingFunction:
+    """
+    Chroma embedding function wrapper that reads through the embedding cache.
+    """
+    def __init__(self, function: Callable[[List[str]], Any], model_name: str, cache: Optional[EmbeddingCache] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            function: Chroma embedding function to call on cache misses
+            model_name: Embedding model name used in the cache key
+            cache: Embedding cache (default: the process-wide cache)
+        """
+        self.function = function
+        self.model_name = model_name
+        self.cache = cache or get_embedding_cache()
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return embed_with_cache(self.cache, self.model_name, input, self.function)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        embed = getattr(self.function, "embed_queries", self.function)
+        return embed_with_cache(self.cache, query_model_name(self.model_name), texts, embed)
+
+
+def cache_embeddings(embeddings: Any, model_name: str) -> Any:
+    """
+    Wrap LangChain embeddings with the shared cache when caching is enabled.
+
+    Args:
+        embeddings: LangChain embeddings object
+        model_name: Embedding model name used in the cache key
+
+    Returns:
+        A CachedEmbeddings wrapper, or `embeddings` unchanged if caching is off
+    """
+    cache = get_embedding_cache()
+    return CachedEmbeddings(embeddings, model_name, cache) if cache is not None else embeddings
+
+
+def cache_embedding_function(function: Callable[[List[str]], Any], model_name: str) -> Any:
+    """
+    Wrap a Chroma embedding function with the shared cache when caching is enabled.
+
+    Args:
+        function: Chroma embedding function
+        model_name: Embedding model name used in the cache key
+
+    Returns:
+        A CachedEmbeddingFunction wrapper, or `function` unchanged if caching is off
+    """
+    cache = get_embedding_cache()
+    return CachedEmbeddingFunction(function, model_name, cache) if cache is not None else function
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Return the process-wide embedding cache, or None when caching is disabled.
+    """
+    global _cache
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = EmbeddingCache()
+                except Exception as exc:  # broad catch – caching must never break embedding
+                    logger.warning("Embedding cache unavailable: %s", exc)
+                    return None
+    return _cache
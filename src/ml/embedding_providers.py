@@ -0,0 +1,340 @@
+"""Pluggable embedding providers.
+
+`EMBEDDING_PROVIDER` selects where vectors come from:
+
+- ``openai``: the OpenAI embeddings API (`EMBEDDING_MODEL`), sent through the
+  token-budgeted batcher.
+- ``local``: a sentence-transformers model (`LOCAL_EMBEDDING_MODEL`, by default
+  all-MiniLM-L6-v2) run on the CPU. The quantised ONNX export is used when
+  available, so a query embeds in a few milliseconds and nothing leaves the
+  machine.
+
+Both providers are read through the shared embedding cache. `get_embeddings`
+returns a LangChain embeddings object (FAISS, EmbeddingService) and
+`get_embedding_function` a Chroma embedding function (DocumentStore). The
+local model is loaded once per process and shared by both.
+"""
+from __future__ import annotations
+
+import logging
+import platform
+import re
+import threading
+from typing import Any, List, Optional
+
+from src.ml.embedding_batcher import BatchedEmbeddingFunction, BatchedEmbeddings
+from src.ml.embedding_cache import cache_embedding_function, cache_embeddings
+from src.utils.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_PROVIDER,
+    LOCAL_EMBEDDING_BACKEND,
+    LOCAL_EMBEDDING_BATCH_SIZE,
+    LOCAL_EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_QUANTIZED,
+    OPENAI_API_KEY,
+)
+
+try:
+    from langchain_core.embeddings import Embeddings as _EmbeddingsBase
+except ImportError:  # LangChain is optional for the local provider
+    _EmbeddingsBase = object
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("openai", "local")
+# sentence-transformers prompt name for search queries
+QUERY_PROMPT = "query"
+
+
+def onnx_file_name(quantized: bool = LOCAL_EMBEDDING_QUANTIZED) -> str:
+    """
+    Choose the ONNX export to load for this CPU.
+
+    Sentence-transformers model repositories ship int8 exports for ARM and
+    AVX2 machines next to the float model.
+
+    Args:
+        quantized: Whether to use an int8 quantised export
+
+    Returns:
+        Path of the ONNX file inside the model repository
+    """
+    if not quantized:
+        return "onnx/model.onnx"
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+
+def local_model_name(
+    model: str = LOCAL_EMBEDDING_MODEL,
+    backend: str = LOCAL_EMBEDDING_BACKEND,
+    quantized: bool = LOCAL_EMBEDDING_QUANTIZED,
+) -> str:
+    """
+    Identify a local model variant for cache keys and index manifests.
+
+    Quantised and float models produce slightly different vectors, so they
+    must not share cached embeddings or indexes.
+
+    Returns:
+        Model identifier such as 'local:all-MiniLM-L6-v2@onnx-int8'
+    """
+    variant = "onnx-int8" if backend == "onnx" and quantized else backend
+    return f"local:{model}@{variant}"
+
+
+def embedding_model_name(provider: str = EMBEDDING_PROVIDER) -> str:
+    """
+    Return the identifier of the configured embedding model.
+
+    Args:
+        provider: Embedding provider
+
+    Returns:
+        Model identifier
+    """
+    return local_model_name() if provider == "local" else EMBEDDING_MODEL
+
+
+def collection_suffix(provider: str = EMBEDDING_PROVIDER) -> str:
+    """
+    Suffix for vector collections so models of different dimensions never mix.
+
+    OpenAI keeps the original collection names.
+
+    Args:
+        provider: Embedding provider
+
+    Returns:
+        '' for OpenAI, otherwise '_' plus a slug of the local model name
+    """
+    if provider != "local":
+        return ""
+    slug = re.sub(r"[^a-z0-9]+", "-", LOCAL_EMBEDDING_MODEL.rsplit("/", 1)[-1].lower()).strip("-")
+    return f"_{slug}"
+
+
+class LocalEmbeddings(_EmbeddingsBase):
+    """
+    CPU sentence-transformers embeddings, loaded on first use.
+    """
+    def __init__(
+        self,
+        model: str = LOCAL_EMBEDDING_MODEL,
+        backend: str = LOCAL_EMBEDDING_BACKEND,
+        quantized: bool = LOCAL_EMBEDDING_QUANTIZED,
+        batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+    ):
+        """
+        Initialize the embeddings.
+
+        Args:
+            model: Hugging Face model ID or local directory
+            backend: 'onnx' (onnxruntime) or 'torch'
+            quantized: Prefer the int8 ONNX export
+            batch_size: Texts per inference batch
+        """
+        self.model_name = model
+        self.backend = backend
+        self.quantized = quantized
+        self.batch_size = max(1, batch_size)
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> Any:
+        """The loaded SentenceTransformer (loads it on first access)."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self) -> Any:
+        from sentence_transformers import SentenceTransformer
+
+        attempts = []
+        if self.backend == "onnx":
+            if self.quantized:
+                attempts.append({"backend": "onnx", "model_kwargs": {"file_name": onnx_file_name(True)}})
+            attempts.append({"backend": "onnx"})
+        attempts.append({})
+
+        for options in attempts:
+            try:
+                model = SentenceTransformer(self.model_name, device="cpu", **options)
+                logger.info("Loaded local embedding model %s (%s)", self.model_name, options or "torch")
+                return model
+            except (TypeError, ValueError, OSError, ImportError) as e:
+                # Older sentence-transformers has no `backend`; some repos have no ONNX export
+                logger.warning("Could not load %s with %s: %s", self.model_name, options or "torch", e)
+        raise RuntimeError(f"Failed to load local embedding model {self.model_name}")
+
+    def _encode(self, texts: List[str], prompt_name: Optional[str] = None) -> List[List[float]]:
+        if not texts:
+            return []
+        options = {"prompt_name": prompt_name} if prompt_name else {}
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            **options,
+        )
+        return vectors.astype("float32").tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed search queries in one batch.
+
+        Models with a query prompt (e5, instruct models) prefix it to every
+        query; symmetric models embed queries like documents.
+
+        Args:
+            texts: Queries to embed
+
+        Returns:
+            One vector per query
+        """
+        prompts = getattr(self.model, "prompts", None) or {}
+        return self._encode(texts, QUERY_PROMPT if QUERY_PROMPT in prompts else None)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+
+class LocalEmbeddingFunction:
+    """
+    Chroma embedding function backed by LocalEmbeddings.
+    """
+    def __init__(self, embeddings: LocalEmbeddings):
+        """
+        Initialize the function.
+
+        Args:
+            embeddings: Shared local embeddings
+        """
+        self.embeddings = embeddings
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(input)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_queries(texts)
+
+
+def embed_queries(embedder: Any, texts: List[str]) -> List[List[float]]:
+    """
+    Embed search queries with LangChain embeddings or a Chroma embedding function.
+
+    Query and passage embeddings differ for asymmetric models, so queries go
+    through `embed_queries` (one batch) when the embedder offers it, then
+    `embed_query` per text. Plain Chroma functions have no query mode and are
+    called with the whole list.
+
+    Args:
+        embedder: LangChain embeddings object or Chroma embedding function
+        texts: Queries to embed
+
+    Returns:
+        One vector per query
+    """
+    texts = list(texts)
+    if hasattr(embedder, "embed_queries"):
+        return embedder.embed_queries(texts)
+    if hasattr(embedder, "embed_query"):
+        return [embedder.embed_query(text) for text in texts]
+    return embedder(texts)
+
+
+def complete_query_embeddings(
+    embedder: Any, queries: List[str], embeddings: Optional[List[Optional[List[float]]]] = None
+) -> List[List[float]]:
+    """
+    Embed the queries whose embeddings were not precomputed.
+
+    Args:
+        embedder: LangChain embeddings object or Chroma embedding function
+        queries: Search queries
+        embeddings: Optional precomputed embedding (or None) per query
+
+    Returns:
+        One vector per query
+    """
+    vectors = list(embeddings) if embeddings is not None else [None] * len(queries)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        for i, vector in zip(missing, embed_queries(embedder, [queries[i] for i in missing])):
+            vectors[i] = vector
+    return vectors
+
+
+def get_local_embeddings() -> LocalEmbeddings:
+    """
+    Return the process-wide local embedding model.
+    """
+    from src.utils.registry import shared_instance
+
+    key = ("local_embeddings", LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_BACKEND, LOCAL_EMBEDDING_QUANTIZED)
+    return shared_instance(key, LocalEmbeddings)
+
+
+def _check_provider(provider: str) -> None:
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown embedding provider '{provider}'. Use one of {', '.join(PROVIDERS)}")
+
+
+def get_embeddings(api_key: Optional[str] = None, provider: str = EMBEDDING_PROVIDER) -> Any:
+    """
+    Build LangChain embeddings for the configured provider.
+
+    Args:
+        api_key: OpenAI API key (OpenAI provider only)
+        provider: Embedding provider
+
+    Returns:
+        Cached LangChain embeddings object
+    """
+    _check_provider(provider)
+    if provider == "local":
+        embeddings = get_local_embeddings()
+    else:
+        from langchain_openai import OpenAIEmbeddings
+
+        # OpenAI embeds queries and documents alike, so queries are batched too
+        embeddings = BatchedEmbeddings(
+            OpenAIEmbeddings(api_key=api_key or OPENAI_API_KEY, model=EMBEDDING_MODEL),
+            symmetric_queries=True,
+        )
+    return cache_embeddings(embeddings, embedding_model_name(provider))
+
+
+def get_embedding_function(api_key: Optional[str] = None, provider: str = EMBEDDING_PROVIDER) -> Any:
+    """
+    Build a Chroma embedding function for the configured provider.
+
+    Args:
+        api_key: OpenAI API key (OpenAI provider only)
+        provider: Embedding provider
+
+    Returns:
+        Cached Chroma embedding function
+    """
+    _check_provider(provider)
+    if provider == "local":
+        function = LocalEmbeddingFunction(get_local_embeddings())
+    else:
+        from chromadb.utils import embedding_functions
+
+        function = BatchedEmbeddingFunction(
+            embedding_functions.OpenAIEmbeddingFunction(
+                api_key=api_key or OPENAI_API_KEY,
+                model_name=EMBEDDING_MODEL,
+            )
+        )
+    return cache_embedding_function(function, embedding_model_name(provider))
@@ -2,15 +2,15 @@
 Vector embedding utilities for the AI Learning Path Generator.
 Handles text vectorization for semantic search.
 """
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
 import numpy as np
 
-# Import directly from langchain-openai instead of openai
-from langchain_openai import OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema.document import Document
 
-from src.utils.config import OPENAI_API_KEY, EMBEDDING_MODEL
+from src.ml.embedding_providers import get_embeddings
+from src.ml.similarity import normalize_rows, pairwise_similarity, top_k_similar
+from src.utils.config import OPENAI_API_KEY, EMBEDDING_PROVIDER
 
 class EmbeddingService:
     """
@@ -25,14 +25,11 @@ class EmbeddingService:
         """
         self.api_key = api_key or OPENAI_API_KEY
         
-        if not self.api_key:
+        if not self.api_key and EMBEDDING_PROVIDER == "openai":
             raise ValueError("OpenAI API key is required. Please provide it or set the OPENAI_API_KEY environment variable.")
         
-        # Initialize the embedding model - langchain_openai handles the new API format internally
-        self.embeddings = OpenAIEmbeddings(
-            api_key=self.api_key,
-            model=EMBEDDING_MODEL
-        )
+        # Initialize the embedding model (OpenAI or local, per EMBEDDING_PROVIDER)
+        self.embeddings = get_embeddings(self.api_key)
         
         # Initialize text splitter for chunking
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -122,3 +119,50 @@ class EmbeddingService:
             return 0  # Handle zero vectors
         
         return dot_product / (norm1 * norm2)
+
+    def build_matrix(self, embeddings: List[List[float]]) -> np.ndarray:
+        """
+        Prepare candidate embeddings for batch similarity.
+
+        Normalise once and reuse the matrix for every query.
+
+        Args:
+            embeddings: Candidate embedding vectors
+
+        Returns:
+            float32 matrix of unit-length rows
+        """
+        return normalize_rows(embeddings)
+
+    def rank_by_similarity(
+        self,
+        query_embedding: List[float],
+        matrix: np.ndarray,
+        k: int = 10
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rank candidates against a query embedding.
+
+        Args:
+            query_embedding: Query vector
+            matrix: Candidate matrix from `build_matrix`
+            k: Number of results
+
+        Returns:
+            Tuple of (candidate indices, cosine similarities), best first
+        """
+        return top_k_similar(query_embedding, matrix, k)
+
+    def similarity_matrix(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Calculate cosine similarity between every pair of candidates.
+
+        Useful for de-duplication and clustering.
+
+        Args:
+            matrix: Candidate matrix from `build_matrix`
+
+        Returns:
+            (N, N) float32 similarity matrix
+        """
+        return pairwise_similarity(matrix)
@@ -12,12 +12,13 @@ previously so the UI still renders a snapshot.
 from __future__ import annotations
 
 import os
-import json
 import logging
 from typing import Dict, Any
 
 import openai
 
+from src.utils.json_extract import extract_json
+
 # Initialize OpenAI with any key available at import time.
 # We will refresh this inside each call to ensure the latest env value is used.
 openai.api_key = os.getenv("OPENAI_API_KEY")
@@ -59,17 +60,8 @@ def _call_openai(prompt: str, timeout: int = 45) -> str:
 
 
 def _extract_json(text: str) -> Dict[str, Any]:
-    # Attempt direct parse; else strip back-ticks fences
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        if "```" in text:
-            inner = text.split("```")[1]
-            try:
-                return json.loads(inner)
-            except json.JSONDecodeError:
-                pass
-    raise ValueError("Unable to parse JSON from OpenAI response")
+    # Handles code fences and surrounding prose; raises ValueError otherwise
+    return extract_json(text, expect=dict)
 
 
 def get_job_market_stats(topic: str) -> Dict[str, Any]:
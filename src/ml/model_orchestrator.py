@@ -38,6 +38,11 @@ class BaseModel(PydanticBaseModel):
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
 from langchain.chains.llm import LLMChain
 
+from src.ml.response_cache import ResponseCache, get_response_cache
+from src.ml.structured_output import downgrade, mark_unsupported, supported_format
+from src.utils.json_extract import JSONExtractionError, parse_json_response
+from src.utils.singleflight import SingleFlight
+from src.utils.token_budget import context_budget, pack_context
 from src.utils.config import (
     OPENAI_API_KEY,
     DEEPSEEK_API_KEY,  # Kept for legacy compatibility
@@ -47,6 +52,10 @@ from src.utils.config import (
     TEMPERATURE
 )
 
+# Shared across orchestrator instances so identical prompts from different
+# requests are coalesced too
+_completion_flight = SingleFlight("llm_completion")
+
 class ModelOrchestrator:
     """
     Manages AI model interactions with RAG capabilities.
@@ -61,10 +70,10 @@ class ModelOrchestrator:
             provider: Optional provider name ('openai' or 'deepseek')
         """
         self.provider = provider.lower() if provider else DEFAULT_PROVIDER
-        self.context = []
+        # Instances are shared process-wide (see get_model_orchestrator), so
+        # they hold no per-conversation context or history; callers pass it in
         self.goal = None
         self.planning_enabled = True
-        self.memory = []
         
         # Set up API key based on selected provider
         if self.provider == 'openai':
@@ -204,11 +213,96 @@ class ModelOrchestrator:
                 return self.switch_provider('openai', OPENAI_API_KEY, model_name or DEFAULT_MODEL)
             raise ValueError(error_msg) from e
     
+    def _cached_completion(
+        self,
+        prompt: str,
+        system_message: str,
+        temperature: float,
+        max_tokens: int,
+        complete,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Return a completion from the response cache, calling the model on a miss.
+
+        Concurrent misses for the same key are coalesced into a single call.
+
+        Args:
+            prompt: The full user prompt
+            system_message: The system message sent with the prompt
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            complete: Zero-argument callable that performs the actual API call
+            response_format: Optional response_format sent with the request
+
+        Returns:
+            The generated (or cached) response text
+        """
+        key = ResponseCache.make_key(
+            model=self.model_name,
+            system_message=system_message,
+            prompt=prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_format=response_format,
+        )
+        cache = get_response_cache()
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                print(f"DEBUG: LLM response cache hit for model {self.model_name}")
+                return cached
+
+        def _complete_and_store() -> str:
+            response_text = complete()
+            if cache is not None:
+                cache.set(key, response_text, model=self.model_name)
+            return response_text
+
+        # Identical prompts already in flight share one API call
+        response_text, shared = _completion_flight.do(key, _complete_and_store)
+        if shared:
+            print(f"DEBUG: Shared in-flight completion for model {self.model_name}")
+        return response_text
+
+    def _build_context(
+        self,
+        prompt: str,
+        relevant_documents: Optional[List[str]],
+        relevance_scores: Optional[List[float]] = None,
+    ) -> str:
+        """
+        Pack relevant documents into the context section of a prompt.
+        
+        The most relevant distinct documents are kept within CONTEXT_TOKEN_BUDGET
+        and whatever the model's window leaves after the prompt and MAX_TOKENS.
+        
+        Args:
+            prompt: The prompt the context is appended to
+            relevant_documents: Candidate documents
+            relevance_scores: Optional score per document
+            
+        Returns:
+            The context section, or an empty string
+        """
+        if not relevant_documents:
+            return ""
+        documents = pack_context(
+            relevant_documents,
+            context_budget(self.model_name, prompt),
+            scores=relevance_scores,
+            model=self.model_name,
+        )
+        if not documents:
+            return ""
+        return "Relevant information:\n" + "\n\n".join(documents)
+    
     def generate_response(
         self, 
         prompt: str, 
         relevant_documents: Optional[List[str]] = None,
         temperature: Optional[float] = None,
+        relevance_scores: Optional[List[float]] = None,
     ) -> str:
         """
         Generate a text response from the language model.
@@ -217,14 +311,14 @@ class ModelOrchestrator:
             prompt: The prompt for the model
             relevant_documents: Optional list of relevant documents to add context
             temperature: Optional override for model temperature
+            relevance_scores: Optional score per document, used to choose which
+                documents fit the context budget
             
         Returns:
             The generated response as a string
         """
         # Prepare context with relevant documents if available
-        context = ""
-        if relevant_documents and len(relevant_documents) > 0:
-            context = "Relevant information:\n" + "\n\n".join(relevant_documents)
+        context = self._build_context(prompt, relevant_documents, relevance_scores)
         
         # Create the full prompt with context
         full_prompt = f"{prompt}\n\n{context}" if context else prompt
@@ -243,14 +337,22 @@ class ModelOrchestrator:
                 print(f"DEBUG: Using model: {self.model_name}")
                 print(f"DEBUG: Prompt length: {len(full_prompt)} chars")
                 
+                system_message = "You are an expert educational AI assistant that specializes in creating personalized learning paths."
+                
                 # Use our direct implementation that bypasses the client library
-                response_text = generate_completion(
-                    prompt=full_prompt,
-                    system_message="You are an expert educational AI assistant that specializes in creating personalized learning paths.",
-                    model=self.model_name,
-                    temperature=temp,
-                    max_tokens=MAX_TOKENS,
-                    timeout=120
+                response_text = self._cached_completion(
+                    full_prompt,
+                    system_message,
+                    temp,
+                    MAX_TOKENS,
+                    lambda: generate_completion(
+                        prompt=full_prompt,
+                        system_message=system_message,
+                        model=self.model_name,
+                        temperature=temp,
+                        max_tokens=MAX_TOKENS,
+                        timeout=120
+                    ),
                 )
                 
                 print(f"DEBUG: API call completed in {time.time() - start_time:.2f} seconds")
@@ -299,6 +401,41 @@ class ModelOrchestrator:
         Returns:
             The generated response as a JSON string
         """
+        return json.dumps(self.generate_structured_data(prompt, output_schema, relevant_documents, temperature))
+
+    def generate_structured_data(
+        self,
+        prompt: str,
+        output_schema: str,
+        relevant_documents: Optional[List[str]] = None,
+        temperature: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        relevance_scores: Optional[List[float]] = None,
+        fill_milestone_defaults: bool = True,
+    ) -> Any:
+        """
+        Generate a structured response and return it parsed.
+        
+        Use this instead of `generate_structured_response` when the result is
+        validated with a pydantic model, to skip the JSON round trip.
+        
+        Args:
+            prompt: The prompt for the model
+            output_schema: The schema instructions for the output
+            relevant_documents: Optional list of relevant documents to add context
+            temperature: Optional override for model temperature
+            response_format: Optional provider-side response format (see
+                src.ml.structured_output.response_format_for); downgraded
+                automatically for models that reject it
+            relevance_scores: Optional score per document, used to choose which
+                documents fit the context budget
+            fill_milestone_defaults: For learning paths, fill missing milestone
+                fields with placeholders; pass False when the caller repairs
+                milestones itself, so validation reports the incomplete ones
+            
+        Returns:
+            The parsed JSON value (a dict for learning paths)
+        """
         # Determine if this is a learning path generation
         is_learning_path = 'LearningPath' in output_schema
         
@@ -340,9 +477,7 @@ class ModelOrchestrator:
         """
         
         # Prepare context with relevant documents if available
-        context = ""
-        if relevant_documents and len(relevant_documents) > 0:
-            context = "Relevant information:\n" + "\n\n".join(relevant_documents)
+        context = self._build_context(schema_prompt, relevant_documents, relevance_scores)
         
         # Create the full prompt with context
         full_prompt = f"{schema_prompt}\n\n{context}" if context else schema_prompt
@@ -381,23 +516,28 @@ class ModelOrchestrator:
                     
             # OpenAI is the primary provider now
             
+            system_message = "You are an expert AI assistant that specializes in generating structured responses following specified schemas. Always include all required fields in your JSON response."
             if self.provider == 'openai':
-                from src.direct_openai import generate_completion
                 print("Attempting to generate OpenAI completion...")
-                response_text = generate_completion(
-                    prompt=full_prompt,
-                    system_message="You are an expert AI assistant that specializes in generating structured responses following specified schemas. Always include all required fields in your JSON response.",
-                    model=self.model_name,
-                    temperature=temp,
-                    max_tokens=MAX_TOKENS,
-                    timeout=300  # Increase timeout for reliability
+                response_text = self._openai_structured_completion(
+                    full_prompt, system_message, temp, response_format
                 )
                 print(f"Successfully generated completion with {len(response_text) if response_text else 0} characters")
             elif self.provider == 'deepseek':
-                response_text = self._deepseek_completion(
+                # DeepSeek supports JSON mode but not JSON schemas
+                deepseek_format = {"type": "json_object"} if response_format else None
+                response_text = self._cached_completion(
                     full_prompt,
+                    system_message,
                     temp,
-                    system_message="You are an expert AI assistant that specializes in generating structured responses following specified schemas. Always include all required fields in your JSON response."
+                    MAX_TOKENS,
+                    lambda: self._deepseek_completion(
+                        full_prompt,
+                        temp,
+                        system_message=system_message,
+                        response_format=deepseek_format,
+                    ),
+                    response_format=deepseek_format,
                 )
             # OpenAI is the primary provider now
             else:
@@ -414,14 +554,14 @@ class ModelOrchestrator:
                     return self._create_fallback_learning_path()
                 else:
                     # Return a fallback generic response
-                    return json.dumps({
+                    return {
                         "summary": "Sorry, I encountered an error retrieving information.",
                         "key_concepts": ["Error occurred while processing your request"],
                         "learning_path": ["Please try again with a different query"],
                         "resources": [],
                         "code_examples": [],
                         "advanced_topics": []
-                    })
+                    }
                 
         except Exception as e:
             print(f"DEBUG: Structured response generation failed: {str(e)}")
@@ -431,7 +571,7 @@ class ModelOrchestrator:
                 return self._create_fallback_learning_path()
             else:
                 # Return a fallback generic response
-                return json.dumps({
+                return {
                     "summary": f"Sorry, I encountered an error: {str(e)}",
                     "key_concepts": ["Unable to extract structured information"],
                     "learning_path": ["Please try asking in a different way"],
@@ -439,29 +579,14 @@ class ModelOrchestrator:
                     "code_examples": [],
                     "advanced_topics": [],
                     "career_applications": []
-                })
+                }
         
-        # Extract JSON from the response
+        # Extract JSON from the response in a single pass (fences, surrounding
+        # prose, trailing commas and truncated output are handled there)
         try:
-            # Try to find JSON in the response (may be enclosed in ```json blocks)
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                json_str = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                json_str = response_text[json_start:json_end].strip()
-            else:
-                json_str = response_text.strip()
-            
-            # Validate JSON
-            data = json.loads(json_str)
-
-            # If expecting a learning path but received a list or wrong type, fallback
-            if is_learning_path and not isinstance(data, dict):
-                print("DEBUG: Expected learning path dict but received different type, returning fallback path.")
-                return self._create_fallback_learning_path()
+            data, method = parse_json_response(response_text, expect=dict if is_learning_path else None)
+            if method != "direct":
+                print(f"DEBUG: Recovered JSON from response ({method})")
 
             # For learning paths, validate that all required fields are present
             if is_learning_path:
@@ -507,7 +632,7 @@ class ModelOrchestrator:
                             data['total_hours'] = 40
                             
                 # Also check that each milestone has the required fields
-                if 'milestones' in data and isinstance(data['milestones'], list):
+                if fill_milestone_defaults and isinstance(data.get('milestones'), list):
                     milestone_required_fields = ['title', 'description', 'estimated_hours', 'resources', 'skills_gained']
                     for i, milestone in enumerate(data['milestones']):
                         milestone_missing_fields = [field for field in milestone_required_fields if field not in milestone]
@@ -528,59 +653,70 @@ class ModelOrchestrator:
                                 elif field == 'skills_gained':
                                     milestone['skills_gained'] = [f"Skills related to {data.get('topic', 'the subject')}"]
             
-            return json.dumps(data)
+            return data
         except Exception as e:
-            print(f"DEBUG: Error parsing initial JSON: {str(e)}")
-            
-            # First cleanup attempt - remove common prefixes
-            cleaned_response = response_text.strip()
-            for prefix in ["+", "-", "*", "#", "Response:", "JSON:"]:
-                if cleaned_response.startswith(prefix):
-                    cleaned_response = cleaned_response[len(prefix):].strip()
-            
-            try:
-                # Try to parse the cleaned response
-                data = json.loads(cleaned_response)
-                return json.dumps(data)
-            except Exception as e2:
-                print(f"DEBUG: Error parsing cleaned JSON: {str(e2)}")
-                
-                # Second attempt - try to find and extract JSON from markdown codeblock
-                try:
-                    import re
-                    json_matches = re.findall(r'\{.*?\}', response_text, re.DOTALL)
-                    if json_matches:
-                        for potential_json in json_matches:
-                            try:
-                                data = json.loads(potential_json)
-                                return json.dumps(data)
-                            except:
-                                continue
-                except Exception as e3:
-                    print(f"DEBUG: Error in regex extraction: {str(e3)}")
-                
-                # Return a fallback JSON as last resort instead of raising an exception
-                print("DEBUG: Returning fallback JSON structure due to parsing failure")
-                return json.dumps({
-                    "summary": "Failed to parse the AI's response. The content might not be in the expected JSON format.",
-                    "key_concepts": ["JSON parsing error"],
-                    "learning_path": ["Please try a different query or check the AI provider's output directly if possible."],
-                    "resources": [],
-                    "code_examples": [],
-                    "advanced_topics": [],
-                    "error_details": "The AI's response could not be successfully parsed as JSON after multiple attempts."
-                })
-                return json.dumps({
-                    "summary": f"I processed your request but encountered a formatting issue. Your question was about: {response_text[:100]}...",
-                    "key_concepts": ["Unable to extract structured information"],
-                    "learning_path": ["Please try asking in a different way"],
-                    "resources": [],
-                    "code_examples": [],
-                    "advanced_topics": [],
-                    "career_applications": []
-                })
+            print(f"DEBUG: Could not extract JSON from response: {str(e)}")
+            if is_learning_path:
+                return self._create_fallback_learning_path()
+            return {
+                "summary": "Failed to parse the AI's response. The content might not be in the expected JSON format.",
+                "key_concepts": ["JSON parsing error"],
+                "learning_path": ["Please try a different query or check the AI provider's output directly if possible."],
+                "resources": [],
+                "code_examples": [],
+                "advanced_topics": [],
+                "error_details": "The AI's response could not be parsed as JSON."
+            }
     
-    def _deepseek_completion(self, prompt: str, temperature: float, system_message: str = None):
+    def _openai_structured_completion(
+        self,
+        prompt: str,
+        system_message: str,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]],
+    ) -> str:
+        """
+        Call OpenAI with the strongest response_format the model accepts.
+
+        A model that rejects a format (HTTP 400 mentioning response_format) is
+        remembered and the request is repeated with the next weaker format
+        (json_schema -> json_object -> prompt only).
+        """
+        from src.direct_openai import generate_completion
+
+        response_format = supported_format(self.model_name, response_format)
+        while True:
+            try:
+                return self._cached_completion(
+                    prompt,
+                    system_message,
+                    temperature,
+                    MAX_TOKENS,
+                    lambda: generate_completion(
+                        prompt=prompt,
+                        system_message=system_message,
+                        model=self.model_name,
+                        temperature=temperature,
+                        max_tokens=MAX_TOKENS,
+                        timeout=300,  # Increase timeout for reliability
+                        response_format=response_format,
+                    ),
+                    response_format=response_format,
+                )
+            except ValueError as e:
+                if not response_format or "response_format" not in str(e):
+                    raise
+                print(f"DEBUG: {self.model_name} rejected response_format {response_format['type']}, downgrading")
+                mark_unsupported(self.model_name, response_format)
+                response_format = downgrade(response_format)
+
+    def _deepseek_completion(
+        self,
+        prompt: str,
+        temperature: float,
+        system_message: str = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ):
         """Call DeepSeek API for chat completion.
         
         The helper explicitly adds a **system** message reminding the model to comply with the
@@ -611,6 +747,8 @@ class ModelOrchestrator:
             "temperature": temperature or 0.2,
             "max_tokens": MAX_TOKENS,
         }
+        if response_format:
+            payload_base["response_format"] = response_format
         
         def _post(messages):
             start = time.time()
@@ -639,9 +777,9 @@ class ModelOrchestrator:
             
             # Quick JSON sanity check; if it fails we'll retry with a reduced prompt.
             try:
-                json.loads(response_text.strip("`"))
+                parse_json_response(response_text)
                 return response_text
-            except Exception:
+            except JSONExtractionError:
                 print("DEBUG: DeepSeek response not valid JSON, retrying with simplified instructions...")
             
             # 2nd attempt – simplified prompt focusing on schema only
@@ -658,7 +796,7 @@ class ModelOrchestrator:
             print(traceback.format_exc())
             raise
 
-    def _create_fallback_learning_path(self):
+    def _create_fallback_learning_path(self) -> Dict[str, Any]:
         """
         Create a fallback learning path with default values when generation fails.
         """
@@ -698,7 +836,7 @@ class ModelOrchestrator:
             "total_hours": 25,
             "created_at": datetime.datetime.now().isoformat()
         }
-        return json.dumps(fallback_path)
+        return fallback_path
         
     def analyze_difficulty(self, content: str) -> float:
         """
@@ -819,12 +957,18 @@ class ModelOrchestrator:
         Returns:
             Generated learning path
         """
-        # Combine provided context with stored context
-        full_context = self.context + (context or [])
+        # Add planning notes for this request to the caller's context
+        full_context = list(context or [])
+        if self.planning_enabled:
+            full_context += self._plan_path_generation(topic, expertise_level, learning_style, full_context)
         
-        # Plan if planning is enabled
-        if self.planning_enabled and hasattr(self, '_plan_path_generation'):
-            self._plan_path_generation(topic, expertise_level, learning_style, full_context)
+        # Keep the most recent distinct context that fits the budget
+        packed_context = pack_context(
+            full_context[::-1],
+            context_budget(self.model_name),
+            model=self.model_name,
+            separator=" ",
+        )[::-1]
         
         # Generate path with context
         prompt = f"""Generate a learning path for the following topic:
@@ -834,20 +978,12 @@ class ModelOrchestrator:
         Learning Style: {learning_style}
         
         Context:
-        {' '.join(full_context)}
-        
-        Previous answers:
-        {' '.join(self.memory)}
+        {' '.join(packed_context)}
         
         Generate a structured learning path with milestones and resources.
         """
         
-        path = self._generate_text(prompt)
-        
-        # Store path in memory
-        self.memory.append(f"Generated path for {topic} with {expertise_level} level and {learning_style} style")
-        
-        return path
+        return self._generate_text(prompt)
     
     def generate_answer(self, question: str, context: Optional[List[str]] = None, temperature: Optional[float] = None) -> str:
         """
@@ -861,53 +997,51 @@ class ModelOrchestrator:
         Returns:
             Generated answer
         """
-        # Combine provided context with stored context
-        full_context = self.context + (context or [])
-        
-        # Plan if planning is enabled
-        if self.planning_enabled and hasattr(self, '_plan_answer_generation'):
-            self._plan_answer_generation(question, full_context)
+        # Add planning notes for this question to the caller's context
+        full_context = list(context or [])
+        if self.planning_enabled:
+            full_context += self._plan_answer_generation(question, full_context)
         
-        # Generate answer with context
+        # The context is packed into the token budget and appended once by
+        # generate_response
         prompt = f"""Answer the following question based on the provided context:
         
-        Context:
-        {' '.join(full_context)}
-        
         Question: {question}"""
         
-        # Store question in memory
-        self.memory.append(f"Question: {question}")
-        
         # Generate and return the answer
         return self.generate_response(prompt, relevant_documents=full_context, temperature=temperature)
     
-    def _plan_answer_generation(self, question: str, context: List[str]) -> None:
+    def _plan_answer_generation(self, question: str, context: List[str]) -> List[str]:
         """
         Plan the answer generation process.
         
         Args:
             question: The question to answer
             context: Context information
+            
+        Returns:
+            Planning notes to add to this question's context
         """
+        notes = []
         # Analyze the question to determine the best approach
         question_lower = question.lower()
         
         # Determine if we need more context
         if len(context) < 2 and not any(keyword in question_lower for keyword in ["what", "how", "why", "when", "where", "who"]):
-            self.context.append("Need more context for this question")
+            notes.append("Need more context for this question")
             
         # Determine the type of question
         if "how" in question_lower:
-            self.context.append("This is a procedural question")
+            notes.append("This is a procedural question")
         elif "why" in question_lower:
-            self.context.append("This is an explanatory question")
+            notes.append("This is an explanatory question")
         elif "what" in question_lower:
-            self.context.append("This is a definitional question")
+            notes.append("This is a definitional question")
         elif "compare" in question_lower or "difference" in question_lower:
-            self.context.append("This is a comparative question")
+            notes.append("This is a comparative question")
+        return notes
             
-    def _plan_path_generation(self, topic: str, expertise_level: str, learning_style: str, context: List[str]) -> None:
+    def _plan_path_generation(self, topic: str, expertise_level: str, learning_style: str, context: List[str]) -> List[str]:
         """
         Plan the learning path generation process.
         
@@ -916,21 +1050,26 @@ class ModelOrchestrator:
             expertise_level: User's expertise level
             learning_style: User's preferred learning style
             context: Context information
+            
+        Returns:
+            Planning notes to add to this path's context
         """
+        notes = []
         # Determine the appropriate depth and breadth based on expertise level
         if expertise_level == "beginner":
-            self.context.append("Focus on fundamentals and basic concepts")
+            notes.append("Focus on fundamentals and basic concepts")
         elif expertise_level == "intermediate":
-            self.context.append("Include practical applications and case studies")
+            notes.append("Include practical applications and case studies")
         elif expertise_level == "advanced":
-            self.context.append("Include advanced techniques and research papers")
+            notes.append("Include advanced techniques and research papers")
             
         # Adjust for learning style
         if learning_style == "visual":
-            self.context.append("Prioritize video resources and diagrams")
+            notes.append("Prioritize video resources and diagrams")
         elif learning_style == "auditory":
-            self.context.append("Prioritize podcasts and audio lectures")
+            notes.append("Prioritize podcasts and audio lectures")
         elif learning_style == "reading":
-            self.context.append("Prioritize books and articles")
+            notes.append("Prioritize books and articles")
         elif learning_style == "kinesthetic":
-            self.context.append("Prioritize hands-on projects and exercises")
+            notes.append("Prioritize hands-on projects and exercises")
+        return notes
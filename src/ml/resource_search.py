@@ -11,13 +11,14 @@ continues to work.
 """
 from __future__ import annotations
 
-import json
 import logging
 import os
 from typing import Dict, List
 
 import openai
 
+from src.utils.json_extract import extract_json
+
 # Initialize OpenAI with any key available at import time.
 # We will refresh this inside each call to ensure the latest env value is used.
 openai.api_key = os.getenv("OPENAI_API_KEY")
@@ -65,7 +66,7 @@ def search_resources(query: str, k: int = 3, timeout: int = 45) -> List[Dict[str
         )
         content = completion.choices[0].message.content.strip()
 
-        resources: List[Dict[str, str]] = json.loads(content)
+        resources: List[Dict[str, str]] = extract_json(content, expect=list)
         # Basic sanitisation & trimming
         cleaned: List[Dict[str, str]] = []
         for item in resources[:k]:
@@ -0,0 +1,232 @@
+"""Persistent, content-addressed cache for LLM completions.
+
+Responses are keyed on a SHA-256 of everything that determines the completion
+(model, system message, prompt, temperature and max_tokens) and stored in a
+local SQLite database so they survive restarts and are shared between the
+worker processes of a single host. Entries expire after a TTL and the least
+recently used entries are evicted once the cache grows past its bound.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from src.utils.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    SQLite-backed LLM response cache with TTL expiry and LRU eviction.
+    """
+    def __init__(
+        self,
+        db_path: str = LLM_CACHE_PATH,
+        ttl_seconds: Optional[int] = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ):
+        """
+        Initialize the response cache.
+
+        Args:
+            db_path: Path of the SQLite database file
+            ttl_seconds: Lifetime of an entry in seconds (None or 0 disables expiry)
+            max_entries: Maximum number of entries kept before LRU eviction
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds or None
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_accessed ON responses (last_accessed)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        model: str,
+        system_message: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Build the content address for a completion request.
+
+        Args:
+            model: Model name
+            system_message: System message sent with the prompt
+            prompt: User prompt
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            response_format: Optional response_format sent with the request
+
+        Returns:
+            Hex-encoded SHA-256 digest
+        """
+        parts = [model, system_message, prompt, round(float(temperature), 4), int(max_tokens)]
+        if response_format:
+            # Only appended when present so existing keys stay valid
+            parts.append(response_format)
+        payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key produced by `make_key`
+
+        Returns:
+            The cached response text, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+            if self.ttl_seconds and created_at + self.ttl_seconds < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET last_accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return response
+
+    def set(self, key: str, response: str, model: Optional[str] = None) -> None:
+        """
+        Store a response, evicting least recently used entries if needed.
+
+        Args:
+            key: Key produced by `make_key`
+            response: Response text to cache
+            model: Optional model name, kept for inspection
+        """
+        if not response:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO responses (key, model, response, created_at, last_accessed)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, model, response, now, now),
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        """Drop expired entries and trim the table to `max_entries` (lock must be held)."""
+        if self.ttl_seconds:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_accessed ASC LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def clear(self) -> None:
+        """Remove every cached response and reset the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return cache counters for this process.
+
+        Returns:
+            Dictionary with hits, misses, evictions, hit_rate and entries
+        """
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Return the process-wide response cache, or None when caching is disabled.
+    """
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = ResponseCache()
+                except Exception as exc:  # broad catch – caching must never break generation
+                    logger.warning("LLM response cache unavailable: %s", exc)
+                    return None
+    return _cache
@@ -0,0 +1,96 @@
+"""Vectorised cosine similarity over embedding matrices.
+
+Candidates are stored once as a float32 matrix of unit-length rows
+(`normalize_rows`), so scoring a query is a single matrix-vector product and
+ranking uses `np.argpartition` (O(N)) instead of a full sort. Results are
+returned as index and score arrays; nothing is converted to Python lists.
+"""
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+ArrayLike = Union[np.ndarray, Sequence[Sequence[float]], Sequence[float]]
+
+
+def normalize_rows(vectors: ArrayLike) -> np.ndarray:
+    """
+    Convert vectors to a float32 matrix of unit-length rows.
+
+    Zero vectors stay zero (they score 0 against everything).
+
+    Args:
+        vectors: A single vector or a (N, dimension) collection of vectors
+
+    Returns:
+        float32 array of shape (N, dimension)
+    """
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def cosine_scores(query: ArrayLike, matrix: np.ndarray) -> np.ndarray:
+    """
+    Score one query against every row of a normalised matrix.
+
+    Args:
+        query: Query vector (need not be normalised)
+        matrix: Output of `normalize_rows`
+
+    Returns:
+        float32 array of N cosine similarities
+    """
+    return matrix @ normalize_rows(query)[0]
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest scores, best first.
+
+    Args:
+        scores: 1-D array of scores
+        k: Number of results
+
+    Returns:
+        Tuple of (indices, scores), each of length min(k, len(scores))
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=scores.dtype)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order, scores[order]
+
+
+def top_k_similar(query: ArrayLike, matrix: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the rows of a normalised matrix most similar to a query.
+
+    Args:
+        query: Query vector
+        matrix: Output of `normalize_rows`
+        k: Number of results
+
+    Returns:
+        Tuple of (row indices, cosine similarities), best first
+    """
+    return top_k(cosine_scores(query, matrix), k)
+
+
+def pairwise_similarity(matrix: np.ndarray, other: np.ndarray = None) -> np.ndarray:
+    """
+    Cosine similarity between every pair of rows.
+
+    Args:
+        matrix: Output of `normalize_rows`, shape (N, dimension)
+        other: Optional second normalised matrix, shape (M, dimension);
+            defaults to `matrix`
+
+    Returns:
+        float32 array of shape (N, M)
+    """
+    return matrix @ (matrix if other is None else other).T
@@ -0,0 +1,336 @@
+"""
+Schema-constrained generation helpers.
+
+`response_format_for` turns a pydantic model into an OpenAI `response_format`
+so the provider constrains decoding to the schema (STRUCTURED_OUTPUT_MODE:
+'json_schema' for strict structured outputs, 'json_object' for JSON mode, or
+'prompt' to rely on the prompt alone). Models that reject a mode are
+remembered and downgraded to the next one.
+
+`repair_data` fills missing required fields and coerces near-miss values
+("10 hours" for an int, a string where a list is expected) against the
+model's fields, so most invalid responses are fixed locally instead of with
+another LLM call. `StructuredOutputMetrics` counts attempts, repairs and
+retries per model.
+"""
+import copy
+import logging
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+
+from src.utils.config import STRUCTURED_OUTPUT_MODE
+
+logger = logging.getLogger(__name__)
+
+# Not useful to constrain: generated server-side or filled in after generation
+DEFAULT_EXCLUDE = ("id", "created_at", "schedule", "job_market_data")
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_DROPPED_KEYWORDS = ("title", "default")
+
+
+def json_schema_for(model: Type[BaseModel], exclude: Iterable[str] = DEFAULT_EXCLUDE) -> Dict[str, Any]:
+    """
+    Build a strict-mode compatible JSON schema for a model.
+
+    References are inlined, every object lists all its properties as required
+    and forbids additional ones, optional fields become nullable, and
+    free-form objects (e.g. Dict[str, Any]) are left out because strict mode
+    cannot express them.
+
+    Args:
+        model: Pydantic model
+        exclude: Property names omitted at every level
+
+    Returns:
+        JSON schema dictionary
+    """
+    # model.schema() is cached by pydantic; never modify it in place
+    schema = copy.deepcopy(model.schema())
+    definitions = schema.pop("definitions", {})
+    excluded = set(exclude)
+
+    def convert(node: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if "$ref" in node:
+            node = definitions[node["$ref"].rsplit("/", 1)[-1]]
+        if "allOf" in node and len(node["allOf"]) == 1:
+            node = {**node["allOf"][0], **{k: v for k, v in node.items() if k != "allOf"}}
+            return convert(node)
+        node = {k: v for k, v in node.items() if k not in _DROPPED_KEYWORDS}
+
+        if node.get("type") == "object":
+            properties = node.get("properties")
+            if not properties:
+                return None
+            required = set(node.get("required", []))
+            converted = {}
+            for name, child in properties.items():
+                if name in excluded:
+                    continue
+                child = convert(child)
+                if child is None:
+                    continue
+                converted[name] = child if name in required else {"anyOf": [child, {"type": "null"}]}
+            node["properties"] = converted
+            node["required"] = list(converted)
+            node["additionalProperties"] = False
+        elif node.get("type") == "array" and "items" in node:
+            items = convert(node["items"])
+            if items is None:
+                return None
+            node["items"] = items
+        return node
+
+    return convert(schema)
+
+
+def response_format_for(
+    model: Type[BaseModel],
+    mode: str = STRUCTURED_OUTPUT_MODE,
+    name: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Build the OpenAI `response_format` for a model.
+
+    Args:
+        model: Pydantic model
+        mode: 'json_schema', 'json_object' or 'prompt'
+        name: Schema name (defaults to the model name)
+
+    Returns:
+        The response_format payload, or None in 'prompt' mode
+    """
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": name or model.__name__, "schema": json_schema_for(model), "strict": True},
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    if mode == "prompt":
+        return None
+    raise ValueError(f"Unknown structured output mode: {mode}")
+
+
+def downgrade(response_format: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Return the next weaker response_format (json_schema -> json_object -> None).
+
+    Args:
+        response_format: Format a model rejected
+
+    Returns:
+        The format to try instead
+    """
+    if response_format and response_format.get("type") == "json_schema":
+        return {"type": "json_object"}
+    return None
+
+
+_unsupported: Dict[str, Set[str]] = {}
+_unsupported_lock = threading.Lock()
+
+
+def mark_unsupported(model_name: str, response_format: Dict[str, Any]) -> None:
+    """Remember that a model rejected a response_format type."""
+    logger.info("Model %s rejected response_format %s; downgrading", model_name, response_format["type"])
+    with _unsupported_lock:
+        _unsupported.setdefault(model_name, set()).add(response_format["type"])
+
+
+def supported_format(model_name: str, response_format: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Downgrade a response_format past the types a model is known to reject.
+
+    Args:
+        model_name: Model name
+        response_format: Requested format
+
+    Returns:
+        The strongest format not known to be rejected, or None
+    """
+    with _unsupported_lock:
+        rejected = set(_unsupported.get(model_name, ()))
+    while response_format and response_format["type"] in rejected:
+        response_format = downgrade(response_format)
+    return response_format
+
+
+def _default_for(field) -> Any:
+    if field.shape == SHAPE_LIST:
+        return []
+    if field.shape != SHAPE_SINGLETON:
+        return {}
+    if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+        return repair_data(field.type_, {})[0]
+    return {str: "", int: 0, float: 0.0, bool: False}.get(field.type_, None)
+
+
+def _from_string(model: Type[BaseModel], text: str) -> Dict[str, Any]:
+    """Turn a bare string into a minimal object, e.g. a resource given as a title."""
+    for name in ("title", "name", "description"):
+        if name in model.__fields__:
+            return {name: text}
+    return {}
+
+
+def _coerce(field, value: Any, path: str, repairs: List[str], fill_missing: bool) -> Any:
+    if field.shape == SHAPE_LIST:
+        if not isinstance(value, list):
+            repairs.append(f"{path}: wrapped in a list")
+            value = [value] if value not in ("", None) else []
+        return [
+            _coerce_item(field.type_, item, f"{path}[{i}]", repairs, fill_missing)
+            for i, item in enumerate(value)
+        ]
+    if field.shape == SHAPE_SINGLETON:
+        return _coerce_item(field.type_, value, path, repairs, fill_missing)
+    return value
+
+
+def _coerce_item(type_: Any, value: Any, path: str, repairs: List[str], fill_missing: bool) -> Any:
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        if isinstance(value, str):
+            repairs.append(f"{path}: string converted to {type_.__name__}")
+            value = _from_string(type_, value)
+        if isinstance(value, dict):
+            value, nested = repair_data(type_, value, path, fill_missing=fill_missing)
+            repairs.extend(nested)
+        return value
+    if type_ in (int, float) and isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match:
+            number = float(match.group())
+            coerced = int(round(number)) if type_ is int else number
+            if str(coerced) != value.strip():
+                repairs.append(f"{path}: {value!r} coerced to {coerced}")
+            return coerced
+    if type_ is int and isinstance(value, float):
+        return int(round(value))
+    if type_ is str and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if type_ is str and isinstance(value, list) and all(isinstance(v, str) for v in value):
+        repairs.append(f"{path}: list joined into a string")
+        return ", ".join(value)
+    return value
+
+
+def repair_data(
+    model: Type[BaseModel],
+    data: Dict[str, Any],
+    path: str = "",
+    fill_missing: bool = True,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Fill missing required fields and coerce near-miss values for a model.
+
+    Values the model's validators can already handle are left alone; fields
+    with defaults are left to pydantic.
+
+    Args:
+        model: Pydantic model the data will be validated against
+        data: Parsed response (not modified)
+        path: Prefix for the repair descriptions
+        fill_missing: Fill missing required fields with type defaults; with
+            False only values that are present are coerced, so validation
+            still reports what is missing
+
+    Returns:
+        (repaired copy of the data, list of repairs made)
+    """
+    data = copy.deepcopy(data)
+    repairs: List[str] = []
+    for name, field in model.__fields__.items():
+        key = field.alias
+        location = f"{path}.{name}" if path else name
+        value = data.get(key)
+        if value is None:
+            if field.required and fill_missing:
+                data[key] = _default_for(field)
+                repairs.append(f"{location}: missing, filled with a default")
+            elif key in data and not field.allow_none:
+                del data[key]
+            continue
+        data[key] = _coerce(field, value, location, repairs, fill_missing)
+    return data, repairs
+
+
+class StructuredOutputMetrics:
+    """
+    Per-model counters for structured generation.
+    """
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        model_name: str,
+        attempts: int,
+        repaired: bool,
+        succeeded: bool,
+        partial_repairs: int = 0,
+    ) -> None:
+        """
+        Record one structured generation.
+
+        Args:
+            model_name: Provider/model identifier
+            attempts: Full generations made (1 when no retry was needed)
+            repaired: Whether a local repair was applied
+            succeeded: Whether a valid object was produced
+            partial_repairs: Smaller LLM calls that regenerated only the
+                invalid parts
+        """
+        with self._lock:
+            counts = self._counts.setdefault(
+                model_name,
+                {"requests": 0, "attempts": 0, "retries": 0, "repaired": 0, "partial_repairs": 0, "failures": 0},
+            )
+            counts["requests"] += 1
+            counts["attempts"] += attempts
+            counts["retries"] += attempts - 1
+            counts["repaired"] += int(repaired)
+            counts["partial_repairs"] += partial_repairs
+            counts["failures"] += int(not succeeded)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return counters and rates per model.
+
+        Returns:
+            Mapping of model to requests, attempts, retries, repaired,
+            partial_repairs, failures, retry_rate and repair_rate
+        """
+        with self._lock:
+            return {
+                model_name: {
+                    **counts,
+                    "retry_rate": counts["retries"] / counts["requests"],
+                    "repair_rate": counts["repaired"] / counts["requests"],
+                }
+                for model_name, counts in self._counts.items()
+            }
+
+
+_metrics = StructuredOutputMetrics()
+
+
+def structured_output_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the process-wide structured generation counters per model."""
+    return _metrics.stats()
+
+
+def record_structured_output(
+    model_name: str,
+    attempts: int,
+    repaired: bool,
+    succeeded: bool,
+    partial_repairs: int = 0,
+) -> None:
+    """Record one structured generation in the process-wide counters."""
+    _metrics.record(model_name, attempts, repaired, succeeded, partial_repairs)
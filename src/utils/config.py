@@ -2,11 +2,13 @@
 Configuration utilities for the AI Learning Path Generator.
 Loads environment variables and provides configuration settings across the application.
 """
+import logging
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
+logger = logging.getLogger(__name__)
+
 # Load environment variables from .env file, expecting it at project root (2 levels up from this file).
 # This ensures changes in .env are picked up correctly.
 # Load .env file only if not on Render
@@ -14,16 +16,14 @@ if not os.environ.get('RENDER'):
     dotenv_path = Path(__file__).resolve().parents[2] / '.env'
     if dotenv_path.is_file():
         load_dotenv(dotenv_path=dotenv_path)
-        print(f"--- Successfully loaded .env from: {dotenv_path} ---")
+        logger.debug("Loaded .env from %s", dotenv_path)
     else:
         # Fallback to default python-dotenv behavior (searches current dir and parents)
         # This can be helpful if the script is run from an unexpected location.
-        print(f"--- .env not found at {dotenv_path}, attempting default load_dotenv() search. ---")
-        loaded_by_default = load_dotenv()
-        if loaded_by_default:
-            print(f"--- Successfully loaded .env from default location (e.g., {os.getcwd()}/.env or parent). ---")
+        if load_dotenv():
+            logger.debug(".env not found at %s; loaded it from the default search path", dotenv_path)
         else:
-            print("--- WARNING: .env file not found by explicit path or default search. Environment variables may not be set. ---")
+            logger.warning(".env file not found; environment variables may not be set")
 
 # Development mode flag - checked before raising key errors
 DEV_MODE = os.getenv('DEV_MODE', 'False').lower() == 'true'
@@ -44,18 +44,83 @@ DEFAULT_PROVIDER = os.getenv("DEFAULT_PROVIDER", "openai").lower()
 # Model configuration
 DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gpt-3.5-turbo")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+# Embedding provider: 'openai' (API) or 'local' (sentence-transformers on CPU, works offline)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_BACKEND = os.getenv("LOCAL_EMBEDDING_BACKEND", "onnx").lower()  # onnx | torch
+LOCAL_EMBEDDING_QUANTIZED = os.getenv("LOCAL_EMBEDDING_QUANTIZED", "True").lower() in ("true", "1", "t")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", "1000"))
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
+# Prompt context packing: tokens allowed for retrieved documents (0 = whatever
+# fits), and the model context window (0 = look it up from the model name)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+MODEL_CONTEXT_WINDOW = int(os.getenv("MODEL_CONTEXT_WINDOW", "0"))
+# Context strings an agent session keeps (oldest are dropped first; 0 keeps none)
+AGENT_CONTEXT_MAX_ITEMS = int(os.getenv("AGENT_CONTEXT_MAX_ITEMS", "50"))
 
 # (Deprecated) Perplexity settings – retained for legacy tests but not used by the app.
 PERPLEXITY_MODEL = os.getenv("PERPLEXITY_MODEL", "pplx-7b-online")  # noqa: E501
 
 # Vector database settings
 VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "./vector_db")
+# Serve the FAISS index memory-mapped from a published version (whole index with
+# faiss >= 1.9, otherwise only IVF inverted lists are shared between workers)
+VECTOR_INDEX_MMAP = os.getenv("VECTOR_INDEX_MMAP", "True").lower() in ("true", "1", "t")
+VECTOR_INDEX_RELOAD_INTERVAL = float(os.getenv("VECTOR_INDEX_RELOAD_INTERVAL", "5"))  # seconds
+# FAISS index type: flat | ivf_flat | hnsw | ivf_pq (see src/data/ann_index.py)
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat").lower()
+VECTOR_INDEX_NLIST = int(os.getenv("VECTOR_INDEX_NLIST", "0"))  # 0 = about 4 * sqrt(N)
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "16"))
+VECTOR_INDEX_HNSW_M = int(os.getenv("VECTOR_INDEX_HNSW_M", "32"))
+VECTOR_INDEX_EF_CONSTRUCTION = int(os.getenv("VECTOR_INDEX_EF_CONSTRUCTION", "200"))
+VECTOR_INDEX_EF_SEARCH = int(os.getenv("VECTOR_INDEX_EF_SEARCH", "64"))
+VECTOR_INDEX_PQ_M = int(os.getenv("VECTOR_INDEX_PQ_M", "16"))
+VECTOR_INDEX_TRAIN_SAMPLE = int(os.getenv("VECTOR_INDEX_TRAIN_SAMPLE", "100000"))
+
+# Local cache settings
+CACHE_DIR = os.getenv("CACHE_DIR", "./cache")
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_responses.sqlite3"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(CACHE_DIR, "embeddings.sqlite3"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# In-memory retrieval result cache (invalidated on every store write)
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "2000"))
+
+# Structured generation: 'json_schema' (provider-enforced schema), 'json_object'
+# (JSON mode) or 'prompt' (schema in the prompt only)
+STRUCTURED_OUTPUT_MODE = os.getenv("STRUCTURED_OUTPUT_MODE", "json_schema").lower()
+
+# Saved learning paths kept hydrated in memory by the path repository
+PATH_REPOSITORY_CACHE_SIZE = int(os.getenv("PATH_REPOSITORY_CACHE_SIZE", "256"))
+
+# Embedding request batching (token budget per request, requests in flight)
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "100000"))
+EMBEDDING_BATCH_MAX_ITEMS = int(os.getenv("EMBEDDING_BATCH_MAX_ITEMS", "512"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
 
 # Region settings
 DEFAULT_REGION = os.getenv("DEFAULT_REGION", "North America")
 
+# Milestone enrichment settings (job market, related roles, resource search)
+ENRICHMENT_MAX_WORKERS = int(os.getenv("ENRICHMENT_MAX_WORKERS", "8"))
+# Seconds the whole enrichment stage may take (ENRICHMENT_TIMEOUT is the old name)
+ENRICHMENT_DEADLINE = float(os.getenv("ENRICHMENT_DEADLINE", os.getenv("ENRICHMENT_TIMEOUT", "45")))
+
+# Background job settings
+JOB_BACKEND = os.getenv("JOB_BACKEND", "sqlite").lower()
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # concurrent jobs per process
+JOB_RUN_WORKERS = os.getenv("JOB_RUN_WORKERS", "True").lower() in ("true", "1", "t")  # in the dev server
+JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", "2"))
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "120"))  # seconds without a heartbeat
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", str(24 * 3600)))  # seconds
+
 # Web app settings
 DEBUG = os.getenv("DEBUG", "True").lower() in ("true", "1", "t")
 PORT = int(os.getenv("PORT", "5000"))
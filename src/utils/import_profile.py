@@ -0,0 +1,156 @@
+"""Import-time profiling helpers.
+
+Runs a snippet under `python -X importtime` in a fresh interpreter and
+summarises the raw report: total start-up import time, the slowest modules
+(cumulative and self time) and the self time attributed to each top-level
+package. Used by the `flask import-profile` command to track cold-start
+regressions.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+DEFAULT_TARGET = "from web_app import create_app; create_app()"
+
+# Libraries that should only be imported when a request needs them
+HEAVY_MODULES = ("openai", "langchain", "langchain_openai", "chromadb", "faiss", "sentence_transformers")
+
+
+def run_importtime(code: str = DEFAULT_TARGET, timeout: float = 120.0) -> str:
+    """
+    Execute code in a new interpreter with `-X importtime` enabled.
+
+    Args:
+        code: Python source to run (typically the imports to measure)
+        timeout: Maximum seconds to wait for the interpreter
+
+    Returns:
+        The raw importtime report written to stderr
+
+    Raises:
+        RuntimeError: If the snippet exits with an error
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        env=dict(os.environ),
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    if completed.returncode != 0:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("Profiled code failed:\n" + "\n".join(errors[-20:]))
+    return completed.stderr
+
+
+def parse_importtime(report: str) -> List[Dict[str, Any]]:
+    """
+    Parse a raw `-X importtime` report.
+
+    Args:
+        report: Text written to stderr by `python -X importtime`
+
+    Returns:
+        One dictionary per import with module, self_us, cumulative_us and
+        depth (0 for imports made directly by the profiled code)
+    """
+    entries = []
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|", 2)
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        try:
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue  # header line
+        # Nested imports are indented by two spaces per level after "| "
+        name = name[1:] if name.startswith(" ") else name
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append({
+            "module": name.strip(),
+            "self_us": self_us,
+            "cumulative_us": cumulative_us,
+            "depth": depth,
+        })
+    return entries
+
+
+def summarise_importtime(entries: List[Dict[str, Any]], top: int = 15) -> Dict[str, Any]:
+    """
+    Summarise parsed import timings.
+
+    Args:
+        entries: Output of `parse_importtime`
+        top: Number of modules/packages to list
+
+    Returns:
+        Dictionary with total_ms, module_count, slowest_cumulative,
+        slowest_self, packages (self time grouped by top-level package) and
+        heavy_modules (which HEAVY_MODULES were imported)
+    """
+    packages: Dict[str, int] = defaultdict(int)
+    for entry in entries:
+        packages[entry["module"].split(".")[0]] += entry["self_us"]
+
+    def _ms(us: int) -> float:
+        return round(us / 1000.0, 1)
+
+    def _row(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "module": entry["module"],
+            "cumulative_ms": _ms(entry["cumulative_us"]),
+            "self_ms": _ms(entry["self_us"]),
+        }
+
+    return {
+        "total_ms": _ms(sum(e["cumulative_us"] for e in entries if e["depth"] == 0)),
+        "module_count": len(entries),
+        "slowest_cumulative": [
+            _row(e) for e in sorted(entries, key=lambda e: e["cumulative_us"], reverse=True)[:top]
+        ],
+        "slowest_self": [
+            _row(e) for e in sorted(entries, key=lambda e: e["self_us"], reverse=True)[:top]
+        ],
+        "packages": [
+            {"package": name, "self_ms": _ms(us)}
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        "heavy_modules": {name: name in packages for name in HEAVY_MODULES},
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """
+    Render a summary as a plain-text report.
+
+    Args:
+        summary: Output of `summarise_importtime`
+
+    Returns:
+        Multi-line report
+    """
+    lines = [
+        f"Total import time: {summary['total_ms']:.1f} ms across {summary['module_count']} modules",
+        "",
+        "Slowest imports (cumulative):",
+    ]
+    lines += [
+        f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}" for row in summary["slowest_cumulative"]
+    ]
+    lines += ["", "Time by top-level package (self):"]
+    lines += [f"  {row['self_ms']:>9.1f} ms  {row['package']}" for row in summary["packages"]]
+    lines += ["", "Heavy modules imported at start-up:"]
+    lines += [
+        f"  {'yes' if loaded else 'no':>9}     {name}" for name, loaded in summary["heavy_modules"].items()
+    ]
+    return "\n".join(lines)
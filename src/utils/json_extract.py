@@ -0,0 +1,190 @@
+"""
+Single-pass extraction of JSON values from model responses.
+
+Models wrap JSON in code fences and prose, leave trailing commas, and get cut
+off at the token limit. `parse_json_response` handles all of these in one
+left-to-right pass: at each opening bracket the C decoder
+(`JSONDecoder.raw_decode`) parses the value in place, ignoring whatever
+follows it. Only when that fails does a bracket scanner run over the value:
+it jumps between structural characters with a regex, skips string literals
+whole (so braces inside strings don't count) and tracks the bracket stack, so
+trailing commas can be dropped and a truncated value closed at its last
+complete element.
+
+The parsed value is returned as Python objects so callers can validate it
+directly (e.g. `Model.parse_obj(value)`) instead of re-serialising it.
+"""
+import json
+import re
+from typing import Any, List, Optional, Tuple, Type
+
+# Structural characters outside strings
+_TOKEN = re.compile(r'["{}\[\],]')
+# Rest of a string literal after its opening quote (handles escapes)
+_STRING_TAIL = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+_OPENER = re.compile(r"[{\[]")
+_CLOSERS = {"{": "}", "[": "]"}
+_DECODER = json.JSONDecoder()
+
+COMPLETE, TRUNCATED, INVALID = "complete", "truncated", "invalid"
+_FAILED = object()
+
+
+class JSONExtractionError(ValueError):
+    """Raised when no JSON value can be recovered from a response."""
+
+
+def _scan_value(text: str, begin: int) -> Tuple[str, int, List[int], Optional[Tuple[int, str]]]:
+    """
+    Scan the bracketed value starting at `begin`.
+
+    Returns:
+        (status, end, trailing comma positions, last safe cut) where the safe
+        cut is (position, closers needed) after the last complete element
+    """
+    stack = [_CLOSERS[text[begin]]]
+    trailing: List[int] = []
+    last_comma = -1
+    safe: Optional[Tuple[int, str]] = None
+    pos = begin + 1
+    while True:
+        match = _TOKEN.search(text, pos)
+        if match is None:
+            return TRUNCATED, len(text), trailing, safe
+        char, pos = match.group(), match.end()
+        if char == '"':
+            tail = _STRING_TAIL.match(text, pos)
+            if tail is None:
+                return TRUNCATED, len(text), trailing, safe
+            pos = tail.end()
+            last_comma = -1
+        elif char == ",":
+            last_comma = match.start()
+            safe = (last_comma, "".join(reversed(stack)))
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+            last_comma = -1
+        else:
+            if char != stack[-1]:
+                return INVALID, pos, trailing, safe
+            if last_comma >= 0 and not text[last_comma + 1:match.start()].strip():
+                trailing.append(last_comma)
+            last_comma = -1
+            stack.pop()
+            if not stack:
+                return COMPLETE, pos, trailing, safe
+            safe = (pos, "".join(reversed(stack)))
+
+
+def _without(text: str, begin: int, end: int, positions: List[int]) -> str:
+    """Return text[begin:end] with the characters at `positions` removed."""
+    parts, start = [], begin
+    for position in positions:
+        if position < end:
+            parts.append(text[start:position])
+            start = position + 1
+    parts.append(text[start:end])
+    return "".join(parts)
+
+
+def _loads(candidate: str) -> Any:
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        return _FAILED
+
+
+def _matches(value: Any, expect: Optional[Type]) -> bool:
+    return expect is None or isinstance(value, expect)
+
+
+def _scan(text: str, start: int, stop: int, expect: Optional[Type]) -> Tuple[Any, Optional[str]]:
+    pos = start
+    while pos < stop:
+        match = _OPENER.search(text, pos, stop)
+        if match is None:
+            break
+        begin = match.start()
+        try:
+            value = _DECODER.raw_decode(text, begin)[0]
+        except ValueError:
+            value = _FAILED
+        if value is not _FAILED:
+            if _matches(value, expect):
+                return value, "extracted"
+            # e.g. a list wrapping the expected object: look inside it
+            pos = begin + 1
+            continue
+
+        status, end, trailing, safe = _scan_value(text, begin)
+        if status == COMPLETE:
+            if trailing:
+                value = _loads(_without(text, begin, end, trailing))
+                if value is not _FAILED and _matches(value, expect):
+                    return value, "repaired"
+            pos = end if value is _FAILED else begin + 1
+        elif status == TRUNCATED:
+            if safe is not None:
+                cut, closers = safe
+                value = _loads(_without(text, begin, cut, trailing) + closers)
+                if value is not _FAILED and _matches(value, expect):
+                    return value, "repaired"
+            # The value runs to the end of the text; nothing follows it
+            break
+        else:
+            pos = begin + 1
+    return _FAILED, None
+
+
+def parse_json_response(text: str, expect: Optional[Type] = None) -> Tuple[Any, str]:
+    """
+    Recover the first JSON value from a model response.
+
+    Args:
+        text: Raw response text
+        expect: Optional type (e.g. dict) the value must have; values of other
+            types are skipped
+
+    Returns:
+        (value, method) where method is 'direct' (the whole text was JSON),
+        'extracted' (JSON surrounded by other text) or 'repaired' (trailing
+        commas removed or a truncated value closed)
+
+    Raises:
+        JSONExtractionError: If no JSON value can be recovered
+    """
+    if not text:
+        raise JSONExtractionError("Empty response")
+
+    stripped = text.strip()
+    if stripped[:1] in _CLOSERS:
+        value = _loads(stripped)
+        if value is not _FAILED and _matches(value, expect):
+            return value, "direct"
+
+    # Prefer a fenced block so brackets in any preamble are not mistaken for JSON
+    fence = text.find("```")
+    starts = [(fence, len(text)), (0, fence)] if fence > 0 else [(0, len(text))]
+    for start, stop in starts:
+        value, method = _scan(text, start, stop, expect)
+        if value is not _FAILED:
+            return value, method
+
+    raise JSONExtractionError("No JSON value found in response")
+
+
+def extract_json(text: str, expect: Optional[Type] = None) -> Any:
+    """
+    Recover the first JSON value from a model response.
+
+    Args:
+        text: Raw response text
+        expect: Optional type the value must have
+
+    Returns:
+        The parsed value
+
+    Raises:
+        JSONExtractionError: If no JSON value can be recovered
+    """
+    return parse_json_response(text, expect)[0]
@@ -0,0 +1,71 @@
+"""Deferred imports for heavy optional modules.
+
+`lazy_import("src.data.resources")` returns a proxy that imports the real
+module on first attribute access. Modules that pull in langchain, chromadb or
+openai are only loaded when a request actually needs them, which keeps the
+Flask app factory (and routes such as auth and the dashboard) fast to start.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+from types import ModuleType
+from typing import Any
+
+
+class LazyModule(ModuleType):
+    """
+    Module proxy that imports its target on first attribute access.
+    """
+    def __init__(self, name: str):
+        """
+        Initialize the proxy.
+
+        Args:
+            name: Absolute module name to import later
+        """
+        super().__init__(name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with self.__dict__["_lazy_lock"]:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the target module has been imported (by this proxy or elsewhere)."""
+        return self.__dict__["_lazy_module"] is not None or self.__name__ in sys.modules
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return the module if it is already imported, otherwise a lazy proxy for it.
+
+    Args:
+        name: Absolute module name
+
+    Returns:
+        The module or a LazyModule proxy
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -0,0 +1,160 @@
+"""Process-wide registry of shared, lazily built components.
+
+Model orchestrators, Chroma clients and the stores built on them are expensive
+to construct and hold their own HTTP/embedding clients. Routes, agents and job
+workers get them from here so each distinct configuration is built once per
+process and reused across requests and threads.
+
+Shared instances must be treated as read-only configuration: do not call
+`switch_provider`/`init_language_model` on them; ask the registry for the
+provider and model you need instead.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from src.utils.config import DEFAULT_PROVIDER, VECTOR_DB_PATH
+
+_instances: Dict[Hashable, Any] = {}
+_build_locks: Dict[Hashable, threading.Lock] = {}
+_guard = threading.Lock()
+
+
+def shared_instance(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """
+    Return the instance registered under `key`, building it on first use.
+
+    Concurrent first calls for the same key build it only once; different
+    keys are built independently, so factories may request other components.
+
+    Args:
+        key: Hashable identity of the component and its configuration
+        factory: Zero-argument callable that builds the component
+
+    Returns:
+        The shared instance
+    """
+    instance = _instances.get(key)
+    if instance is not None:
+        return instance
+
+    with _guard:
+        lock = _build_locks.setdefault(key, threading.Lock())
+    with lock:
+        instance = _instances.get(key)
+        if instance is None:
+            instance = factory()
+            _instances[key] = instance
+    return instance
+
+
+def reset_registry() -> None:
+    """Forget all shared instances (used by tests and after configuration changes)."""
+    with _guard:
+        _instances.clear()
+        _build_locks.clear()
+
+
+def get_model_orchestrator(
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+):
+    """
+    Return the shared ModelOrchestrator for a provider and model.
+
+    Args:
+        provider: AI provider (default: DEFAULT_PROVIDER)
+        model: Optional model name; the provider default is used if omitted
+        api_key: Optional API key overriding the environment
+
+    Returns:
+        A ModelOrchestrator instance
+    """
+    from src.ml.model_orchestrator import ModelOrchestrator
+
+    provider = (provider or DEFAULT_PROVIDER).lower()
+
+    def build():
+        orchestrator = ModelOrchestrator(api_key, provider=provider)
+        if model:
+            orchestrator.init_language_model(model_name=model)
+        return orchestrator
+
+    return shared_instance(("model_orchestrator", provider, model or None, api_key), build)
+
+
+def get_chroma_client(db_path: Optional[str] = None):
+    """
+    Return the shared Chroma PersistentClient for a database path.
+
+    Args:
+        db_path: Path of the Chroma database (default: VECTOR_DB_PATH)
+
+    Returns:
+        A chromadb PersistentClient
+    """
+    path = os.path.abspath(db_path or VECTOR_DB_PATH)
+
+    def build():
+        import chromadb
+        from chromadb.config import Settings
+
+        os.makedirs(path, exist_ok=True)
+        return chromadb.PersistentClient(
+            path=path,
+            settings=Settings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+        )
+
+    return shared_instance(("chroma_client", path), build)
+
+
+def get_document_store(db_path: Optional[str] = None):
+    """
+    Return the shared DocumentStore for a database path.
+
+    Args:
+        db_path: Path of the Chroma database (default: VECTOR_DB_PATH)
+
+    Returns:
+        A DocumentStore instance
+    """
+    from src.data.document_store import DocumentStore
+
+    path = os.path.abspath(db_path or VECTOR_DB_PATH)
+    return shared_instance(("document_store", path), lambda: DocumentStore(db_path=path))
+
+
+def get_vector_store(api_key: Optional[str] = None):
+    """
+    Return the shared FAISS VectorStore.
+
+    Args:
+        api_key: Optional OpenAI API key
+
+    Returns:
+        A VectorStore instance (documents may not be loaded yet)
+    """
+    from src.data.vector_store import VectorStore
+
+    return shared_instance(("vector_store", api_key), lambda: VectorStore(api_key))
+
+
+def get_learning_path_generator(api_key: Optional[str] = None):
+    """
+    Return the shared LearningPathGenerator.
+
+    Args:
+        api_key: Optional OpenAI API key
+
+    Returns:
+        A LearningPathGenerator instance
+    """
+    from src.learning_path import LearningPathGenerator
+
+    return shared_instance(("learning_path_generator", api_key), lambda: LearningPathGenerator(api_key))
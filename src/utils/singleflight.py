@@ -0,0 +1,108 @@
+"""Request coalescing for expensive, identical in-flight calls.
+
+When several threads ask for the same key at the same time, only the first one
+(the leader) runs the function; the others wait for it and share its result or
+exception. Nothing is cached once the call returns, so later requests run again
+(or hit a real cache such as the LLM response cache).
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key.
+    """
+    def __init__(self, name: str):
+        """
+        Initialize a single-flight group.
+
+        Args:
+            name: Name reported in `singleflight_stats()`
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._total = 0
+        self._executions = 0
+        self._deduplicated = 0
+        _groups[name] = self
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run `fn` unless an identical call is already in flight.
+
+        Args:
+            key: Hashable identity of the call
+            fn: Zero-argument callable performing the work
+
+        Returns:
+            Tuple of (result, shared) where shared is True if the result came
+            from another caller's execution. Callers must treat a shared result
+            as read-only.
+        """
+        with self._lock:
+            self._total += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._deduplicated += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return call counters for this group.
+
+        Returns:
+            Dictionary with calls, executions, deduplicated, dedup_rate and in_flight
+        """
+        with self._lock:
+            return {
+                "calls": self._total,
+                "executions": self._executions,
+                "deduplicated": self._deduplicated,
+                "dedup_rate": self._deduplicated / self._total if self._total else 0.0,
+                "in_flight": len(self._calls),
+            }
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Return the counters of every single-flight group, keyed by name.
+    """
+    return {name: group.stats() for name, group in list(_groups.items())}
@@ -0,0 +1,227 @@
+"""
+Token budgets for retrieval-augmented prompts.
+
+Retrieved documents and agent context used to be joined into prompts
+unbounded, so long contexts cost latency and money and eventually overflowed
+the model's context window. `pack_context` fits them into a token budget:
+chunks are ranked by relevance score, near-duplicates (word shingle overlap
+above a threshold, ignoring case, whitespace and punctuation) are dropped, and
+the highest ranked chunks that fit are kept.
+
+`context_budget` derives the budget for a prompt: the model's context window
+minus the completion reserve (MAX_TOKENS) and the prompt itself, capped at
+CONTEXT_TOKEN_BUDGET. Tokens are counted with tiktoken when it is installed
+and estimated from the character count otherwise.
+"""
+import functools
+import logging
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from src.utils.config import CONTEXT_TOKEN_BUDGET, MAX_TOKENS, MODEL_CONTEXT_WINDOW
+
+logger = logging.getLogger(__name__)
+
+# Context windows by model name prefix (longest matching prefix wins)
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "o1": 200000,
+    "o3": 200000,
+    "o4": 200000,
+    "deepseek": 65536,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Tokens kept free for chat message framing and counting error
+SAFETY_MARGIN = 64
+DUPLICATE_THRESHOLD = 0.85
+_SHINGLE_SIZE = 3
+_CHARS_PER_TOKEN = 4
+_WORD = re.compile(r"\w+")
+
+
+@functools.lru_cache(maxsize=8)
+def _encoding(model: Optional[str]):
+    """Return the tiktoken encoding for a model, or None without tiktoken."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count the tokens of a text for a model.
+
+    Args:
+        text: Text to measure
+        model: Model name used to pick the tokenizer
+
+    Returns:
+        Token count (estimated at four characters per token without tiktoken)
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // _CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, limit: int, model: Optional[str] = None) -> str:
+    """
+    Cut a text down to at most `limit` tokens.
+
+    Args:
+        text: Text to truncate
+        limit: Maximum number of tokens
+        model: Model name used to pick the tokenizer
+
+    Returns:
+        The text, or its longest prefix that fits
+    """
+    if limit <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[: max(limit - 1, 0) * _CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= limit:
+        return text
+    return encoding.decode(tokens[:limit])
+
+
+def context_window(model: Optional[str]) -> int:
+    """
+    Return the context window of a model (MODEL_CONTEXT_WINDOW overrides it).
+
+    Args:
+        model: Model name
+
+    Returns:
+        Context window in tokens
+    """
+    if MODEL_CONTEXT_WINDOW > 0:
+        return MODEL_CONTEXT_WINDOW
+    name = (model or "").lower()
+    matches = [prefix for prefix in CONTEXT_WINDOWS if name.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+def context_budget(
+    model: Optional[str],
+    prompt: str = "",
+    max_tokens: int = MAX_TOKENS,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+) -> int:
+    """
+    Return the tokens available for context documents in a prompt.
+
+    Args:
+        model: Model name
+        prompt: The rest of the prompt
+        max_tokens: Tokens reserved for the completion
+        budget: Upper bound regardless of the window (0 for none)
+
+    Returns:
+        Token budget for the context (never negative)
+    """
+    available = context_window(model) - max_tokens - count_tokens(prompt, model) - SAFETY_MARGIN
+    if budget > 0:
+        available = min(available, budget)
+    return max(available, 0)
+
+
+def _shingles(text: str) -> Set[str]:
+    words = _WORD.findall(text.lower())
+    if len(words) <= _SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1)}
+
+
+def _similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return float(a == b)
+    return len(a & b) / len(a | b)
+
+
+def pack_context(
+    chunks: Sequence[str],
+    budget: int,
+    scores: Optional[Sequence[Optional[float]]] = None,
+    model: Optional[str] = None,
+    separator: str = "\n\n",
+    duplicate_threshold: float = DUPLICATE_THRESHOLD,
+    count: Optional[Callable[[str], int]] = None,
+) -> List[str]:
+    """
+    Select the most relevant distinct chunks that fit a token budget.
+
+    Chunks are taken in descending score order (input order when no scores
+    are given, or for ties) and skipped when they are near-duplicates of a
+    chunk already taken or do not fit the remaining budget. If not even the
+    best chunk fits, it is truncated to the budget.
+
+    Args:
+        chunks: Candidate texts
+        budget: Token budget for the joined result
+        scores: Optional relevance score per chunk (higher is better; None,
+            or a missing score when the list is shorter than `chunks`, ranks
+            last)
+        model: Model name used to pick the tokenizer
+        separator: Text the chunks will be joined with
+        duplicate_threshold: Shingle overlap (Jaccard) above which two chunks
+            count as duplicates
+        count: Optional token counter overriding `count_tokens`
+
+    Returns:
+        The selected chunks, in rank order
+    """
+    count = count or (lambda text: count_tokens(text, model))
+    order = list(range(len(chunks)))
+    if scores is not None:
+        ranked = list(scores)[:len(chunks)]
+        ranked += [None] * (len(chunks) - len(ranked))
+        order.sort(key=lambda i: (ranked[i] is None, -(ranked[i] or 0.0)))
+
+    separator_tokens = count(separator) if separator else 0
+    selected: Dict[int, str] = {}
+    seen: List[Set[str]] = []
+    used = 0
+    duplicates = 0
+    for i in order:
+        text = (chunks[i] or "").strip()
+        if not text:
+            continue
+        shingles = _shingles(text)
+        if any(_similarity(shingles, other) >= duplicate_threshold for other in seen):
+            duplicates += 1
+            continue
+        cost = count(text) + (separator_tokens if selected else 0)
+        if used + cost > budget:
+            if selected or budget <= 0:
+                continue
+            text = truncate_to_tokens(text, budget, model)
+            cost = budget
+        selected[i] = text
+        seen.append(shingles)
+        used += cost
+
+    packed = list(selected.values())
+    if len(packed) < len(chunks):
+        logger.debug(
+            "Packed %d of %d context chunks into %d/%d tokens (%d near-duplicates dropped)",
+            len(packed), len(chunks), used, budget, duplicates,
+        )
+    return packed
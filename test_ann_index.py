@@ -0,0 +1,73 @@
+"""
+Tests for approximate nearest-neighbour index selection and benchmarking.
+"""
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import numpy as np
+import pytest
+
+from src.data.ann_index import auto_nlist, default_params, needs_rebuild, recall_at_k, resolve_index_type
+
+
+def test_small_corpora_fall_back_to_flat():
+    params = default_params()
+    assert resolve_index_type("ivf_flat", 20, 384, params) == "flat"
+    assert resolve_index_type("ivf_flat", 5000, 384, {**params, "nlist": 1024}) == "flat"
+    assert resolve_index_type("ivf_pq", 200, 384, {**params, "nlist": 1}) == "flat"
+    assert resolve_index_type("ivf_flat", 100000, 384, params) == "ivf_flat"
+    assert resolve_index_type("hnsw", 10, 384, params) == "hnsw"
+
+
+def test_invalid_configuration_is_rejected():
+    params = default_params()
+    with pytest.raises(ValueError):
+        resolve_index_type("lsh", 1000, 384, params)
+    with pytest.raises(ValueError):
+        resolve_index_type("ivf_pq", 100000, 384, {**params, "pq_m": 7})
+
+
+def test_auto_nlist_keeps_enough_points_per_cell():
+    assert auto_nlist(1) == 1
+    assert auto_nlist(1000000) == 4000
+    assert 2000 // auto_nlist(2000) >= 39
+
+
+def test_recall_at_k():
+    truth = np.array([[1, 2, 3], [4, 5, 6]])
+    found = np.array([[3, 2, 9], [4, 5, 6]])
+    assert recall_at_k(truth, found) == pytest.approx(5 / 6)
+    assert recall_at_k(truth, np.full_like(truth, -1)) == 0.0
+
+
+def test_benchmark_reports_recall_against_flat():
+    pytest.importorskip("faiss")
+    from src.data.ann_index import benchmark_indexes
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(5000, 32)).astype(np.float32)
+    results = benchmark_indexes(vectors, vectors[:20], k=5, configs=[
+        {"index_type": "flat"},
+        {"index_type": "ivf_flat", "nlist": 16, "nprobe": 16},
+        {"index_type": "hnsw", "ef_search": 128},
+    ])
+    assert results[0]["recall_at_k"] == 1.0
+    assert results[1]["recall_at_k"] == 1.0  # probing every cell is exact
+    assert results[2]["recall_at_k"] > 0.9
+
+
+def test_outgrown_layouts_need_a_rebuild():
+    params = {**default_params(), "nlist": 0}
+    assert needs_rebuild({"index_type": "flat"}, 30, 384, "ivf_flat", params) is False
+    assert needs_rebuild({"index_type": "flat"}, 5000, 384, "ivf_flat", params) is True
+    built = {"index_type": "ivf_flat", "nlist": auto_nlist(5000)}
+    assert needs_rebuild(built, 6000, 384, "ivf_flat", params) is False
+    assert needs_rebuild(built, 100000, 384, "ivf_flat", params) is True
+    assert needs_rebuild(built, 30, 384, "ivf_flat", params) is True
+    assert needs_rebuild({"index_type": "ivf_flat"}, 5000, 384, "ivf_flat", params) is True
+    assert needs_rebuild({"index_type": "hnsw"}, 100000, 384, "hnsw", params) is False
@@ -0,0 +1,177 @@
+"""
+Tests for the pooled direct OpenAI client against a local stub server.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+
+from src import direct_openai
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Status codes returned before the first success, consumed in order
+    failures = []
+    requests_seen = []
+    ports_seen = set()
+    # Seconds to wait before answering
+    delay = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).requests_seen.append(json.loads(body))
+        type(self).ports_seen.add(self.client_address[1])
+        time.sleep(type(self).delay)
+
+        if type(self).requests_seen[-1].get("stream") and not type(self).failures:
+            events = [
+                {"choices": [{"delta": {"role": "assistant"}}]},
+                {"choices": [{"delta": {"content": "stub "}}]},
+                {"choices": [{"delta": {"content": "reply"}}]},
+            ]
+            payload = "".join(f"data: {json.dumps(e)}\n\n" for e in events)
+            payload = (payload + "data: [DONE]\n\n").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+        elif type(self).failures:
+            status = type(self).failures.pop(0)
+            payload = json.dumps({"error": {"message": "slow down"}}).encode()
+            self.send_response(status)
+            self.send_header("Retry-After", "0")
+        else:
+            payload = json.dumps({
+                "choices": [{"message": {"content": "stub reply"}}]
+            }).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    _StubHandler.failures = []
+    _StubHandler.requests_seen = []
+    _StubHandler.ports_seen = set()
+    _StubHandler.delay = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-key-for-the-local-stub-server")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("OPENAI_BACKOFF_BASE", "0")
+    direct_openai.reset_client()
+    yield _StubHandler
+    server.shutdown()
+    direct_openai.reset_client()
+
+
+def test_completion_uses_injected_base_url(stub_server):
+    reply = direct_openai.generate_completion("hello", model="stub-model", timeout=5)
+    assert reply == "stub reply"
+    assert stub_server.requests_seen[0]["model"] == "stub-model"
+
+
+def test_response_format_is_sent_only_when_given(stub_server):
+    response_format = {"type": "json_object"}
+    direct_openai.generate_completion("hello", timeout=5, response_format=response_format)
+    direct_openai.generate_completion("hello", timeout=5)
+    assert stub_server.requests_seen[0]["response_format"] == response_format
+    assert "response_format" not in stub_server.requests_seen[1]
+
+
+def test_connections_are_reused(stub_server):
+    for _ in range(3):
+        direct_openai.generate_completion("hello", timeout=5)
+    assert len(stub_server.requests_seen) == 3
+    assert len(stub_server.ports_seen) == 1
+
+
+def test_rate_limits_and_server_errors_are_retried(stub_server):
+    stub_server.failures = [429, 503]
+    assert direct_openai.generate_completion("hello", timeout=5) == "stub reply"
+    assert len(stub_server.requests_seen) == 3
+
+
+def test_read_timeouts_are_not_retried(stub_server):
+    stub_server.delay = 0.5
+    with pytest.raises(ValueError):
+        direct_openai.generate_completion("hello", timeout=0.2, max_retries=3)
+    with pytest.raises(ValueError, match="timed out"):
+        asyncio.run(direct_openai.agenerate_completion("hello", timeout=0.2, max_retries=3))
+    time.sleep(0.6)
+    assert len(stub_server.requests_seen) == 2
+
+
+def test_gives_up_after_max_retries(stub_server):
+    stub_server.failures = [429, 429, 429]
+    with pytest.raises(ValueError, match="429"):
+        direct_openai.generate_completion("hello", timeout=5, max_retries=1)
+    assert len(stub_server.requests_seen) == 2
+
+
+def test_async_completion(stub_server):
+    async def run():
+        try:
+            return await direct_openai.agenerate_completion("hello", timeout=5)
+        finally:
+            await direct_openai.aclose_client()
+
+    assert asyncio.run(run()) == "stub reply"
+
+
+def test_async_streaming_yields_deltas(stub_server):
+    async def run():
+        try:
+            stream = await direct_openai.agenerate_completion("hello", stream=True, timeout=5)
+            return [chunk async for chunk in stream]
+        finally:
+            await direct_openai.aclose_client()
+
+    assert asyncio.run(run()) == ["stub ", "reply"]
+    assert stub_server.requests_seen[0]["stream"] is True
+
+
+def test_sync_stream_bridge_retries_before_first_chunk(stub_server):
+    stub_server.failures = [429]
+    assert list(direct_openai.stream_completion("hello", timeout=5)) == ["stub ", "reply"]
+    assert len(stub_server.requests_seen) == 2
+
+
+def test_sync_streams_share_one_loop_and_connection_pool(stub_server):
+    for _ in range(3):
+        assert list(direct_openai.stream_completion("hello", timeout=5)) == ["stub ", "reply"]
+
+    assert len(stub_server.requests_seen) == 3
+    # Kept-alive connection reused across requests
+    assert len(stub_server.ports_seen) == 1
+
+
+def test_closing_a_sync_stream_early_cancels_it(stub_server):
+    chunks = direct_openai.stream_completion("hello", timeout=5)
+    assert next(chunks) == "stub "
+    chunks.close()
+
+    # The shared loop keeps serving later streams
+    assert list(direct_openai.stream_completion("hello", timeout=5)) == ["stub ", "reply"]
+
+
+def test_sync_stream_errors_reach_the_caller(stub_server):
+    stub_server.failures = [400]
+    with pytest.raises(ValueError, match="400"):
+        list(direct_openai.stream_completion("hello", timeout=5, max_retries=0))
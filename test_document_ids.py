@@ -0,0 +1,69 @@
+"""
+Tests for content-hash document IDs, upserts and collection compaction.
+"""
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document
+
+from src.data.document_store import DocumentStore, content_id
+
+
+def _embed(texts):
+    return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DocumentStore(db_path=str(tmp_path / "db"))
+    store.embedding_function = _embed
+    return store
+
+
+def _collection(store, name="learning_resources"):
+    return store.client.get_collection(name=store._collection_name(name), embedding_function=_embed)
+
+
+def test_content_ids_are_stable():
+    assert content_id("Python basics") == content_id("Python basics")
+    assert content_id("Python basics") != content_id("Python basics.")
+    assert content_id("x").startswith("doc_")
+
+
+def test_reingesting_does_not_grow_the_collection(store):
+    docs = [Document(page_content=t, metadata={"topic": "python"}) for t in ("a", "b", "a")]
+    first = store.add_documents(docs)
+    second = store.add_documents(docs)
+    store.add_document("b", {"topic": "python"})
+
+    assert first == second
+    assert first[0] == first[2]
+    assert _collection(store).count() == 2
+
+
+def test_compaction_removes_legacy_duplicates(store):
+    collection = _collection(store)
+    collection.add(
+        ids=["doc_1_123", "doc_2_456", "doc_3_789"],
+        documents=["same text", "same text", "other"],
+        metadatas=[{"n": 1}, {"n": 2}, {"n": 3}],
+        embeddings=_embed(["same text", "same text", "other"]),
+    )
+
+    assert store.compact_collection(dry_run=True) == {"scanned": 3, "unique": 2, "migrated": 2, "removed": 1}
+    assert collection.count() == 3
+
+    store.compact_collection()
+    remaining = collection.get()
+    assert sorted(remaining["ids"]) == sorted([content_id("same text"), content_id("other")])
+    assert store.compact_collection()["removed"] == 0
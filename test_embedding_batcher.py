@@ -0,0 +1,124 @@
+"""
+Tests for token-budgeted, concurrent embedding batching.
+"""
+import os
+import sys
+import threading
+import time
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import pytest
+
+from src.ml.embedding_batcher import BatchedEmbeddings, EmbeddingBatcher, is_rate_limit_error
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def _vector(text):
+    return [float(len(text)), 1.0]
+
+
+def test_batches_follow_token_budget_not_item_count():
+    batcher = EmbeddingBatcher(lambda texts: [], max_batch_tokens=10, max_batch_items=100,
+                               count_tokens=len)
+    texts = ["aaaa", "bbbb", "cc", "dddddddddddd", "e"]
+    assert batcher.make_batches(texts) == [[0, 1, 2], [3], [4]]
+
+
+def test_batches_respect_item_limit():
+    batcher = EmbeddingBatcher(lambda texts: [], max_batch_tokens=1000, max_batch_items=2,
+                               count_tokens=len)
+    assert batcher.make_batches(["a"] * 5) == [[0, 1], [2, 3], [4]]
+
+
+def test_results_keep_input_order_with_bounded_concurrency():
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def embed(texts):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.pop()
+        return [_vector(t) for t in texts]
+
+    texts = ["x" * (i % 7 + 1) for i in range(40)]
+    batcher = EmbeddingBatcher(embed, max_batch_tokens=4, max_batch_items=2,
+                               max_concurrency=3, count_tokens=len)
+    assert batcher.embed(texts) == [_vector(t) for t in texts]
+    assert max(peak) <= 3
+    assert batcher.requests > 3
+
+
+def test_rate_limited_batches_are_split_and_retried():
+    calls = []
+
+    def embed(texts):
+        calls.append(len(texts))
+        if len(calls) == 1:
+            raise RateLimitError("Rate limit reached for requests")
+        return [_vector(t) for t in texts]
+
+    batcher = EmbeddingBatcher(embed, max_batch_tokens=100, max_concurrency=2,
+                               backoff_base=0.01, count_tokens=len)
+    texts = ["a", "bb", "ccc", "dddd"]
+    assert batcher.embed(texts) == [_vector(t) for t in texts]
+    assert calls[0] == 4
+    assert sorted(calls[1:]) == [2, 2]
+    assert batcher.rate_limited == 1
+
+
+def test_other_errors_are_raised():
+    def embed(texts):
+        raise ValueError("invalid input")
+
+    batcher = EmbeddingBatcher(embed, backoff_base=0.01)
+    with pytest.raises(ValueError):
+        batcher.embed(["a", "b"])
+
+
+def test_gives_up_after_max_retries():
+    def embed(texts):
+        raise RateLimitError("429 Too Many Requests")
+
+    batcher = EmbeddingBatcher(embed, max_retries=2, backoff_base=0.001)
+    with pytest.raises(RateLimitError):
+        batcher.embed(["a"])
+    assert batcher.requests == 3
+
+
+def test_rate_limit_detection():
+    assert is_rate_limit_error(RateLimitError())
+    assert is_rate_limit_error(Exception("Error code: 429 - rate_limit_exceeded"))
+    assert not is_rate_limit_error(ValueError("bad request"))
+
+
+def test_queries_are_batched_only_for_symmetric_models():
+    class Embeddings:
+        def __init__(self):
+            self.calls = []
+
+        def embed_documents(self, texts):
+            self.calls.append(("documents", list(texts)))
+            return [_vector(t) for t in texts]
+
+        def embed_query(self, text):
+            self.calls.append(("query", text))
+            return [0.0, 0.0]
+
+    symmetric = BatchedEmbeddings(Embeddings(), symmetric_queries=True)
+    assert symmetric.embed_queries(["ab", "c"]) == [[2.0, 1.0], [1.0, 1.0]]
+    assert symmetric.embeddings.calls == [("documents", ["ab", "c"])]
+
+    asymmetric = BatchedEmbeddings(Embeddings())
+    assert asymmetric.embed_queries(["ab", "c"]) == [[0.0, 0.0], [0.0, 0.0]]
+    assert asymmetric.embeddings.calls == [("query", "ab"), ("query", "c")]
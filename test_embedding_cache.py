@@ -0,0 +1,109 @@
+"""
+Tests for the persistent embedding cache.
+"""
+import os
+import sys
+import time
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import numpy as np
+
+from src.ml.embedding_cache import (
+    CachedEmbeddingFunction,
+    CachedEmbeddings,
+    EmbeddingCache,
+    embed_with_cache,
+)
+
+
+class _FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def _vector(self, text):
+        return [float(len(text)), 0.5, -1.25]
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return self._vector(text)
+
+
+def test_vectors_round_trip_as_float32(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_entries=10)
+    cache.set_many("model-a", ["hello"], [[0.1, 0.2, 0.3]])
+
+    (vector,) = cache.get_many("model-a", ["hello"])
+    assert vector.dtype == np.float32
+    assert np.allclose(vector, [0.1, 0.2, 0.3])
+    assert cache.get_many("model-b", ["hello"]) == [None]
+
+
+def test_only_misses_are_embedded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_entries=10)
+    fake = _FakeEmbeddings()
+
+    first = embed_with_cache(cache, "m", ["a", "bb", "a"], fake.embed_documents)
+    second = embed_with_cache(cache, "m", ["bb", "ccc"], fake.embed_documents)
+
+    assert fake.calls == [["a", "bb"], ["ccc"]]
+    assert first[0] == first[2]
+    assert second[0] == first[1]
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["hits"] == 1
+
+
+def test_langchain_and_chroma_wrappers_share_the_cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_entries=10)
+    fake = _FakeEmbeddings()
+    embeddings = CachedEmbeddings(fake, "m", cache)
+    function = CachedEmbeddingFunction(fake.embed_documents, "m", cache)
+
+    document_vector = embeddings.embed_documents(["what is python"])[0]
+    assert function(["what is python"]) == [document_vector]
+    query_vector = embeddings.embed_query("what is python")
+    assert function.embed_queries(["what is python"]) == [query_vector]
+    assert embeddings.embed_queries(["what is python"]) == [query_vector]
+    assert len(fake.calls) == 2
+
+
+def test_queries_are_cached_apart_from_documents(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_entries=10)
+    fake = _FakeEmbeddings()
+    fake.embed_queries = lambda texts: fake.calls.append(["query"] + list(texts)) or [[9.0] for _ in texts]
+    embeddings = CachedEmbeddings(fake, "m", cache)
+
+    assert embeddings.embed_documents(["python"]) == [[6.0, 0.5, -1.25]]
+    assert embeddings.embed_queries(["python", "sql", "python"]) == [[9.0], [9.0], [9.0]]
+    assert embeddings.embed_query("sql") == [9.0]
+    assert fake.calls == [["python"], ["query", "python", "sql"]]
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "emb.sqlite3")
+    EmbeddingCache(path).set_many("m", ["a"], [[1.0, 2.0]])
+    assert EmbeddingCache(path).get_many("m", ["a"])[0].tolist() == [1.0, 2.0]
+
+
+def test_least_recently_used_vector_is_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_entries=2)
+    cache.set_many("m", ["a"], [[1.0]])
+    time.sleep(0.01)
+    cache.set_many("m", ["b"], [[2.0]])
+    time.sleep(0.01)
+    cache.get_many("m", ["a"])  # "b" is now the least recently used
+    time.sleep(0.01)
+    cache.set_many("m", ["c"], [[3.0]])
+
+    a, b, c = cache.get_many("m", ["a", "b", "c"])
+    assert b is None
+    assert a is not None and c is not None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,98 @@
+"""
+Tests for the pluggable embedding providers.
+"""
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import numpy as np
+import pytest
+
+from src.ml import embedding_providers
+from src.ml.embedding_providers import (
+    LocalEmbeddingFunction,
+    LocalEmbeddings,
+    collection_suffix,
+    embedding_model_name,
+    get_embeddings,
+    local_model_name,
+    onnx_file_name,
+)
+
+
+class _Encoder:
+    """Stands in for a loaded SentenceTransformer."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **options):
+        self.calls.append((texts, options))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float64)
+
+
+def _local_embeddings(batch_size=8):
+    embeddings = LocalEmbeddings(batch_size=batch_size)
+    embeddings._model = _Encoder()
+    return embeddings
+
+
+def test_local_embeddings_encode_in_batches_and_normalize():
+    embeddings = _local_embeddings(batch_size=8)
+    assert embeddings.embed_documents(["ab", "c"]) == [[2.0, 1.0], [1.0, 1.0]]
+    assert embeddings.embed_query("abc") == [3.0, 1.0]
+    assert embeddings.embed_documents([]) == []
+
+    texts, options = embeddings.model.calls[0]
+    assert texts == ["ab", "c"]
+    assert options["batch_size"] == 8
+    assert options["normalize_embeddings"] is True
+
+
+def test_queries_use_the_model_query_prompt():
+    embeddings = _local_embeddings()
+    assert embeddings.embed_queries(["ab", "c"]) == [[2.0, 1.0], [1.0, 1.0]]
+    assert "prompt_name" not in embeddings.model.calls[-1][1]
+
+    embeddings.model.prompts = {"query": "query: ", "passage": "passage: "}
+    embeddings.embed_query("abc")
+    embeddings.embed_documents(["abc"])
+    assert embeddings.model.calls[-2][1]["prompt_name"] == "query"
+    assert "prompt_name" not in embeddings.model.calls[-1][1]
+    assert LocalEmbeddingFunction(embeddings).embed_queries(["xyz"]) == [[3.0, 1.0]]
+    assert embeddings.model.calls[-1][1]["prompt_name"] == "query"
+
+
+def test_chroma_function_uses_the_same_model():
+    embeddings = _local_embeddings()
+    assert LocalEmbeddingFunction(embeddings)(["xyz"]) == [[3.0, 1.0]]
+
+
+def test_model_names_distinguish_variants():
+    assert embedding_model_name("openai") != embedding_model_name("local")
+    assert local_model_name("m", "onnx", True) != local_model_name("m", "onnx", False)
+    assert local_model_name("m", "torch", True) == "local:m@torch"
+
+
+def test_onnx_export_matches_cpu(monkeypatch):
+    assert onnx_file_name(False) == "onnx/model.onnx"
+    monkeypatch.setattr(embedding_providers.platform, "machine", lambda: "aarch64")
+    assert onnx_file_name(True) == "onnx/model_qint8_arm64.onnx"
+    monkeypatch.setattr(embedding_providers.platform, "machine", lambda: "x86_64")
+    assert onnx_file_name(True) == "onnx/model_quint8_avx2.onnx"
+
+
+def test_collections_are_separated_per_model():
+    assert collection_suffix("openai") == ""
+    suffix = collection_suffix("local")
+    assert suffix.startswith("_")
+    assert suffix == suffix.lower() and "/" not in suffix
+
+
+def test_unknown_provider_is_rejected():
+    with pytest.raises(ValueError):
+        get_embeddings(provider="cohere")
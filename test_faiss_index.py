@@ -0,0 +1,135 @@
+"""
+Tests for published, memory-mapped FAISS index versions.
+"""
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import pytest
+
+from src.data.faiss_index import (
+    CURRENT_FILE,
+    current_version,
+    is_file_mapped,
+    publish_version,
+    read_docstore,
+    write_docstore,
+)
+
+
+def _writer(content):
+    def write_files(directory):
+        with open(os.path.join(directory, "index.faiss"), "w") as f:
+            f.write(content)
+    return write_files
+
+
+def test_docstore_sidecar_round_trip(tmp_path):
+    path = str(tmp_path / "docstore.json")
+    documents = {"a::0": {"page_content": "Python basics", "metadata": {"source_path": "a.txt"}}}
+    write_docstore(path, ["a::0"], documents)
+    assert read_docstore(path) == (["a::0"], documents)
+
+
+def test_publish_switches_current_pointer(tmp_path):
+    root = str(tmp_path)
+    assert current_version(root) is None
+
+    first = publish_version(root, _writer("one"))
+    assert current_version(root) == first
+    second = publish_version(root, _writer("two"))
+    assert current_version(root) == second
+
+    with open(os.path.join(root, second, "index.faiss")) as f:
+        assert f.read() == "two"
+    assert not [name for name in os.listdir(root) if name.endswith(".tmp")]
+
+
+def test_old_versions_are_pruned(tmp_path):
+    root = str(tmp_path)
+    versions = [publish_version(root, _writer(str(i)), keep=2) for i in range(4)]
+    remaining = sorted(name for name in os.listdir(root) if name != CURRENT_FILE)
+    assert remaining == versions[-2:]
+
+
+def test_pointer_to_missing_directory_is_ignored(tmp_path):
+    (tmp_path / CURRENT_FILE).write_text("v123")
+    assert current_version(str(tmp_path)) is None
+
+
+def test_published_index_is_memory_mapped(tmp_path):
+    pytest.importorskip("faiss")
+    pytest.importorskip("langchain_community")
+    from langchain_community.vectorstores import FAISS
+
+    from src.data.faiss_index import load_index, publish_index
+
+    class _Embeddings:
+        def embed_documents(self, texts):
+            return [[float(len(t)), 1.0] for t in texts]
+
+        def embed_query(self, text):
+            return [float(len(text)), 1.0]
+
+    import faiss
+
+    from src.data.faiss_index import INDEX_FILE, current_version, is_file_mapped
+
+    if not hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        pytest.skip("this FAISS build only maps IVF inverted lists")
+
+    store = FAISS.from_texts(["a", "bbb"], _Embeddings(), ids=["x", "y"])
+    publish_index(store, str(tmp_path))
+    index_path = os.path.join(str(tmp_path), current_version(str(tmp_path)), INDEX_FILE)
+    if is_file_mapped(index_path) is None:
+        pytest.skip("/proc/self/maps is not available")
+
+    loaded = load_index(str(tmp_path), _Embeddings())
+
+    assert is_file_mapped(index_path)
+    assert loaded.index.ntotal == 2
+    results = loaded.similarity_search("ccc", k=1)
+    assert results[0].page_content == "bbb"
+
+
+def test_unmapped_load_reads_index_into_memory(tmp_path):
+    pytest.importorskip("faiss")
+    pytest.importorskip("langchain_community")
+    from langchain_community.vectorstores import FAISS
+
+    from src.data.faiss_index import INDEX_FILE, current_version, is_file_mapped, load_index, publish_index
+
+    class _Embeddings:
+        def embed_documents(self, texts):
+            return [[float(len(t)), 1.0] for t in texts]
+
+        def embed_query(self, text):
+            return [float(len(text)), 1.0]
+
+    store = FAISS.from_texts(["a", "bbb"], _Embeddings(), ids=["x", "y"])
+    publish_index(store, str(tmp_path))
+    index_path = os.path.join(str(tmp_path), current_version(str(tmp_path)), INDEX_FILE)
+    loaded = load_index(str(tmp_path), _Embeddings(), mmap=False)
+
+    assert loaded.index.ntotal == 2
+    assert is_file_mapped(index_path) in (False, None)
+
+
+def test_is_file_mapped_detects_mappings(tmp_path):
+    import mmap
+
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"x" * 4096)
+    if is_file_mapped(str(path)) is None:
+        pytest.skip("/proc/self/maps is not available")
+    assert is_file_mapped(str(path)) is False
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            assert is_file_mapped(str(path)) is True
+        finally:
+            mapping.close()
@@ -0,0 +1,83 @@
+"""
+Tests for the incremental indexing manifest.
+"""
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.data.index_manifest import IndexManifest, chunk_ids, scan_directory
+
+SETTINGS = {"embedding_model": "text-embedding-ada-002", "chunk_size": 1000, "chunk_overlap": 200}
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_scan_hashes_files_and_skips_hidden(tmp_path):
+    _write(tmp_path / "a.txt", "alpha")
+    _write(tmp_path / "nested" / "b.md", "beta")
+    _write(tmp_path / ".hidden" / "c.txt", "secret")
+    _write(tmp_path / ".DS_Store", "junk")
+
+    hashes = scan_directory(str(tmp_path))
+    assert sorted(hashes) == ["a.txt", "nested/b.md"]
+    assert hashes["a.txt"] != hashes["nested/b.md"]
+
+
+def test_diff_reports_added_modified_and_deleted(tmp_path):
+    docs = tmp_path / "docs"
+    _write(docs / "keep.txt", "same")
+    _write(docs / "edit.txt", "v1")
+    _write(docs / "gone.txt", "bye")
+
+    manifest = IndexManifest(str(tmp_path / "manifest.json"), SETTINGS)
+    for path, sha in scan_directory(str(docs)).items():
+        manifest.record(path, sha, chunk_ids(path, sha, 2))
+    manifest.save()
+
+    _write(docs / "edit.txt", "v2")
+    (docs / "gone.txt").unlink()
+    _write(docs / "new.txt", "hello")
+
+    reloaded = IndexManifest(str(tmp_path / "manifest.json"), SETTINGS)
+    assert reloaded.exists
+    changes = reloaded.diff(scan_directory(str(docs)))
+    assert changes == {"added": ["new.txt"], "modified": ["edit.txt"], "deleted": ["gone.txt"]}
+    assert len(reloaded.chunk_ids_for(changes["modified"] + changes["deleted"])) == 4
+
+
+def test_unchanged_directory_has_no_changes(tmp_path):
+    docs = tmp_path / "docs"
+    _write(docs / "a.txt", "alpha")
+    manifest = IndexManifest(str(tmp_path / "manifest.json"), SETTINGS)
+    for path, sha in scan_directory(str(docs)).items():
+        manifest.record(path, sha, chunk_ids(path, sha, 1))
+
+    assert not any(manifest.diff(scan_directory(str(docs))).values())
+
+
+def test_settings_change_invalidates_manifest(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.json"), SETTINGS)
+    manifest.record("a.txt", "0" * 64, ["a.txt::0::0"])
+    manifest.save()
+
+    other = IndexManifest(str(tmp_path / "manifest.json"), {**SETTINGS, "chunk_size": 500})
+    assert not other.exists
+    assert other.files == {}
+
+
+def test_layout_is_saved_with_the_manifest(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.json"), SETTINGS)
+    manifest.layout = {"index_type": "ivf_flat", "nlist": 64}
+    manifest.save()
+    assert IndexManifest(str(tmp_path / "manifest.json"), SETTINGS).layout == {"index_type": "ivf_flat", "nlist": 64}
+
+
+def test_chunk_ids_are_deterministic_per_file_version():
+    assert chunk_ids("a.txt", "f" * 64, 2) == chunk_ids("a.txt", "f" * 64, 2)
+    assert chunk_ids("a.txt", "f" * 64, 1) != chunk_ids("a.txt", "e" * 64, 1)
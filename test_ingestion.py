@@ -0,0 +1,150 @@
+"""
+Tests for the streaming document ingestion pipeline.
+"""
+import os
+import sys
+
+import pytest
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+from src.data.ingestion import IngestionPipeline, iter_text_blocks
+
+
+class _Chunk:
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+def _chunk_lines(text, metadata=None):
+    return [_Chunk(line, dict(metadata or {})) for line in text.splitlines() if line.strip()]
+
+
+class _Store:
+    def __init__(self):
+        self.batches = []
+
+    def add_documents(self, documents, collection_name="learning_resources"):
+        self.batches.append((collection_name, list(documents)))
+        return [doc.page_content for doc in documents]
+
+
+def test_text_blocks_break_at_paragraphs(tmp_path):
+    path = tmp_path / "notes.txt"
+    paragraphs = [f"paragraph {i} " + "x" * 40 for i in range(20)]
+    path.write_text("\n\n".join(paragraphs))
+
+    blocks = list(iter_text_blocks(str(path), block_chars=100))
+    assert len(blocks) > 1
+    assert all(len(text) <= 200 for text, _ in blocks)
+    joined = "".join(text for text, _ in blocks)
+    assert [p for p in joined.split("\n\n") if p] == paragraphs
+    assert [meta["block"] for _, meta in blocks] == list(range(len(blocks)))
+
+
+def test_pipeline_batches_and_reports_progress(tmp_path):
+    path = tmp_path / "guide.md"
+    path.write_text("\n".join(f"line {i}" for i in range(10)))
+    store, progress = _Store(), []
+
+    stats = IngestionPipeline(store, chunk_text=_chunk_lines, batch_size=4, collection_name="uploads").run(
+        str(path), metadata={"user_id": 7}, progress=lambda **fields: progress.append(fields)
+    )
+
+    assert [len(docs) for _, docs in store.batches] == [4, 4, 2]
+    assert {name for name, _ in store.batches} == {"uploads"}
+    assert store.batches[0][1][0].metadata == {"source": "guide.md", "user_id": 7, "block": 0}
+    assert stats["chunks"] == 10 and stats["batches"] == 3 and stats["documents"] == 10
+    assert stats["chunks_per_sec"] > 0
+    assert [p["stage"] for p in progress] == ["parsing", "embedding", "embedding", "embedding", "done"]
+    assert [p["chunks"] for p in progress[1:4]] == [4, 8, 10]
+
+
+def test_cancellation_stops_between_batches(tmp_path):
+    path = tmp_path / "big.txt"
+    path.write_text("\n".join(f"line {i}" for i in range(100)))
+    store = _Store()
+
+    def check_cancelled():
+        if len(store.batches) == 2:
+            raise RuntimeError("cancelled")
+
+    with pytest.raises(RuntimeError):
+        IngestionPipeline(store, chunk_text=_chunk_lines, batch_size=5, queue_size=1).run(
+            str(path), check_cancelled=check_cancelled
+        )
+    assert len(store.batches) == 2
+
+
+def test_parse_errors_reach_the_caller(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("some text")
+
+    def broken_chunker(text, metadata=None):
+        raise ValueError("bad document")
+
+    with pytest.raises(ValueError, match="bad document"):
+        IngestionPipeline(_Store(), chunk_text=broken_chunker).run(str(path))
+
+
+class _FlakyStore(_Store):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def add_documents(self, documents, collection_name="learning_resources"):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("vector store unavailable")
+        return super().add_documents(documents, collection_name)
+
+
+def _run_upload(monkeypatch, tmp_path, upload, store, max_retries):
+    import src.data.ingestion as ingestion
+    import web_app.jobs as jobs
+    from src.jobs import JobManager, SQLiteJobBackend
+
+    monkeypatch.setattr(jobs, "get_document_store", lambda: store)
+    monkeypatch.setattr(ingestion, "_default_chunker", lambda: _chunk_lines)
+    manager = JobManager(SQLiteJobBackend(str(tmp_path / "jobs.sqlite3")), poll_interval=0.05, retry_backoff=0)
+    manager.register(jobs.INGEST_DOCUMENT_JOB, jobs.make_ingest_document_handler(None))
+    manager.start()
+    try:
+        job_id = manager.submit(jobs.INGEST_DOCUMENT_JOB, {"path": str(upload)}, max_retries=max_retries)
+        return manager.wait(job_id, timeout=5)
+    finally:
+        manager.stop(timeout=5)
+
+
+def test_upload_is_kept_for_retries_and_removed_on_success(monkeypatch, tmp_path):
+    upload = tmp_path / "notes.txt"
+    upload.write_text("first line\nsecond line")
+
+    job = _run_upload(monkeypatch, tmp_path, upload, _FlakyStore(failures=1), max_retries=1)
+
+    assert job["status"] == "succeeded" and job["attempts"] == 2
+    assert not upload.exists()
+
+
+def test_upload_is_removed_after_final_failure(monkeypatch, tmp_path):
+    upload = tmp_path / "notes.txt"
+    upload.write_text("first line")
+
+    job = _run_upload(monkeypatch, tmp_path, upload, _FlakyStore(failures=5), max_retries=1)
+
+    assert job["status"] == "failed" and job["attempts"] == 2
+    assert not upload.exists()
+
+
+def test_unsupported_upload_fails_once_and_is_removed(monkeypatch, tmp_path):
+    upload = tmp_path / "slides.xyz"
+    upload.write_text("binary")
+
+    job = _run_upload(monkeypatch, tmp_path, upload, _Store(), max_retries=2)
+
+    assert job["status"] == "failed" and job["attempts"] == 1
+    assert not upload.exists()
@@ -0,0 +1,244 @@
+"""
+Tests for the background job queue.
+"""
+import os
+import sys
+import threading
+import time
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import pytest
+
+from src.jobs import (
+    CANCELLED,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    JobManager,
+    PermanentJobError,
+    SQLiteJobBackend,
+)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteJobBackend(str(tmp_path / "jobs.sqlite3"))
+
+
+@pytest.fixture
+def manager(backend):
+    manager = JobManager(backend, concurrency=2, max_retries=2, poll_interval=0.05, retry_backoff=0)
+    yield manager
+    manager.stop(timeout=5)
+
+
+def test_job_runs_and_stores_result(manager):
+    manager.register("echo", lambda payload, ctx: {"echo": payload["value"]})
+    manager.start()
+
+    job = manager.wait(manager.submit("echo", {"value": 42}), timeout=5)
+    assert job["status"] == SUCCEEDED
+    assert job["result"] == {"echo": 42}
+    assert job["attempts"] == 1
+
+
+def test_unknown_job_type_is_rejected(manager):
+    with pytest.raises(ValueError):
+        manager.submit("missing", {})
+
+
+def test_failed_attempts_are_retried(manager):
+    calls = []
+
+    def flaky(payload, ctx):
+        calls.append(ctx.attempt)
+        if len(calls) < 3:
+            raise RuntimeError("temporary failure")
+        return "ok"
+
+    manager.register("flaky", flaky)
+    manager.start()
+
+    job = manager.wait(manager.submit("flaky", {}), timeout=5)
+    assert job["status"] == SUCCEEDED
+    assert calls == [1, 2, 3]
+
+
+def test_job_fails_after_max_retries(manager):
+    def broken(payload, ctx):
+        raise RuntimeError("still broken")
+
+    manager.register("broken", broken)
+    manager.start()
+
+    job = manager.wait(manager.submit("broken", {}, max_retries=1), timeout=5)
+    assert job["status"] == FAILED
+    assert job["attempts"] == 2
+    assert "still broken" in job["error"]
+
+
+def test_invalid_input_is_not_retried(manager):
+    def invalid(payload, ctx):
+        raise PermanentJobError("bad topic")
+
+    manager.register("invalid", invalid)
+    manager.start()
+
+    job = manager.wait(manager.submit("invalid", {}), timeout=5)
+    assert job["status"] == FAILED
+    assert job["attempts"] == 1
+
+
+def test_value_errors_are_retried(manager):
+    calls = []
+
+    def provider_error(payload, ctx):
+        # direct_openai reports exhausted 429/5xx retries as ValueError
+        calls.append(ctx.attempt)
+        if len(calls) < 2:
+            raise ValueError("OpenAI API error: 503")
+        return "ok"
+
+    manager.register("provider_error", provider_error)
+    manager.start()
+
+    job = manager.wait(manager.submit("provider_error", {}), timeout=5)
+    assert job["status"] == SUCCEEDED
+    assert calls == [1, 2]
+
+
+def test_queued_job_can_be_cancelled(manager):
+    manager.register("echo", lambda payload, ctx: payload)
+    job_id = manager.submit("echo", {})
+
+    assert manager.cancel(job_id)
+    manager.start()
+    time.sleep(0.2)
+    assert manager.get(job_id)["status"] == CANCELLED
+    assert not manager.cancel(job_id)
+
+
+def test_running_job_stops_at_cancellation_check(manager):
+    started = threading.Event()
+
+    def slow(payload, ctx):
+        started.set()
+        while True:
+            ctx.report_progress(stage="working")
+            ctx.check_cancelled()
+            time.sleep(0.01)
+
+    manager.register("slow", slow)
+    manager.start()
+    job_id = manager.submit("slow", {})
+
+    assert started.wait(5)
+    assert manager.get(job_id)["status"] == RUNNING
+    assert manager.cancel(job_id)
+    job = manager.wait(job_id, timeout=5)
+    assert job["status"] == CANCELLED
+    assert job["progress"] == {"stage": "working"}
+
+
+def test_concurrency_limit_is_respected(backend):
+    manager = JobManager(backend, concurrency=2, poll_interval=0.05)
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def work(payload, ctx):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.1)
+        with lock:
+            active.pop()
+
+    manager.register("work", work)
+    job_ids = [manager.submit("work", {}) for _ in range(6)]
+    manager.start()
+    try:
+        for job_id in job_ids:
+            assert manager.wait(job_id, timeout=5)["status"] == SUCCEEDED
+    finally:
+        manager.stop(timeout=5)
+    assert max(peak) == 2
+
+
+def test_each_job_is_claimed_once(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    producer = SQLiteJobBackend(path)
+    job_ids = {producer.enqueue("work", {"n": i}) for i in range(20)}
+
+    # Separate connections behave like separate worker processes
+    claimed = []
+    lock = threading.Lock()
+
+    def drain():
+        backend = SQLiteJobBackend(path)
+        while True:
+            job = backend.claim(["work"])
+            if job is None:
+                return
+            with lock:
+                claimed.append(job["id"])
+
+    threads = [threading.Thread(target=drain) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(job_ids)
+
+
+def test_stale_running_jobs_are_requeued(backend):
+    job_id = backend.enqueue("work", {}, max_retries=1)
+    backend.claim()
+    assert backend.recover_stale(stale_after=60) == 0
+    time.sleep(0.05)
+    assert backend.recover_stale(stale_after=0.01) == 1
+    assert backend.get(job_id)["status"] == QUEUED
+
+
+def test_stale_jobs_without_retries_left_fail(backend):
+    job_id = backend.enqueue("work", {}, max_retries=1)
+    for _ in range(2):
+        backend.claim()
+        time.sleep(0.05)
+        backend.recover_stale(stale_after=0.01)
+    job = backend.get(job_id)
+    assert job["status"] == FAILED
+    assert job["attempts"] == 2
+    assert "no retries left" in job["error"]
+
+    cancelled_id = backend.enqueue("work", {}, max_retries=5)
+    backend.claim()
+    backend.request_cancel(cancelled_id)
+    time.sleep(0.05)
+    backend.recover_stale(stale_after=0.01)
+    assert backend.get(cancelled_id)["status"] == CANCELLED
+
+
+def test_heartbeat_loop_recovers_orphaned_jobs(backend):
+    orphan_id = backend.enqueue("work", {}, max_retries=1)
+    backend.claim()  # claimed by a process that then died
+    manager = JobManager(backend, concurrency=1, poll_interval=0.05, retry_backoff=0, stale_after=0.5)
+    manager.register("work", lambda payload, context: "done")
+    assert not manager.workers_alive()
+    manager._threads.append(threading.Thread(target=manager._heartbeat_loop, daemon=True))
+    manager._threads[0].start()
+    try:
+        assert manager.wait(orphan_id, timeout=0.2)["status"] == RUNNING
+        deadline = time.monotonic() + 5
+        while backend.get(orphan_id)["status"] == RUNNING and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert backend.get(orphan_id)["status"] == QUEUED
+        assert manager.workers_alive()
+    finally:
+        manager.stop(timeout=5)
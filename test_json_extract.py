@@ -0,0 +1,55 @@
+"""
+Tests for single-pass JSON extraction from model responses.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.utils.json_extract import JSONExtractionError, extract_json, parse_json_response
+
+NESTED = {"title": "Python", "milestones": [{"title": "Basics", "resources": [{"name": "Docs {v3}"}]}]}
+
+
+def test_clean_json_is_parsed_directly():
+    assert parse_json_response(json.dumps(NESTED)) == (NESTED, "direct")
+
+
+def test_nested_objects_in_fences_and_prose():
+    text = f"Here is your path:\n```json\n{json.dumps(NESTED, indent=2)}\n```\nEnjoy!"
+    assert parse_json_response(text) == (NESTED, "extracted")
+    assert extract_json(f"Sure! {json.dumps(NESTED)} Hope this helps.") == NESTED
+
+
+def test_brackets_inside_strings_and_preamble_are_ignored():
+    text = 'See [1] and {this}.\n```json\n{"a": "} ] {", "b": "quote \\" inside"}\n```'
+    assert extract_json(text, expect=dict) == {"a": "} ] {", "b": 'quote " inside'}
+
+
+def test_expected_type_looks_inside_other_values():
+    assert extract_json('[{"a": 1}]', expect=dict) == {"a": 1}
+    assert extract_json('[{"a": 1}]') == [{"a": 1}]
+
+
+def test_trailing_commas_are_repaired():
+    value, method = parse_json_response('```json\n{"a": [1, 2,], "b": {"c": "x, ]",},}\n```')
+    assert value == {"a": [1, 2], "b": {"c": "x, ]"}}
+    assert method == "repaired"
+
+
+def test_truncated_output_is_closed_at_last_complete_element():
+    text = '{"title": "T", "milestones": [{"n": 1}, {"n": 2}, {"n": 3, "description": "cut off mid'
+    value, method = parse_json_response(text)
+    assert method == "repaired"
+    assert value == {"title": "T", "milestones": [{"n": 1}, {"n": 2}, {"n": 3}]}
+
+
+def test_unrecoverable_responses_raise():
+    for text in ("", "no json here", "{'single': 'quotes'}", "[1, 2]"):
+        with pytest.raises(JSONExtractionError):
+            extract_json(text, expect=dict)
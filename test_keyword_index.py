@@ -0,0 +1,81 @@
+"""
+Tests for the BM25 keyword index and reciprocal rank fusion.
+"""
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+
+from src.data.keyword_index import KeywordIndex, fts_query, reciprocal_rank_fusion
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = KeywordIndex(str(tmp_path / "keywords.sqlite3"))
+    index.add(
+        "resources",
+        ["py", "ml", "web"],
+        [
+            "Learning Python programming for beginners",
+            "Machine learning with Python and scikit-learn",
+            "Building web applications with JavaScript",
+        ],
+        [
+            {"type": "course", "level": "beginner"},
+            {"type": "book", "level": "intermediate"},
+            {"type": "course", "level": "beginner"},
+        ],
+    )
+    return index
+
+
+def test_bm25_ranks_matching_documents(index):
+    results = index.search("resources", "python machine learning", top_k=5)
+    assert [r["id"] for r in results] == ["ml", "py"]
+    assert results[0]["score"] > results[1]["score"]
+    assert results[0]["metadata"]["type"] == "book"
+
+
+def test_stemming_and_punctuation_in_queries(index):
+    assert [r["id"] for r in index.search("resources", "applications?")] == ["web"]
+    # FTS operators are matched as plain words, not interpreted
+    assert index.search("resources", "build AND app*")[0]["id"] == "web"
+    assert index.search("resources", "!!!") == []
+
+
+def test_metadata_filters(index):
+    assert [r["id"] for r in index.search("resources", "python", filters={"type": "course"})] == ["py"]
+    hits = index.search("resources", "python", filters={"level": ["beginner", "intermediate"]})
+    assert {r["id"] for r in hits} == {"py", "ml"}
+    with pytest.raises(ValueError):
+        index.search("resources", "python", filters={"type') OR 1=1 --": "x"})
+
+
+def test_updates_deletes_and_collections(index):
+    index.add("resources", ["py"], ["Rust systems programming"], [{}])
+    assert index.search("resources", "python", top_k=5)[0]["id"] == "ml"
+    assert index.count("resources") == 3
+
+    index.delete("resources", ["ml"])
+    assert index.search("resources", "python") == []
+    assert index.search("paths", "rust") == []
+
+    index.clear("resources")
+    assert index.count("resources") == 0
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]])
+    ids = [doc_id for doc_id, _ in fused]
+    assert ids == ["b", "a", "d", "c"]  # found by both rankers beats ranked first by one
+
+    weighted = reciprocal_rank_fusion([["a"], ["b"]], weights=[2.0, 1.0])
+    assert weighted[0][0] == "a"
+
+
+def test_fts_query_quotes_terms():
+    assert fts_query('C++ "NEAR" python python') == '"c" OR "near" OR "python"'
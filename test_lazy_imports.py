@@ -0,0 +1,57 @@
+"""
+Tests for lazy module loading and the import-time profile summary.
+"""
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+from src.utils.import_profile import parse_importtime, summarise_importtime
+from src.utils.lazy import LazyModule, lazy_import
+
+SAMPLE_REPORT = """\
+import time: self [us] | cumulative | imported package
+import time:       200 |        200 |     _json
+import time:      1000 |       1200 |   json.decoder
+import time:       300 |       1500 | json
+import time:      2000 |       2000 | chromadb
+Traceback lines are ignored
+"""
+
+
+def test_lazy_module_imports_on_first_attribute_access():
+    sys.modules.pop("colorsys", None)
+    module = lazy_import("colorsys")
+    assert isinstance(module, LazyModule)
+    assert "colorsys" not in sys.modules
+
+    assert module.rgb_to_hsv(0, 0, 0) == (0.0, 0.0, 0.0)
+    assert "colorsys" in sys.modules
+    assert module.is_loaded
+
+
+def test_already_imported_module_is_returned_directly():
+    import json
+    assert lazy_import("json") is json
+
+
+def test_parse_importtime_reads_depth_and_times():
+    entries = parse_importtime(SAMPLE_REPORT)
+    assert [e["module"] for e in entries] == ["_json", "json.decoder", "json", "chromadb"]
+    assert [e["depth"] for e in entries] == [2, 1, 0, 0]
+    assert entries[1]["self_us"] == 1000
+    assert entries[1]["cumulative_us"] == 1200
+
+
+def test_summary_totals_and_heavy_modules():
+    summary = summarise_importtime(parse_importtime(SAMPLE_REPORT), top=2)
+    assert summary["total_ms"] == 3.5
+    assert summary["module_count"] == 4
+    assert [row["module"] for row in summary["slowest_cumulative"]] == ["chromadb", "json"]
+    assert summary["packages"][0] == {"package": "chromadb", "self_ms": 2.0}
+    assert summary["packages"][1] == {"package": "json", "self_ms": 1.3}
+    assert summary["heavy_modules"]["chromadb"] is True
+    assert summary["heavy_modules"]["langchain"] is False
@@ -0,0 +1,85 @@
+"""
+Tests for concurrent milestone enrichment.
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+pytest.importorskip("langchain")
+
+from src.learning_path import JobMarketData, LearningPathGenerator, Milestone, ResourceItem
+
+
+def _milestone(title):
+    return Milestone(
+        title=title,
+        description=f"About {title}",
+        estimated_hours=5,
+        resources=[ResourceItem(type="video", url="https://example.com", description="Intro")],
+        skills_gained=[f"{title} skill"],
+    )
+
+
+def _generator(monkeypatch, delays=None, block=None):
+    # Skip __init__: enrichment only needs the three lookup methods
+    generator = LearningPathGenerator.__new__(LearningPathGenerator)
+    delays = delays or {}
+
+    def market(skill):
+        time.sleep(delays.get(skill, 0))
+        if block is not None and skill == "B skill":
+            block.wait(5)
+        return JobMarketData(open_positions=skill)
+
+    def roles(skills, ai_provider=None, ai_model=None):
+        time.sleep(delays.get(skills[0], 0))
+        return [f"{skills[0]} role"]
+
+    def resources(title):
+        return [ResourceItem(type="article", url=f"https://example.com/{title}", description=title)]
+
+    monkeypatch.setattr(generator, "fetch_job_market_data", market)
+    monkeypatch.setattr(generator, "fetch_related_roles", roles)
+    monkeypatch.setattr(generator, "_search_milestone_resources", resources)
+    return generator
+
+
+def test_results_are_written_back_in_milestone_order(monkeypatch):
+    milestones = [_milestone(title) for title in ("A", "B", "C")]
+    # Later milestones finish first
+    generator = _generator(monkeypatch, delays={"A skill": 0.1, "B skill": 0.05})
+
+    generator._enrich_milestones(milestones, max_workers=9, deadline=5)
+
+    assert [m.job_market_data.open_positions for m in milestones] == ["A skill", "B skill", "C skill"]
+    assert [m.job_market_data.related_roles for m in milestones] == [["A skill role"], ["B skill role"], ["C skill role"]]
+    assert [m.resources[0].description for m in milestones] == ["A", "B", "C"]
+
+
+def test_calls_missing_the_stage_deadline_fall_back(monkeypatch):
+    release = threading.Event()
+    milestones = [_milestone(title) for title in ("A", "B")]
+    generator = _generator(monkeypatch, block=release)
+
+    start = time.monotonic()
+    try:
+        generator._enrich_milestones(milestones, max_workers=2, deadline=0.3)
+        elapsed = time.monotonic() - start
+    finally:
+        release.set()
+
+    # One deadline for the whole stage, however many waves the calls need
+    assert elapsed < 1.5
+    assert milestones[0].job_market_data.open_positions == "A skill"
+    assert milestones[1].job_market_data.error == "Job market lookup did not complete"
+    # Only the blocked lookup falls back
+    assert milestones[1].job_market_data.related_roles == ["B skill role"]
+    assert milestones[1].resources[0].description == "B"
@@ -0,0 +1,141 @@
+"""
+Tests for regenerating only the invalid milestones of a learning path.
+"""
+import os
+import sys
+
+import pytest
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+pytest.importorskip("langchain")
+
+from pydantic import ValidationError
+
+from src.learning_path import LearningPath, LearningPathGenerator, invalid_milestones
+
+
+def _milestone(title):
+    return {
+        "title": title,
+        "description": f"About {title}",
+        "estimated_hours": 5,
+        "resources": [{"type": "video", "url": "https://example.com", "description": "Intro"}],
+        "skills_gained": ["python"],
+    }
+
+
+def _path(milestones):
+    return {
+        "title": "Python", "description": "Learn Python", "topic": "Python",
+        "expertise_level": "beginner", "learning_style": "visual", "time_commitment": "5 hours",
+        "goals": ["Write scripts"], "prerequisites": [], "total_hours": 20, "milestones": milestones,
+    }
+
+
+class _Orchestrator:
+    def __init__(self, replacements):
+        self.replacements = replacements
+        self.calls = []
+
+    def generate_structured_data(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"milestones": self.replacements}
+
+
+def _generator():
+    # Skip __init__: no model or document store is needed for validation
+    return LearningPathGenerator.__new__(LearningPathGenerator)
+
+
+def test_failing_milestones_are_identified():
+    data = _path([_milestone("A"), {"title": "B"}, _milestone("C")])
+    with pytest.raises(ValidationError) as info:
+        LearningPath.parse_obj(data)
+    assert invalid_milestones(info.value) == ([1], False)
+
+
+def test_only_invalid_milestones_are_regenerated_and_spliced():
+    data = _path([_milestone("A"), {"title": "B"}, _milestone("C"), {"description": "no title"}])
+    orchestrator = _Orchestrator([_milestone("B2"), _milestone("D2")])
+    stats = {"repaired": False, "partial_repairs": 0}
+
+    path = _generator()._validate_path(orchestrator, data, stats)
+
+    assert [m.title for m in path.milestones] == ["A", "B2", "C", "D2"]
+    assert stats["partial_repairs"] == 1
+    assert len(orchestrator.calls) == 1
+    prompt = orchestrator.calls[0]["prompt"]
+    assert "Milestones 2, 4" in prompt and "1. A" in prompt
+    assert "LearningPath" not in orchestrator.calls[0]["output_schema"]
+
+
+def test_near_misses_are_fixed_without_a_call():
+    milestone = {**_milestone("A"), "estimated_hours": "6 hours"}
+    orchestrator = _Orchestrator([])
+    stats = {"repaired": False, "partial_repairs": 0}
+
+    path = _generator()._validate_path(orchestrator, _path([milestone]), stats)
+
+    assert path.milestones[0].estimated_hours == 6
+    assert orchestrator.calls == []
+    assert stats == {"repaired": True, "partial_repairs": 0}
+
+
+def test_failed_regeneration_falls_back_to_defaults():
+    orchestrator = _Orchestrator([])
+    stats = {"repaired": False, "partial_repairs": 0}
+
+    path = _generator()._validate_path(orchestrator, _path([_milestone("A"), {"title": "B"}]), stats)
+
+    assert path.milestones[1].title == "B"
+    assert stats["partial_repairs"] == 1 and stats["repaired"] is True
+
+
+def test_milestone_without_resources_is_not_regenerated():
+    # Enrichment replaces every milestone's resources, so no call is spent on them
+    orchestrator = _Orchestrator([_milestone("B2")])
+    stats = {"repaired": False, "partial_repairs": 0}
+    bare = {**_milestone("B"), "resources": []}
+
+    path = _generator()._validate_path(orchestrator, _path([_milestone("A"), bare]), stats)
+
+    assert [m.title for m in path.milestones] == ["A", "B"]
+    assert orchestrator.calls == []
+    assert stats["partial_repairs"] == 0
+
+
+def test_incomplete_milestones_reach_repair_through_the_orchestrator(monkeypatch):
+    pytest.importorskip("langchain_openai")
+    import json
+
+    from langchain.output_parsers import PydanticOutputParser
+
+    from src.ml.model_orchestrator import ModelOrchestrator
+
+    incomplete = _milestone("B")
+    del incomplete["estimated_hours"]
+    responses = [
+        json.dumps({**_path([_milestone("A"), incomplete]), "duration_weeks": 4}),
+        json.dumps({"milestones": [_milestone("B2")]}),
+    ]
+    orchestrator = ModelOrchestrator.__new__(ModelOrchestrator)
+    orchestrator.provider = "openai"
+    orchestrator.model_name = "gpt-4o-mini"
+    monkeypatch.setattr(orchestrator, "_openai_structured_completion", lambda *args: responses.pop(0))
+
+    response = orchestrator.generate_structured_data(
+        prompt="Python path",
+        output_schema=PydanticOutputParser(pydantic_object=LearningPath).get_format_instructions(),
+        fill_milestone_defaults=False,
+    )
+    assert "estimated_hours" not in response["milestones"][1]
+
+    stats = {"repaired": False, "partial_repairs": 0}
+    path = _generator()._validate_path(orchestrator, response, stats)
+
+    assert [m.title for m in path.milestones] == ["A", "B2"]
+    assert stats["partial_repairs"] == 1 and responses == []
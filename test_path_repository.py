@@ -0,0 +1,136 @@
+"""
+Tests for the indexed learning path repository.
+"""
+import json
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+from src.data.path_repository import PathRepository, decode_path, encode_path, get_path_repository
+from src.utils.registry import reset_registry
+
+
+class _Path:
+    """Minimal stand-in for the LearningPath model."""
+    built = 0
+
+    def __init__(self, **data):
+        _Path.built += 1
+        if not data.get("topic"):
+            raise ValueError("topic required")
+        self.data = data
+
+    def dict(self):
+        return dict(self.data)
+
+
+def _path(i, topic="python"):
+    return {"id": f"{i:08d}-0000-0000-0000-000000000000", "topic": topic, "created_at": f"2024-01-{i + 1:02d}"}
+
+
+def test_encoding_round_trip_is_compact():
+    data = {**_path(1), "milestones": [{"title": "Basics", "description": "x" * 500}]}
+    blob = encode_path(data)
+    assert decode_path(blob) == data
+    assert len(blob) < len(json.dumps(data, indent=2))
+
+
+def test_save_get_and_prefix_lookup(tmp_path):
+    repo = PathRepository(str(tmp_path / "paths.sqlite3"), model=_Path)
+    repo.save(_path(1))
+    repo.save(_path(2, topic="sql"))
+
+    assert repo.get(_path(2)["id"]).data["topic"] == "sql"
+    assert repo.get("00000001").data["id"] == _path(1)["id"]
+    assert repo.get("missing") is None
+    assert repo.count() == 2
+    assert repo.list_ids() == [_path(2)["id"], _path(1)["id"]]
+
+
+def test_lru_serves_copies_without_rehydrating(tmp_path):
+    repo = PathRepository(str(tmp_path / "paths.sqlite3"), model=_Path, cache_size=1)
+    repo.save(_path(1))
+    repo.save(_path(2))  # evicts path 1
+
+    before = _Path.built
+    first = repo.get(_path(1)["id"])
+    first.data["topic"] = "changed"
+    second = repo.get(_path(1)["id"])
+    assert _Path.built == before + 1
+    assert second.data["topic"] == "python"
+    assert repo.stats()["hits"] == 1
+
+    assert repo.delete(_path(1)["id"])
+    assert repo.get(_path(1)["id"]) is None
+
+
+def test_cached_paths_follow_saves_from_other_processes(tmp_path):
+    db_path = str(tmp_path / "paths.sqlite3")
+    worker_a = PathRepository(db_path, model=_Path)
+    worker_b = PathRepository(db_path, model=_Path)
+    worker_a.save(_path(1))
+    assert worker_a.get(_path(1)["id"]).data["topic"] == "python"
+    assert worker_a.get("00000001").data["topic"] == "python"
+
+    worker_b.save(_path(1, topic="modified"))
+
+    assert worker_a.get(_path(1)["id"]).data["topic"] == "modified"
+    assert worker_a.get("00000001").data["topic"] == "modified"
+    # Unchanged entries stay cached after the check
+    hits = worker_a.stats()["hits"]
+    worker_a.get(_path(1)["id"])
+    assert worker_a.stats()["hits"] == hits + 1
+
+    worker_b.delete(_path(1)["id"])
+    assert worker_a.get(_path(1)["id"]) is None
+
+
+def test_local_save_invalidates_prefix_entries(tmp_path):
+    repo = PathRepository(str(tmp_path / "paths.sqlite3"), model=_Path)
+    repo.save(_path(1))
+    assert repo.get("00000001").data["topic"] == "python"
+
+    repo.save(_path(1, topic="modified"))
+    assert repo.get("00000001").data["topic"] == "modified"
+
+
+def test_existing_database_gains_version_column(tmp_path):
+    import sqlite3
+
+    db_path = str(tmp_path / "paths.sqlite3")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE paths (id TEXT PRIMARY KEY, topic TEXT NOT NULL, created_at TEXT, data BLOB NOT NULL) WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO paths VALUES (?, ?, ?, ?)", (_path(1)["id"], "python", None, encode_path(_path(1))))
+    conn.commit()
+    conn.close()
+
+    repo = PathRepository(db_path, model=_Path)
+    assert repo.get(_path(1)["id"]).data["topic"] == "python"
+    repo.save(_path(1, topic="modified"))
+    assert repo.get(_path(1)["id"]).data["topic"] == "modified"
+
+
+def test_legacy_directory_is_migrated(tmp_path):
+    for i in range(3):
+        (tmp_path / f"python_{i:08d}.json").write_text(json.dumps(_path(i), indent=2))
+    (tmp_path / "broken_ffffffff.json").write_text("{not json")
+    (tmp_path / "invalid_eeeeeeee.json").write_text(json.dumps(_path(9, topic="")))
+
+    reset_registry()
+    try:
+        repo = get_path_repository(str(tmp_path), model=_Path)
+        assert repo.count() == 3
+        assert repo.get(_path(2)["id"]).data == _path(2)
+
+        stats = repo.import_directory(str(tmp_path), remove=True)
+        assert stats == {"scanned": 5, "imported": 3, "failed": 2}
+        assert sorted(p.name for p in tmp_path.glob("*.json")) == ["broken_ffffffff.json", "invalid_eeeeeeee.json"]
+        assert repo.count() == 3
+    finally:
+        reset_registry()
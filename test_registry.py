@@ -0,0 +1,93 @@
+"""
+Tests for the shared component registry.
+"""
+import os
+import sys
+import threading
+import time
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import pytest
+
+from src.utils.registry import reset_registry, shared_instance
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    reset_registry()
+    yield
+    reset_registry()
+
+
+def test_instance_is_built_once_and_reused():
+    builds = []
+
+    def factory():
+        builds.append(1)
+        return object()
+
+    first = shared_instance(("component", "a"), factory)
+    assert shared_instance(("component", "a"), factory) is first
+    assert shared_instance(("component", "b"), factory) is not first
+    assert len(builds) == 2
+
+
+def test_concurrent_first_use_builds_once():
+    builds = []
+
+    def slow_factory():
+        builds.append(1)
+        time.sleep(0.1)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(shared_instance("slow", slow_factory)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_factories_can_request_other_components():
+    inner = shared_instance("inner", object)
+    outer = shared_instance("outer", lambda: {"inner": shared_instance("inner", object)})
+    assert outer["inner"] is inner
+
+
+def test_failed_build_is_retried():
+    def failing():
+        raise RuntimeError("not configured")
+
+    with pytest.raises(RuntimeError):
+        shared_instance("flaky", failing)
+    assert shared_instance("flaky", lambda: "ok") == "ok"
+
+
+def test_shared_orchestrator_keeps_no_conversation_state(monkeypatch):
+    pytest.importorskip("langchain_openai")
+    from src.ml.model_orchestrator import ModelOrchestrator
+
+    orchestrator = ModelOrchestrator.__new__(ModelOrchestrator)
+    orchestrator.planning_enabled = True
+    prompts = []
+    monkeypatch.setattr(
+        orchestrator, "generate_response",
+        lambda prompt, relevant_documents=None, temperature=None: prompts.append((prompt, relevant_documents)) or "ok",
+    )
+
+    orchestrator.generate_answer("How do I reset my password?", context=["user one's notes"])
+    orchestrator.generate_answer("What is SQL?", context=["user two's notes"])
+
+    assert "password" not in prompts[1][0]
+    assert prompts[1][1] == ["user two's notes", "This is a definitional question"]
+    assert not hasattr(orchestrator, "memory") and not hasattr(orchestrator, "context")
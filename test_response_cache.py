@@ -0,0 +1,70 @@
+"""
+Tests for the persistent LLM response cache.
+"""
+import os
+import sys
+import time
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+from src.ml.response_cache import ResponseCache
+
+
+def _key(prompt, temperature=0.7):
+    return ResponseCache.make_key("gpt-3.5-turbo", "system", prompt, temperature, 1000)
+
+
+def test_key_depends_on_every_input():
+    base = _key("hello")
+    assert base == _key("hello")
+    assert base != _key("hello!")
+    assert base != _key("hello", temperature=0.2)
+    assert base != ResponseCache.make_key("gpt-4", "system", "hello", 0.7, 1000)
+    assert base != ResponseCache.make_key("gpt-3.5-turbo", "other", "hello", 0.7, 1000)
+    assert base != ResponseCache.make_key("gpt-3.5-turbo", "system", "hello", 0.7, 500)
+
+
+def test_hit_and_miss_counters(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60, max_entries=10)
+    assert cache.get(_key("a")) is None
+    cache.set(_key("a"), "answer a", model="gpt-3.5-turbo")
+    assert cache.get(_key("a")) == "answer a"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(path).set(_key("a"), "answer a")
+    assert ResponseCache(path).get(_key("a")) == "answer a"
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=1, max_entries=10)
+    cache.set(_key("a"), "answer a")
+    time.sleep(1.1)
+    assert cache.get(_key("a")) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=None, max_entries=2)
+    cache.set(_key("a"), "answer a")
+    time.sleep(0.01)
+    cache.set(_key("b"), "answer b")
+    time.sleep(0.01)
+    assert cache.get(_key("a")) == "answer a"  # "b" is now the least recently used
+    time.sleep(0.01)
+    cache.set(_key("c"), "answer c")
+
+    assert cache.get(_key("b")) is None
+    assert cache.get(_key("a")) == "answer a"
+    assert cache.get(_key("c")) == "answer c"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,103 @@
+"""
+Tests for multi-source retrieval with shared query embeddings.
+"""
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.data.retrieval import search_sources
+
+
+class _Embeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        raise AssertionError("queries must be embedded as queries")
+
+    def embed_queries(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+
+class _VectorStore:
+    def __init__(self, model="m"):
+        self.embedding_model = model
+        self.embeddings = _Embeddings()
+        self.received = None
+
+    def search_many(self, queries, k=4, query_embeddings=None):
+        self.received = query_embeddings
+        return [[{"content": f"vector:{q}", "score": 0.1}] for q in queries]
+
+
+class _DocumentStore:
+    def __init__(self, model="m", fail=False):
+        self.embedding_model = model
+        self.fail = fail
+        self.received = None
+        self.embed_calls = 0
+
+    def embedding_function(self, texts):
+        self.embed_calls += 1
+        return [[0.0] for _ in texts]
+
+    def search_many(self, queries, filters=None, top_k=5, query_embeddings=None):
+        if self.fail:
+            raise RuntimeError("chroma unavailable")
+        self.received = (query_embeddings, filters, top_k)
+        return [[f"doc:{q}"] for q in queries]
+
+
+def test_queries_are_embedded_once_for_both_stores():
+    vectors, documents = _VectorStore(), _DocumentStore()
+    results = search_sources(["python", "sql"], documents, vectors, filters={"topic": "data"}, top_k=3)
+
+    assert vectors.embeddings.calls == [["python", "sql"]]
+    assert documents.embed_calls == 0
+    assert vectors.received == [[6.0], [3.0]]
+    assert documents.received == ([[6.0], [3.0]], {"topic": "data"}, 3)
+    assert results["documents"] == [["doc:python"], ["doc:sql"]]
+    assert results["vectors"][1][0]["content"] == "vector:sql"
+
+
+def test_different_models_embed_separately():
+    vectors, documents = _VectorStore("a"), _DocumentStore("b")
+    search_sources(["python"], documents, vectors, concurrent=False)
+    assert vectors.embeddings.calls == []
+    assert vectors.received is None
+    assert documents.received[0] is None
+
+
+def test_a_failing_store_does_not_drop_the_other():
+    results = search_sources(["python"], _DocumentStore(fail=True), _VectorStore())
+    assert results["documents"] == [[]]
+    assert results["vectors"][0][0]["content"] == "vector:python"
+
+
+def test_single_store_and_empty_queries():
+    documents = _DocumentStore()
+    results = search_sources(["python"], document_store=documents)
+    assert documents.embed_calls == 1
+    assert results["vectors"] == [[]]
+    assert search_sources([], documents, _VectorStore()) == {"documents": [], "vectors": []}
+
+
+def test_cached_queries_are_not_embedded():
+    vectors, documents = _VectorStore(), _DocumentStore()
+    vectors.cached_queries = lambda queries, k=4: [q != "sql" for q in queries]
+    documents.cached_queries = lambda queries, filters=None, top_k=5: [q != "rust" for q in queries]
+
+    search_sources(["python", "sql", "rust"], documents, vectors)
+    assert vectors.embeddings.calls == [["sql", "rust"]]
+    assert vectors.received == [None, [3.0], [4.0]]
+
+    vectors.embeddings.calls = []
+    documents.cached_queries = lambda queries, filters=None, top_k=5: [True for _ in queries]
+    vectors.cached_queries = lambda queries, k=4: [True for _ in queries]
+    search_sources(["python", "sql"], documents, vectors)
+    assert vectors.embeddings.calls == []
+    assert documents.received[0] == [None, None]
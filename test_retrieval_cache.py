@@ -0,0 +1,86 @@
+"""
+Tests for the versioned retrieval result cache.
+"""
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+from src.data.retrieval_cache import RetrievalCache
+
+
+def test_queries_are_normalised_and_filters_order_independent():
+    cache = RetrievalCache()
+    key = cache.make_key("resources", "  Machine   Learning ", {"a": 1, "b": [2]}, 10)
+    assert key == cache.make_key("resources", "machine learning", {"b": [2], "a": 1}, 10)
+    assert key != cache.make_key("resources", "machine learning", {"a": 1}, 10)
+    assert key != cache.make_key("resources", "machine learning", {"a": 1, "b": [2]}, 5)
+
+
+def test_writes_invalidate_only_their_collection():
+    cache = RetrievalCache()
+    resources = cache.make_key("resources", "python", None, 5)
+    paths = cache.make_key("paths", "python", None, 5)
+    cache.set(resources, ["r"])
+    cache.set(paths, ["p"])
+
+    cache.bump("resources")
+    assert cache.get(cache.make_key("resources", "python", None, 5)) is None
+    assert cache.get(cache.make_key("paths", "python", None, 5)) == ["p"]
+
+
+def test_external_version_invalidates():
+    cache = RetrievalCache()
+    cache.set(cache.make_key("faiss", "python", None, 4, "v1"), ["old"])
+    assert cache.get(cache.make_key("faiss", "python", None, 4, "v2")) is None
+
+
+def test_results_are_copied():
+    cache = RetrievalCache()
+    key = cache.make_key("resources", "python", None, 5)
+    cache.set(key, [{"metadata": {"score": 1}}])
+    cache.get(key)[0]["metadata"]["score"] = 0
+    assert cache.get(key)[0]["metadata"]["score"] == 1
+
+
+def test_get_many_computes_misses_in_one_call():
+    cache = RetrievalCache()
+    queries = ["a", "b", "c"]
+    keys = [cache.make_key("resources", q, None, 5) for q in queries]
+    cache.set(keys[1], ["cached b"])
+    calls = []
+
+    def compute(missing):
+        calls.append(missing)
+        return [[f"fresh {queries[i]}"] for i in missing]
+
+    assert cache.get_many(keys, compute) == [["fresh a"], ["cached b"], ["fresh c"]]
+    assert cache.get_many(keys, compute) == [["fresh a"], ["cached b"], ["fresh c"]]
+    assert calls == [[0, 2]]
+
+
+def test_lru_bound_and_hit_rate():
+    cache = RetrievalCache(max_entries=2)
+    for query in ("a", "b"):
+        cache.set(cache.make_key("c", query, None, 1), [query])
+    cache.get(cache.make_key("c", "a", None, 1))
+    cache.set(cache.make_key("c", "c", None, 1), ["c"])
+
+    assert cache.get(cache.make_key("c", "b", None, 1)) is None
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_contains_does_not_count_lookups():
+    cache = RetrievalCache()
+    key = cache.make_key("resources", "python", None, 5)
+    assert not cache.contains(key)
+    cache.set(key, ["r"])
+    assert cache.contains(key)
+    assert cache.contains(cache.make_key("resources", " Python ", None, 5))
+    assert (cache.hits, cache.misses) == (0, 0)
@@ -0,0 +1,75 @@
+"""
+Tests for vectorised cosine similarity.
+"""
+import os
+import sys
+import time
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import numpy as np
+
+from src.ml.similarity import (
+    cosine_scores,
+    normalize_rows,
+    pairwise_similarity,
+    top_k,
+    top_k_similar,
+)
+
+
+def _naive_cosine(a, b):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    denominator = np.linalg.norm(a) * np.linalg.norm(b)
+    return 0.0 if denominator == 0 else float(np.dot(a, b) / denominator)
+
+
+def test_scores_match_pairwise_cosine():
+    rng = np.random.default_rng(0)
+    candidates = rng.normal(size=(50, 16))
+    query = rng.normal(size=16)
+
+    scores = cosine_scores(query, normalize_rows(candidates))
+    assert scores.dtype == np.float32
+    assert np.allclose(scores, [_naive_cosine(query, c) for c in candidates], atol=1e-5)
+
+
+def test_zero_vectors_score_zero():
+    matrix = normalize_rows([[0.0, 0.0], [3.0, 4.0]])
+    assert np.allclose(matrix[1], [0.6, 0.8])
+    assert np.allclose(cosine_scores([1.0, 0.0], matrix), [0.0, 0.6])
+    assert np.allclose(cosine_scores([0.0, 0.0], matrix), [0.0, 0.0])
+
+
+def test_top_k_returns_best_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3], dtype=np.float32)
+    indices, values = top_k(scores, 3)
+    assert indices.tolist() == [1, 3, 2]
+    assert np.allclose(values, [0.9, 0.7, 0.5])
+    assert top_k(scores, 10)[0].tolist() == [1, 3, 2, 4, 0]
+    assert top_k(scores, 0)[0].size == 0
+
+
+def test_pairwise_matrix_is_symmetric_with_unit_diagonal():
+    matrix = normalize_rows(np.random.default_rng(1).normal(size=(8, 4)))
+    similarities = pairwise_similarity(matrix)
+    assert similarities.shape == (8, 8)
+    assert np.allclose(similarities, similarities.T, atol=1e-6)
+    assert np.allclose(np.diag(similarities), 1.0, atol=1e-5)
+    assert pairwise_similarity(matrix, matrix[:3]).shape == (8, 3)
+
+
+def test_ranking_100k_candidates_is_fast():
+    rng = np.random.default_rng(2)
+    matrix = normalize_rows(rng.normal(size=(100000, 384)))
+    query = matrix[1234] + 0.001
+
+    started = time.perf_counter()
+    indices, scores = top_k_similar(query, matrix, k=10)
+    elapsed = time.perf_counter() - started
+
+    assert indices[0] == 1234
+    assert scores[0] > 0.99
+    assert elapsed < 0.5
@@ -0,0 +1,97 @@
+"""
+Tests for single-flight request coalescing.
+"""
+import os
+import sys
+import threading
+import time
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+
+from src.utils.singleflight import SingleFlight, singleflight_stats
+
+
+def _run_concurrently(flight, key, fn, callers):
+    results = []
+    errors = []
+    lock = threading.Lock()
+
+    def call():
+        try:
+            result = flight.do(key, fn)
+            with lock:
+                results.append(result)
+        except Exception as exc:
+            with lock:
+                errors.append(exc)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_identical_calls_run_once():
+    flight = SingleFlight("test_identical")
+    executions = []
+
+    def slow():
+        executions.append(1)
+        time.sleep(0.2)
+        return "path"
+
+    results, errors = _run_concurrently(flight, "key", slow, callers=5)
+
+    assert not errors
+    assert len(executions) == 1
+    assert [r for r, _ in results] == ["path"] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+
+    stats = flight.stats()
+    assert stats["calls"] == 5
+    assert stats["executions"] == 1
+    assert stats["deduplicated"] == 4
+    assert stats["in_flight"] == 0
+
+
+def test_different_keys_do_not_share():
+    flight = SingleFlight("test_keys")
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+    assert flight.stats()["deduplicated"] == 0
+
+
+def test_sequential_calls_are_not_cached():
+    flight = SingleFlight("test_sequential")
+    counter = []
+    flight.do("key", lambda: counter.append(1))
+    flight.do("key", lambda: counter.append(1))
+    assert len(counter) == 2
+
+
+def test_errors_are_shared_with_waiters():
+    flight = SingleFlight("test_errors")
+
+    def failing():
+        time.sleep(0.2)
+        raise RuntimeError("generation failed")
+
+    results, errors = _run_concurrently(flight, "key", failing, callers=3)
+
+    assert not results
+    assert len(errors) == 3
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    with pytest.raises(RuntimeError):
+        flight.do("key", failing)
+
+
+def test_stats_are_reported_by_name():
+    flight = SingleFlight("test_named")
+    flight.do("key", lambda: None)
+    assert singleflight_stats()["test_named"]["executions"] == 1
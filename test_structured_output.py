@@ -0,0 +1,126 @@
+"""
+Tests for schema-constrained generation helpers.
+"""
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+from src.ml.structured_output import (
+    StructuredOutputMetrics,
+    downgrade,
+    json_schema_for,
+    mark_unsupported,
+    repair_data,
+    response_format_for,
+    supported_format,
+)
+
+
+class _Resource(BaseModel):
+    type: str
+    url: str
+    description: str
+
+
+class _Milestone(BaseModel):
+    title: str
+    estimated_hours: int
+    resources: List[_Resource]
+    skills_gained: List[str]
+
+
+class _Path(BaseModel):
+    id: str = "generated"
+    title: str
+    duration_weeks: Optional[int] = 0
+    milestones: List[_Milestone]
+    schedule: Optional[Dict[str, Any]] = Field(default=None)
+
+
+def test_schema_is_strict_and_inlined():
+    schema = json_schema_for(_Path)
+    assert "definitions" not in schema and "$ref" not in str(schema)
+    assert set(schema["properties"]) == {"title", "duration_weeks", "milestones"}
+    assert schema["required"] == list(schema["properties"])
+    assert schema["additionalProperties"] is False
+    assert schema["properties"]["duration_weeks"]["anyOf"][1] == {"type": "null"}
+
+    milestone = schema["properties"]["milestones"]["items"]
+    assert milestone["additionalProperties"] is False
+    assert milestone["properties"]["resources"]["items"]["required"] == ["type", "url", "description"]
+
+
+def test_response_format_modes():
+    strict = response_format_for(_Path, mode="json_schema")
+    assert strict["json_schema"]["strict"] is True and strict["json_schema"]["name"] == "_Path"
+    assert response_format_for(_Path, mode="json_object") == {"type": "json_object"}
+    assert response_format_for(_Path, mode="prompt") is None
+    assert downgrade(strict) == {"type": "json_object"}
+    assert downgrade({"type": "json_object"}) is None
+
+
+def test_rejected_formats_are_remembered_per_model():
+    strict = response_format_for(_Path, mode="json_schema")
+    mark_unsupported("old-model", strict)
+    assert supported_format("old-model", strict) == {"type": "json_object"}
+    assert supported_format("new-model", strict) is strict
+
+
+def test_repair_fills_and_coerces_without_touching_the_input():
+    data = {
+        "title": "Python",
+        "duration_weeks": "8 weeks",
+        "milestones": [{
+            "title": "Basics",
+            "estimated_hours": "10 hours",
+            "resources": ["Official tutorial", {"type": "video", "url": "https://example.com"}],
+            "skills_gained": "syntax",
+        }],
+        "schedule": None,
+    }
+    repaired, repairs = repair_data(_Path, data)
+
+    path = _Path.parse_obj(repaired)
+    assert path.duration_weeks == 8
+    milestone = path.milestones[0]
+    assert milestone.estimated_hours == 10
+    assert milestone.skills_gained == ["syntax"]
+    assert milestone.resources[0].description == "Official tutorial"
+    assert milestone.resources[1].description == ""
+    assert "milestones[0].resources[1].description: missing, filled with a default" in repairs
+    assert data["duration_weeks"] == "8 weeks"
+
+
+def test_missing_fields_can_be_left_for_validation():
+    data = {"title": "T", "milestones": [{"title": "m", "estimated_hours": "2h"}]}
+    coerced, repairs = repair_data(_Path, data, fill_missing=False)
+    assert coerced["milestones"][0] == {"title": "m", "estimated_hours": 2}
+    assert repairs == ["milestones[0].estimated_hours: '2h' coerced to 2"]
+
+
+def test_valid_data_needs_no_repair():
+    data = {"title": "T", "milestones": [
+        {"title": "m", "estimated_hours": 3, "resources": [], "skills_gained": ["a"]}
+    ]}
+    assert repair_data(_Path, data) == (data, [])
+
+
+def test_metrics_track_retry_and_repair_rates_per_model():
+    metrics = StructuredOutputMetrics()
+    metrics.record("openai/gpt-4o", attempts=1, repaired=True, succeeded=True)
+    metrics.record("openai/gpt-4o", attempts=1, repaired=False, succeeded=True, partial_repairs=1)
+    metrics.record("openai/gpt-3.5-turbo", attempts=3, repaired=False, succeeded=False)
+
+    stats = metrics.stats()
+    assert stats["openai/gpt-4o"]["retry_rate"] == 0
+    assert stats["openai/gpt-4o"]["repair_rate"] == 0.5
+    assert stats["openai/gpt-4o"]["partial_repairs"] == 1
+    assert stats["openai/gpt-3.5-turbo"]["retries"] == 2
+    assert stats["openai/gpt-3.5-turbo"]["failures"] == 1
@@ -0,0 +1,97 @@
+"""
+Tests for token-budgeted context packing.
+"""
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import pytest
+
+from src.utils import token_budget
+from src.utils.token_budget import context_budget, context_window, count_tokens, pack_context
+
+
+def _words(text):
+    return len(text.split())
+
+
+def test_chunks_are_ranked_by_score_and_fit_the_budget():
+    chunks = ["alpha " * 10, "beta " * 10, "gamma " * 10]
+    packed = pack_context(chunks, budget=20, scores=[0.1, 0.9, 0.5], separator="", count=_words)
+    assert packed == [("beta " * 10).strip(), ("gamma " * 10).strip()]
+
+
+def test_input_order_is_the_ranking_without_scores():
+    assert pack_context(["one two", "three four", "five six"], budget=4, separator="", count=_words) == [
+        "one two", "three four"
+    ]
+
+
+def test_smaller_chunks_fill_the_remaining_budget():
+    chunks = ["a b c d e f", "g h i j k l m n", "o p"]
+    assert pack_context(chunks, budget=8, separator="", count=_words) == ["a b c d e f", "o p"]
+
+
+def test_near_duplicates_are_dropped():
+    text = "Python is a programming language used for data science and web development"
+    chunks = [text, text.upper() + "!", "  " + text.replace(" ", "\n"), "Rust is a systems programming language"]
+    packed = pack_context(chunks, budget=1000, count=_words)
+    assert packed == [text, "Rust is a systems programming language"]
+
+
+def test_separator_counts_against_the_budget():
+    packed = pack_context(["a b", "c d"], budget=4, separator="sep", count=_words)
+    assert packed == ["a b"]
+
+
+def test_oversized_top_chunk_is_truncated():
+    packed = pack_context(["x" * 4000], budget=10)
+    assert packed and count_tokens(packed[0]) <= 10
+
+
+def test_empty_and_unscored_chunks():
+    assert pack_context([], budget=100) == []
+    assert pack_context(["", "  ", "kept"], budget=100) == ["kept"]
+    assert pack_context(["late", "early"], budget=100, scores=[None, 0.2]) == ["early", "late"]
+
+
+def test_missing_scores_rank_last():
+    assert pack_context(["a", "b", "c"], budget=100, scores=[0.1, 0.9]) == ["b", "a", "c"]
+    assert pack_context(["a", "b"], budget=100, scores=[0.1, 0.9, 0.5]) == ["b", "a"]
+
+
+def test_agent_context_limit_of_zero_keeps_nothing(monkeypatch):
+    pytest.importorskip("langchain")
+    from src import agent
+
+    learning_agent = agent.LearningAgent.__new__(agent.LearningAgent)
+    learning_agent.context = []
+    monkeypatch.setattr(agent, "AGENT_CONTEXT_MAX_ITEMS", 2)
+    learning_agent._add_context(["one", "two", "one", "three"])
+    assert learning_agent.context == ["one", "three"]
+
+    monkeypatch.setattr(agent, "AGENT_CONTEXT_MAX_ITEMS", 0)
+    learning_agent._add_context(["four"])
+    assert learning_agent.context == []
+
+
+def test_context_budget_reserves_completion_and_prompt(monkeypatch):
+    monkeypatch.setattr(token_budget, "MODEL_CONTEXT_WINDOW", 0)
+    assert context_window("gpt-4o-mini") == 128000
+    assert context_window("gpt-4") == 8192
+    assert context_window("unknown-model") == token_budget.DEFAULT_CONTEXT_WINDOW
+
+    prompt = "word " * 400
+    uncapped = context_budget("gpt-4", prompt, max_tokens=1000, budget=0)
+    assert uncapped == 8192 - 1000 - count_tokens(prompt, "gpt-4") - token_budget.SAFETY_MARGIN
+    assert context_budget("gpt-4", prompt, max_tokens=1000, budget=500) == 500
+    assert context_budget("gpt-4", prompt, max_tokens=9000, budget=0) == 0
+
+
+def test_configured_context_window_overrides_lookup(monkeypatch):
+    monkeypatch.setattr(token_budget, "MODEL_CONTEXT_WINDOW", 4096)
+    assert context_window("gpt-4o") == 4096
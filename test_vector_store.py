@@ -0,0 +1,126 @@
+"""
+Tests for incremental FAISS index builds with approximate index types.
+"""
+import functools
+import hashlib
+import os
+import sys
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DEV_MODE", "true")
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+from langchain_community.document_loaders import TextLoader
+from langchain_core.embeddings import Embeddings
+
+from src.data import ann_index
+from src.data import vector_store as vector_store_module
+from src.data.index_manifest import IndexManifest
+
+
+class _HashEmbeddings(Embeddings):
+    """Deterministic vectors, so a chunk's own text finds it at distance 0."""
+
+    def _vector(self, text):
+        seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(16).astype("float32").tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+class _TextDirectoryLoader:
+    def __init__(self, directory):
+        self.loader_cls = TextLoader
+        self.loader_kwargs = {}
+
+
+def _paragraph(name, i):
+    # Long enough that the splitter keeps every paragraph in its own chunk
+    return f"{name} paragraph {i}. " + " ".join(f"{name}-{i}-word{j}" for j in range(40))
+
+
+def _write(directory, name, count, version="v1"):
+    text = "\n\n".join(_paragraph(f"{name}-{version}", i) for i in range(count))
+    (directory / f"{name}.txt").write_text(text, encoding="utf-8")
+
+
+def _store(tmp_path):
+    store = vector_store_module.VectorStore.__new__(vector_store_module.VectorStore)
+    store.embedding_model = "hash-test"
+    store.embeddings = _HashEmbeddings()
+    store.vector_store_path = tmp_path / "db"
+    store.vector_store_path.mkdir()
+    store.vector_store = None
+    store.serving_path = store.vector_store_path / vector_store_module.SERVING_DIR
+    store._reader = None
+    store.retrieval_cache = None
+    store._cache_namespace = "faiss:test"
+    return store
+
+
+@pytest.fixture
+def ivf_flat(monkeypatch):
+    monkeypatch.setattr(vector_store_module, "DirectoryLoader", _TextDirectoryLoader)
+    monkeypatch.setattr(vector_store_module, "build_index",
+                        functools.partial(ann_index.build_index, index_type="ivf_flat"))
+    monkeypatch.setattr(vector_store_module, "build_settings",
+                        functools.partial(ann_index.build_settings, "ivf_flat"))
+    monkeypatch.setattr(vector_store_module, "needs_rebuild",
+                        functools.partial(ann_index.needs_rebuild, index_type="ivf_flat"))
+
+
+def _layout(store):
+    return IndexManifest(str(store.vector_store_path / vector_store_module.MANIFEST_FILE),
+                         settings={"embedding_model": "hash-test",
+                                   "chunk_size": vector_store_module.CHUNK_SIZE,
+                                   "chunk_overlap": vector_store_module.CHUNK_OVERLAP,
+                                   **ann_index.build_settings("ivf_flat")}).layout
+
+
+def test_modified_file_is_found_under_ivf_flat(tmp_path, ivf_flat):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for name in ("a", "b", "c", "d"):
+        _write(docs, name, 30)
+    store = _store(tmp_path)
+    store._sync_directory(str(docs))
+    assert _layout(store)["index_type"] == "ivf_flat"
+
+    _write(docs, "b", 30, version="v2")
+    (docs / "c.txt").unlink()
+    store._sync_directory(str(docs))
+    assert _layout(store)["index_type"] == "ivf_flat"
+
+    for name, version in (("a", "v1"), ("b", "v2"), ("d", "v1")):
+        text = _paragraph(f"{name}-{version}", 7)
+        hit = store.search(text, k=1)[0]
+        assert hit["content"] == text
+        assert hit["metadata"]["source_path"] == f"{name}.txt"
+    assert store.search(_paragraph("b-v1", 7), k=1)[0]["content"] != _paragraph("b-v1", 7)
+    assert store.search(_paragraph("c-v1", 7), k=1)[0]["metadata"]["source_path"] != "c.txt"
+
+
+def test_flat_fallback_is_retrained_once_the_corpus_grows(tmp_path, ivf_flat):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    _write(docs, "a", 5)
+    store = _store(tmp_path)
+    store._sync_directory(str(docs))
+    assert _layout(store) == {"index_type": "flat"}
+
+    for name in ("b", "c", "d", "e"):
+        _write(docs, name, 25)
+    store._sync_directory(str(docs))
+    assert _layout(store) == {"index_type": "ivf_flat", "nlist": ann_index.auto_nlist(105)}
+    text = _paragraph("a-v1", 3)
+    assert store.search(text, k=1)[0]["content"] == text
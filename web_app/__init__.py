@@ -47,4 +47,13 @@ def create_app(config_class=Config):
     # Import models here to ensure they are registered with SQLAlchemy
     from web_app import models
 
+    # Background jobs (async learning path generation); workers are started by
+    # the server entry point or `python -m web_app.jobs`, not here
+    from web_app.jobs import init_jobs
+    init_jobs(app)
+
+    # CLI commands (flask import-profile, ...)
+    from web_app.cli import register_cli
+    register_cli(app)
+
     return app
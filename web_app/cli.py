@@ -0,0 +1,77 @@
+"""
+Flask CLI commands for maintenance and diagnostics.
+"""
+import json
+
+import click
+
+from src.utils.import_profile import (
+    DEFAULT_TARGET,
+    format_summary,
+    parse_importtime,
+    run_importtime,
+    summarise_importtime,
+)
+
+
+def register_cli(app):
+    """
+    Register the app's CLI commands.
+
+    Args:
+        app: Flask application
+    """
+    @app.cli.command('import-profile')
+    @click.option('--code', default=DEFAULT_TARGET, show_default=True,
+                  help='Python snippet whose imports are profiled.')
+    @click.option('--top', default=15, show_default=True, help='Number of modules to list.')
+    @click.option('--as-json', is_flag=True, help='Print the summary as JSON.')
+    @click.option('--max-ms', type=float, default=None,
+                  help='Exit with status 1 if total import time exceeds this many milliseconds.')
+    def import_profile(code, top, as_json, max_ms):
+        """Profile cold-start import time with `python -X importtime`."""
+        try:
+            report = run_importtime(code)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+
+        summary = summarise_importtime(parse_importtime(report), top=top)
+        click.echo(json.dumps(summary, indent=2) if as_json else format_summary(summary))
+
+        if max_ms is not None and summary['total_ms'] > max_ms:
+            click.echo(f"Import time {summary['total_ms']:.1f} ms exceeds budget of {max_ms:.1f} ms", err=True)
+            raise SystemExit(1)
+
+    @app.cli.command('compact-documents')
+    @click.option('--collection', 'collections', multiple=True,
+                  default=('learning_resources', 'learning_paths'), show_default=True,
+                  help='Collection to compact (repeatable).')
+    @click.option('--dry-run', is_flag=True, help='Only report what would be removed.')
+    def compact_documents(collections, dry_run):
+        """Remove duplicate documents and move them to content-hash IDs."""
+        from src.utils.registry import get_document_store
+
+        store = get_document_store()
+        for name in collections:
+            stats = store.compact_collection(name, dry_run=dry_run)
+            prefix = '[dry run] ' if dry_run else ''
+            click.echo(
+                f"{prefix}{name}: {stats['scanned']} documents, {stats['unique']} unique, "
+                f"{stats['migrated']} to migrate, {stats['removed']} duplicates"
+            )
+
+    @app.cli.command('migrate-paths')
+    @click.option('--directory', default='learning_paths', show_default=True,
+                  help='Directory holding the legacy JSON learning path files.')
+    @click.option('--remove', is_flag=True, help='Delete each JSON file once it has been imported.')
+    def migrate_paths(directory, remove):
+        """Import legacy per-file learning paths into the indexed path repository."""
+        from src.data.path_repository import get_path_repository
+        from src.learning_path import LearningPath
+
+        repository = get_path_repository(directory, model=LearningPath)
+        stats = repository.import_directory(directory, remove=remove)
+        click.echo(
+            f"{directory}: {stats['scanned']} files, {stats['imported']} imported, "
+            f"{stats['failed']} failed; {repository.count()} paths in {repository.db_path}"
+        )
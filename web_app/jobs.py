@@ -0,0 +1,162 @@
+"""
+Background job handlers for the web app.
+
+`init_jobs(app)` registers the handlers on the shared job manager; the app
+factory calls it so every process can submit jobs. Worker threads are started
+only by the server entry point (`run_flask.py`, unless JOB_RUN_WORKERS is
+disabled) or by a dedicated worker process, `python -m web_app.jobs`, so CLI
+commands and gunicorn workers built from the factory never run jobs.
+"""
+import logging
+import os
+import time
+import uuid
+
+from src.jobs import JobCancelled, PermanentJobError, get_job_manager
+from src.utils.config import EXPERTISE_LEVELS, JOB_RUN_WORKERS, LEARNING_STYLES, TIME_COMMITMENTS
+from src.utils.registry import get_document_store, get_learning_path_generator
+
+logger = logging.getLogger(__name__)
+
+GENERATE_PATH_JOB = 'generate_path'
+INGEST_DOCUMENT_JOB = 'ingest_document'
+
+def make_generate_path_handler(app):
+    """
+    Build the handler that generates a learning path inside the app context.
+
+    Args:
+        app: Flask application used for database access
+
+    Returns:
+        Job handler receiving (payload, context)
+    """
+    def handle(payload, context):
+        # Bad input fails for good; provider errors (also ValueErrors) are retried
+        for field, choices in (
+            ('expertise_level', EXPERTISE_LEVELS),
+            ('learning_style', LEARNING_STYLES),
+            ('time_commitment', TIME_COMMITMENTS),
+        ):
+            if payload.get(field) not in choices:
+                raise PermanentJobError(f"Invalid {field.replace('_', ' ')}. Choose from: {', '.join(choices)}")
+
+        context.report_progress(stage='generating', started_at=time.time())
+        learning_path = get_learning_path_generator().generate_path(
+            topic=payload['topic'],
+            expertise_level=payload['expertise_level'],
+            learning_style=payload['learning_style'],
+            time_commitment=payload['time_commitment'],
+            ai_provider=payload.get('ai_provider') or 'openai',
+            ai_model=payload.get('ai_model'),
+        )
+
+        # A cancelled job must not leave a saved path behind
+        context.check_cancelled()
+        context.report_progress(stage='saving')
+
+        path_data = learning_path.dict()
+        path_data['id'] = path_data.get('id') or str(uuid.uuid4())
+        if payload.get('user_id') is not None:
+            from web_app.main_routes import store_generated_path
+            with app.app_context():
+                store_generated_path(path_data, payload['user_id'])
+
+        return path_data
+
+    return handle
+
+
+def make_ingest_document_handler(app):
+    """
+    Build the handler that streams an uploaded document into the DocumentStore.
+
+    Args:
+        app: Flask application (kept for parity with the other handlers)
+
+    Returns:
+        Job handler receiving (payload, context)
+    """
+    def handle(payload, context):
+        from src.data.ingestion import IngestionPipeline, UnsupportedDocumentError
+
+        pipeline = IngestionPipeline(get_document_store())
+        metadata = {'source': payload.get('filename') or os.path.basename(payload['path'])}
+        if payload.get('user_id') is not None:
+            metadata['user_id'] = payload['user_id']
+
+        # The upload is kept only while a retry is pending, so the retry can
+        # re-read it (chunk IDs are content-derived, so re-ingesting is
+        # idempotent); success, cancellation and final failures remove it
+        retry_pending = False
+        try:
+            return pipeline.run(
+                payload['path'],
+                metadata=metadata,
+                progress=context.report_progress,
+                check_cancelled=context.check_cancelled,
+            )
+        except UnsupportedDocumentError as exc:
+            raise PermanentJobError(str(exc)) from exc
+        except (JobCancelled, PermanentJobError):
+            raise
+        except Exception:
+            retry_pending = not context.final_attempt and not context.cancelled
+            raise
+        finally:
+            if not retry_pending:
+                try:
+                    os.remove(payload['path'])
+                except FileNotFoundError:
+                    pass
+
+    return handle
+
+
+def init_jobs(app, start_workers=False):
+    """
+    Register the web app's job handlers.
+
+    Args:
+        app: Flask application
+        start_workers: Whether to run worker threads in this process
+
+    Returns:
+        The shared JobManager
+    """
+    manager = get_job_manager()
+    manager.register(GENERATE_PATH_JOB, make_generate_path_handler(app))
+    manager.register(INGEST_DOCUMENT_JOB, make_ingest_document_handler(app))
+    if start_workers:
+        manager.start()
+    app.extensions['job_manager'] = manager
+    return manager
+
+
+def start_job_workers(app):
+    """
+    Start worker threads in a server process, unless JOB_RUN_WORKERS is disabled.
+
+    Args:
+        app: Flask application built by the app factory
+
+    Returns:
+        True if workers were started
+    """
+    if not JOB_RUN_WORKERS:
+        return False
+    app.extensions['job_manager'].start()
+    return True
+
+
+if __name__ == '__main__':
+    from web_app import create_app
+
+    logging.basicConfig(level=logging.INFO)
+    manager = init_jobs(create_app(), start_workers=True)
+    logger.info("Job worker running with %s thread(s)", manager.concurrency)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        manager.stop()
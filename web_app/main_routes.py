@@ -2,17 +2,22 @@ import datetime
 import os
 import json
 from pathlib import Path
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash, current_app, send_from_directory, abort
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash, current_app, send_from_directory, abort, Response, stream_with_context
 from flask_login import current_user, login_required
 from web_app.models import db, UserLearningPath, LearningProgress
 import uuid
 from werkzeug.utils import secure_filename
 from pydantic import ValidationError as PydanticValidationError
 
-from src.learning_path import LearningPath, LearningPathGenerator
-from src.data.resources import ResourceManager # Assuming this is the correct path
 from src.utils.config import LEARNING_STYLES, EXPERTISE_LEVELS, TIME_COMMITMENTS
-from src.ml.job_market import get_job_market_stats
+from src.utils.lazy import lazy_import
+from src.utils.registry import get_learning_path_generator
+from src.jobs import QUEUED, SUCCEEDED
+from web_app.jobs import GENERATE_PATH_JOB, INGEST_DOCUMENT_JOB
+
+# LLM and vector store modules are imported on first use to keep app start-up fast
+openai = lazy_import('openai')
+job_market = lazy_import('src.ml.job_market')
 
 # Define the blueprint
 bp = Blueprint('main', __name__, template_folder='../templates') # Adjusted template_folder path
@@ -23,23 +28,13 @@ def get_path_generator():
     if not hasattr(current_app, 'path_generator'):
         current_app.logger.info("Initializing LearningPathGenerator for main_routes...")
         try:
-            current_app.path_generator = LearningPathGenerator()
+            # Shared with agents and job workers in this process
+            current_app.path_generator = get_learning_path_generator()
         except Exception as e:
             current_app.logger.error(f"Failed to initialize LearningPathGenerator in main_routes: {e}")
             current_app.path_generator = None # Avoid crashing if init fails
     return current_app.path_generator
 
-# Helper for ResourceManager
-def get_resource_manager():
-    if not hasattr(current_app, 'resource_manager'):
-        current_app.logger.info("Initializing ResourceManager for main_routes...")
-        try:
-            current_app.resource_manager = ResourceManager()
-        except Exception as e:
-            current_app.logger.error(f"Failed to initialize ResourceManager in main_routes: {e}")
-            current_app.resource_manager = None
-    return current_app.resource_manager
-
 @bp.context_processor
 def inject_current_year():
     return {'current_year': datetime.datetime.now().year}
@@ -53,6 +48,54 @@ def index():
         time_commitments=TIME_COMMITMENTS
     )
 
+def store_generated_path(path_data, user_id):
+    """
+    Save a freshly generated path for a user, creating milestone progress rows.
+
+    Args:
+        path_data: Learning path dictionary (must contain 'id')
+        user_id: ID of the owning user
+    """
+    path_id = path_data['id']
+    # Check if this path already exists for this user
+    existing_path = UserLearningPath.query.filter_by(
+        user_id=user_id,
+        id=path_id
+    ).first()
+    
+    if existing_path:
+        # Update existing path
+        existing_path.path_data_json = path_data
+        existing_path.title = path_data.get('title', 'Untitled Path')
+        existing_path.topic = path_data.get('topic', 'General')
+        db.session.commit()
+        current_app.logger.info(f"Updated existing path {path_id} for user {user_id}")
+        return
+
+    # Create new path
+    new_path = UserLearningPath(
+        id=path_id,
+        user_id=user_id,
+        path_data_json=path_data,
+        title=path_data.get('title', 'Untitled Path'),
+        topic=path_data.get('topic', 'General')
+    )
+    db.session.add(new_path)
+    db.session.commit()
+    current_app.logger.info(f"Created new path {path_id} for user {user_id}")
+    
+    # Create initial progress entries for each milestone
+    milestones = path_data.get('milestones', [])
+    for i, _ in enumerate(milestones):
+        progress = LearningProgress(
+            user_learning_path_id=path_id,
+            milestone_identifier=str(i),
+            status='not_started'
+        )
+        db.session.add(progress)
+    
+    db.session.commit()
+
 @bp.route('/generate', methods=['POST'])
 def generate_path():
     # Mock response for UI testing when ENABLE_MOCK_DATA=True and special topic provided
@@ -140,43 +183,7 @@ def generate_path():
         
         # For logged-in users, automatically save to database
         if current_user.is_authenticated:
-            # Check if this path already exists for this user
-            existing_path = UserLearningPath.query.filter_by(
-                user_id=current_user.id,
-                id=path_id
-            ).first()
-            
-            if existing_path:
-                # Update existing path
-                existing_path.path_data_json = path_data
-                existing_path.title = path_data.get('title', 'Untitled Path')
-                existing_path.topic = path_data.get('topic', 'General')
-                db.session.commit()
-                current_app.logger.info(f"Updated existing path {path_id} for user {current_user.id}")
-            else:
-                # Create new path
-                new_path = UserLearningPath(
-                    id=path_id,
-                    user_id=current_user.id,
-                    path_data_json=path_data,
-                    title=path_data.get('title', 'Untitled Path'),
-                    topic=path_data.get('topic', 'General')
-                )
-                db.session.add(new_path)
-                db.session.commit()
-                current_app.logger.info(f"Created new path {path_id} for user {current_user.id}")
-                
-                # Create initial progress entries for each milestone
-                milestones = path_data.get('milestones', [])
-                for i, _ in enumerate(milestones):
-                    progress = LearningProgress(
-                        user_learning_path_id=path_id,
-                        milestone_identifier=str(i),
-                        status='not_started'
-                    )
-                    db.session.add(progress)
-                
-                db.session.commit()
+            store_generated_path(path_data, current_user.id)
         
         return redirect(url_for('main.result')) 
 
@@ -194,6 +201,91 @@ def generate_path():
         if 'current_path' in session: del session['current_path']
         return render_template('index.html', error=error_message, learning_styles=LEARNING_STYLES, expertise_levels=EXPERTISE_LEVELS, time_commitments=TIME_COMMITMENTS)
 
+def _job_owner():
+    """Identify the current user (or anonymous session) for job ownership checks."""
+    if current_user.is_authenticated:
+        return f"user:{current_user.id}"
+    anonymous_id = session.get('anonymous_id')
+    if not anonymous_id:
+        anonymous_id = str(uuid.uuid4())
+        session['anonymous_id'] = anonymous_id
+    return f"anon:{anonymous_id}"
+
+def _get_owned_job(job_id):
+    """Return the job if it belongs to the current user, otherwise abort with 404."""
+    job = current_app.extensions['job_manager'].get(job_id)
+    if not job or job['payload'].get('owner') != _job_owner():
+        abort(404)
+    return job
+
+def _job_status(job):
+    status = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'attempts': job['attempts'],
+        'error': job['error'],
+        'status_url': url_for('main.job_status', job_id=job['id']),
+    }
+    if job['status'] == SUCCEEDED:
+        status['result_url'] = url_for('main.job_result', job_id=job['id'])
+    elif job['status'] == QUEUED and not current_app.extensions['job_manager'].workers_alive():
+        # Queued jobs never start without a worker process (python -m web_app.jobs)
+        status['workers_alive'] = False
+        status['warning'] = 'No job worker has polled the queue recently; the job will wait until one runs.'
+    return status
+
+@bp.route('/generate_async', methods=['POST'])
+def generate_path_async():
+    """Queue a learning path generation and return its job ID immediately."""
+    data = request.form
+    topic = data.get('topic')
+    if not topic:
+        return jsonify({'success': False, 'error': 'Topic is required.'}), 400
+
+    payload = {
+        'topic': topic,
+        'expertise_level': data.get('expertise_level'),
+        'learning_style': data.get('learning_style'),
+        'time_commitment': data.get('time_commitment'),
+        'ai_provider': data.get('ai_provider', 'openai'),
+        'ai_model': data.get('ai_model'),
+        'user_id': current_user.id if current_user.is_authenticated else None,
+        'owner': _job_owner(),
+    }
+    job_id = current_app.extensions['job_manager'].submit(GENERATE_PATH_JOB, payload)
+    current_app.logger.info(f"Queued learning path job {job_id} for topic '{topic}'")
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('main.job_status', job_id=job_id),
+    }), 202
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    return jsonify({'success': True, **_job_status(_get_owned_job(job_id))})
+
+@bp.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = _get_owned_job(job_id)
+    if job['status'] != SUCCEEDED:
+        return jsonify({'success': False, **_job_status(job)}), 409
+
+    # Make the generated path the current one, as /generate does
+    session['current_path'] = job['result']
+    return jsonify({
+        'success': True,
+        'path': job['result'],
+        'redirect_url': url_for('main.result'),
+    })
+
+@bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = _get_owned_job(job_id)
+    if not current_app.extensions['job_manager'].cancel(job_id):
+        return jsonify({'success': False, 'error': f"Job already {job['status']}."}), 409
+    return jsonify({'success': True, **_job_status(_get_owned_job(job_id))})
+
 def save_learning_path():
     """Save the current learning path to the database for logged-in users or to session for anonymous users"""
     path_data = session.get('current_path')
@@ -415,35 +507,41 @@ def dashboard():
 
 @bp.route('/upload_document', methods=['POST'])
 def upload_document():
-    resource_manager = get_resource_manager()
-    if not resource_manager:
-        return jsonify({'success': False, 'error': 'ResourceManager not available'}), 500
-        
+    """Save an uploaded document and queue its ingestion; returns the job ID immediately."""
     if 'document' not in request.files:
         return jsonify({'success': False, 'error': 'No document part in the request'}), 400
     file = request.files['document']
     if file.filename == '':
         return jsonify({'success': False, 'error': 'No selected file'}), 400
     
-    if file:
-        filename = secure_filename(file.filename)
-        # Ensure UPLOAD_FOLDER is configured on current_app by create_app
-        upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads') 
-        # Create absolute path for upload_folder if it's relative
-        if not os.path.isabs(upload_folder):
-            upload_folder = os.path.join(current_app.root_path, upload_folder)
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-        
-        try:
-            resource_manager.add_document(file_path)
-            return jsonify({'success': True, 'message': f'Document "{filename}" uploaded and processed successfully.'})
-        except Exception as e:
-            current_app.logger.error(f"Error processing uploaded document {filename}: {str(e)}")
-            return jsonify({'success': False, 'error': f'Failed to process document: {str(e)}'}), 500
-    return jsonify({'success': False, 'error': 'File upload failed for an unknown reason.'}), 500
+    filename = secure_filename(file.filename)
+    if not filename:
+        return jsonify({'success': False, 'error': 'Invalid file name'}), 400
+    # Ensure UPLOAD_FOLDER is configured on current_app by create_app
+    upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads') 
+    # Create absolute path for upload_folder if it's relative
+    if not os.path.isabs(upload_folder):
+        upload_folder = os.path.join(current_app.root_path, upload_folder)
+    os.makedirs(upload_folder, exist_ok=True)
+    
+    # Unique name so concurrent uploads of the same file don't overwrite each other
+    file_path = os.path.join(upload_folder, f"{uuid.uuid4().hex}_{filename}")
+    file.save(file_path)
+    
+    payload = {
+        'path': file_path,
+        'filename': filename,
+        'user_id': current_user.id if current_user.is_authenticated else None,
+        'owner': _job_owner(),
+    }
+    job_id = current_app.extensions['job_manager'].submit(INGEST_DOCUMENT_JOB, payload)
+    current_app.logger.info(f"Queued ingestion job {job_id} for document '{filename}'")
+    return jsonify({
+        'success': True,
+        'message': f'Document "{filename}" uploaded; processing in the background.',
+        'job_id': job_id,
+        'status_url': url_for('main.job_status', job_id=job_id),
+    }), 202
 
 @bp.route('/result')
 def result():
@@ -604,8 +702,14 @@ def clear_session_route(): # Renamed to avoid conflict with flask.session
     return jsonify({'success': True, 'message': 'Session cleared.'})
 
 
-import os
-from openai import OpenAI
+def _chatbot_system_prompt(learning_path_title, learning_path_topic):
+    """Build the career assistant system prompt for the learning path being viewed."""
+    return (
+        f"You are a helpful AI career assistant. The user is currently viewing a learning path titled "
+        f"'{learning_path_title}' which is about '{learning_path_topic}'. "
+        f"Your goal is to answer the user's questions in the context of this learning path. "
+        f"Be concise and helpful."
+    )
 
 @bp.route('/chatbot_query', methods=['POST'])
 def chatbot_query():
@@ -627,7 +731,7 @@ def chatbot_query():
             'mode': 'dev'
         })
     else:
-        client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
         data = request.get_json()
         user_message = data.get('message')
         learning_path_topic = data.get('learning_path_topic', 'a general topic') # Default if not provided
@@ -637,12 +741,7 @@ def chatbot_query():
             return jsonify({'error': 'No message provided'}), 400
 
         try:
-            system_prompt = (
-                f"You are a helpful AI career assistant. The user is currently viewing a learning path titled "
-                f"'{learning_path_title}' which is about '{learning_path_topic}'. "
-                f"Your goal is to answer the user's questions in the context of this learning path. "
-                f"Be concise and helpful."
-            )
+            system_prompt = _chatbot_system_prompt(learning_path_title, learning_path_topic)
 
             completion = client.chat.completions.create(
                 model="gpt-3.5-turbo",
@@ -659,6 +758,47 @@ def chatbot_query():
         return jsonify({'reply': ai_response})
 
 
+@bp.route('/chatbot_query/stream', methods=['POST'])
+def chatbot_query_stream():
+    """Stream the chatbot reply as server-sent events while tokens arrive."""
+    data = request.get_json() or {}
+    user_message = data.get('message')
+    learning_path_topic = data.get('learning_path_topic', 'a general topic')
+    learning_path_title = data.get('learning_path_title', 'your current learning path')
+
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    if current_app.config.get('DEV_MODE'):
+        # Stream stub tokens in dev mode
+        stub_reply = f"(Stub reply) You asked about {learning_path_topic}: {user_message}"
+        chunks = (word + ' ' for word in stub_reply.split())
+    else:
+        from src.direct_openai import stream_completion
+        chunks = stream_completion(
+            user_message,
+            system_message=_chatbot_system_prompt(learning_path_title, learning_path_topic),
+            model="gpt-3.5-turbo",
+            timeout=120
+        )
+
+    def events():
+        try:
+            for chunk in chunks:
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+        except Exception as e:
+            current_app.logger.error(f"Error streaming OpenAI response in /chatbot_query/stream: {e}")
+            error = "Sorry, I encountered an error trying to connect to the AI service. Please try again later."
+            yield f"event: error\ndata: {json.dumps({'error': error})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @bp.route('/direct_chat', methods=['POST'])
 def direct_chat():
     if current_app.config.get('DEV_MODE'):
@@ -678,7 +818,7 @@ def direct_chat():
             'timestamp': datetime.datetime.utcnow().isoformat(),
             'mode': 'dev'
         })
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
     data = request.get_json()
     user_message = data.get('message')
     mode = data.get('mode', 'Chat') # Default to 'Chat' if no mode is provided
@@ -751,7 +891,7 @@ def job_market():
     """Return real-time job-market snapshot using OpenAI search."""
     topic = request.args.get('topic', 'Data Scientist')
     try:
-        stats = get_job_market_stats(topic)
+        stats = job_market.get_job_market_stats(topic)
         return jsonify(stats)
     except Exception as e:
         current_app.logger.error(f"Job market route failed: {e}")
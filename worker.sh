@@ -0,0 +1,8 @@
+#!/bin/bash
+# Run the background job worker, restarting it whenever it exits.
+# Queued jobs (/generate_async, /upload_document) only run while a worker does.
+while true; do
+    python -m web_app.jobs
+    echo "Job worker exited with status $?; restarting in 5 seconds..."
+    sleep 5
+done